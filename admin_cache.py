@@ -0,0 +1,83 @@
+"""Per-chat cache of group administrators."""
+import asyncio
+import logging
+import time
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from telegram import Bot
+
+import config
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = ('administrator', 'creator')
+
+
+class AdminCache:
+    """Admin user ids per chat, fetched with get_chat_administrators.
+
+    A roster is reused until it is older than ``ttl`` seconds. Chat member
+    updates patch it in place, so promotions and demotions show up before
+    the TTL runs out. Concurrent misses for one chat share a single API call.
+    If the call fails, the chat is treated as having no admins for
+    ``error_ttl`` seconds rather than retrying on every message.
+    """
+
+    def __init__(self, ttl: float = config.ADMIN_CACHE_TTL_SECONDS,
+                 error_ttl: float = config.ADMIN_CACHE_ERROR_TTL_SECONDS):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._rosters: Dict[int, Tuple[FrozenSet[int], float]] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    def _fresh(self, chat_id: int) -> Optional[FrozenSet[int]]:
+        entry = self._rosters.get(chat_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def _fetch(self, bot: Bot, chat_id: int) -> FrozenSet[int]:
+        try:
+            admins = await bot.get_chat_administrators(chat_id)
+            roster = frozenset(member.user.id for member in admins)
+            self._rosters[chat_id] = (roster, time.monotonic() + self.ttl)
+            logger.info(f"Cached {len(roster)} admins for chat {chat_id}")
+        except Exception as e:
+            logger.error(f"Error fetching admins for chat {chat_id}: {e}")
+            roster = frozenset()
+            self._rosters[chat_id] = (roster, time.monotonic() + self.error_ttl)
+        return roster
+
+    async def get_admins(self, bot: Bot, chat_id: int) -> FrozenSet[int]:
+        """Get the admin user ids of a chat, from cache when fresh."""
+        roster = self._fresh(chat_id)
+        if roster is not None:
+            return roster
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._pending[chat_id] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(chat_id, None))
+        return await asyncio.shield(pending)
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        """Check whether a user is an admin of a chat (or a bot admin from config)."""
+        if user_id in config.ADMIN_IDS:
+            return True
+        return user_id in await self.get_admins(bot, chat_id)
+
+    def apply_member_update(self, chat_id: int, user_id: int, status: str):
+        """Patch a cached roster from a chat member update."""
+        entry = self._rosters.get(chat_id)
+        if entry is None:
+            return
+        roster, expires = entry
+        if status in ADMIN_STATUSES:
+            roster = roster | {user_id}
+        else:
+            roster = roster - {user_id}
+        self._rosters[chat_id] = (roster, expires)
+
+    def invalidate(self, chat_id: int):
+        """Drop a chat's roster so the next check refetches it."""
+        self._rosters.pop(chat_id, None)
@@ -0,0 +1,124 @@
+"""Per-message cost of link/keyword moderation: old multi-regex scan vs ModerationEngine.
+
+Before timing, LINK_PATTERN is checked against GOLDEN_LINKS.
+
+Run from the repository root:  python benchmarks/moderation_bench.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from domain_policy import DomainPolicy  # noqa: E402
+from moderation import ModerationEngine  # noqa: E402
+
+MESSAGES = [
+    "Hey everyone, does anyone know how to reverse a linked list in Python?",
+    "Check out https://github.com/python/cpython/blob/main/README.rst for the docs",
+    "Join my channel t.me/freecrypto and make money fast!!!",
+    "short link: bit.ly/3xYz12 click here",
+    "ping @someone about the meeting, see docs.python.org/3/library/re.html",
+    "I got 3.14 when I ran it, e.g. the output was wrong. Any idea?",
+    "This is a much longer message about data structures and algorithms. " * 10,
+    "Buy now! investment opportunity, visit http://example.com/win-prize",
+]
+
+# (message, links the engine should find as (kind, text)). The dotted words
+# and numbers are known false positives: they look like domains and are
+# still treated as disallowed links.
+GOLDEN_LINKS = [
+    ("ping @someone about it", [('mention', '@someone')]),
+    ("see https://github.com/python/cpython", [('url', 'https://github.com/python/cpython')]),
+    ("join t.me/freecrypto", [('telegram_link', 't.me/freecrypto')]),
+    ("mail me at a@b.com", [('url', 'b.com')]),
+    ("first.last@example.org wrote", [('url', 'first.last'), ('url', 'example.org')]),
+    ("user_@bot and x@y", []),
+    ("open file.py and run it", [('url', 'file.py')]),
+    ("I got 3.14 back", [('url', '3.14')]),
+    ("e.g the output", [('url', 'e.g')]),
+    ("no links here at all", []),
+]
+
+LEGACY_LINK_PATTERN = re.compile(
+    r'(?:(?:https?:\/\/)?'
+    r'(?:(?:[\w-]+\.)+[\w-]+|'
+    r'localhost|'
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+    r'(?::\d+)?'
+    r'(?:\/\S*)?)',
+    re.IGNORECASE
+)
+
+
+def legacy_check(text: str) -> bool:
+    """The old CustomMessageHandler.check_links logic (links only, no keywords)."""
+    standard_links = LEGACY_LINK_PATTERN.findall(text)
+    telegram_links = re.findall(r'(?:t\.me|telegram\.me|telegram\.dog)\/\S+', text, re.IGNORECASE)
+    shorteners = re.findall(r'(?:bit\.ly|tinyurl\.com|goo\.gl|is\.gd|t\.co)\/\S+', text, re.IGNORECASE)
+    domain_mentions = re.findall(r'\b[\w-][\w-]+\.[a-zA-Z]{2,}\b', text)
+    mentions = re.findall(r'@[\w_]+', text)
+    all_links = standard_links + telegram_links + shorteners + domain_mentions + mentions
+    if not all_links:
+        return False
+    filtered = []
+    for link in all_links:
+        if not any(domain.lower() in link.lower() for domain in config.ALLOWED_DOMAINS):
+            filtered.append(link)
+    return bool(filtered)
+
+
+def legacy_check_with_keywords(text: str) -> bool:
+    """legacy_check plus naive substring loops over the two keyword lists."""
+    lowered = text.lower()
+    return (
+        legacy_check(text)
+        or any(word in lowered for word in config.DELETE_MESSAGES_CONTAINING)
+        or any(word in lowered for word in config.SPAM_WORDS)
+    )
+
+
+def engine_check(engine: ModerationEngine, text: str) -> bool:
+    scan = engine.scan(text)
+    return bool(engine.disallowed_links(scan) or scan.blocked_words or scan.spam_words)
+
+
+def check_golden(engine: ModerationEngine) -> int:
+    """Print every golden message the engine scans differently; return how many."""
+    mismatches = 0
+    for text, expected in GOLDEN_LINKS:
+        found = [(link.kind, link.text) for link in engine.scan(text).links]
+        if found != expected:
+            mismatches += 1
+            print(f"MISMATCH {text!r}: expected {expected}, got {found}")
+    print(f"{len(GOLDEN_LINKS)} golden messages, {mismatches} mismatches")
+    return mismatches
+
+
+def bench(label: str, func, number: int = 2000):
+    total = timeit.timeit(lambda: [func(m) for m in MESSAGES], number=number)
+    per_message_us = total / (number * len(MESSAGES)) * 1e6
+    print(f"{label:<40} {per_message_us:8.2f} us/message")
+
+
+def main():
+    engine = ModerationEngine()
+    if check_golden(engine):
+        sys.exit(1)
+    bench("legacy links only (5 regex scans)", legacy_check)
+    bench("legacy links + keyword substring loops", legacy_check_with_keywords)
+    bench("ModerationEngine.scan (all rules)", lambda text: engine_check(engine, text))
+
+    # Domain lookups stay flat as the lists grow
+    big_policy = DomainPolicy(
+        list(config.ALLOWED_DOMAINS) + [f"allowed{i}.example.org" for i in range(5000)],
+        list(config.BLOCKED_DOMAINS) + [f"blocked{i}.example.net" for i in range(5000)],
+    )
+    big_engine = ModerationEngine(domain_policy=big_policy)
+    bench("ModerationEngine.scan, 10k listed domains", lambda text: engine_check(big_engine, text))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Per-image latency and pool throughput of each OCR backend.
+
+Run from the repository root:
+
+    python benchmarks/ocr_backend_bench.py [screenshot_dir] [--workers N]
+
+Backends whose dependencies are missing (the tesseract binary, or the
+tesserocr package) are reported as unavailable and skipped.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_preprocess_bench import directory_corpus, synthetic_corpus  # noqa: E402
+
+import ocr_backends  # noqa: E402
+import ocr_worker  # noqa: E402
+
+
+def latency(backend: str, corpus: list, rounds: int) -> list:
+    """Sequential run_ocr timings in this process, after one warm-up image."""
+    ocr_worker._init_worker(backend, ocr_worker._tesseract_cmd())
+    ocr_worker.run_ocr(corpus[0][1])
+    timings = []
+    for _ in range(rounds):
+        for _, data in corpus:
+            start = time.perf_counter()
+            ocr_worker.run_ocr(data)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def throughput(backend: str, corpus: list, workers: int, rounds: int) -> float:
+    """Images per second through an OCRWorkerPool kept full."""
+    pool = ocr_worker.OCRWorkerPool(workers=workers, max_queue=len(corpus) * rounds,
+                                    per_user=len(corpus) * rounds, backend=backend)
+    try:
+        # Start the workers (and load their models) before timing
+        await asyncio.gather(*(pool.submit(0, corpus[0][1]) for _ in range(workers)))
+        jobs = [data for _ in range(rounds) for _, data in corpus]
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.submit(0, data) for data in jobs))
+        return len(jobs) / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', nargs='?')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = directory_corpus(args.directory) if args.directory else synthetic_corpus()
+    print(f"{len(corpus)} images, {args.workers} workers")
+    print(f"{'backend':<12} {'mean ms':>9} {'p95 ms':>9} {'images/s':>10}")
+    for backend in (ocr_backends.SUBPROCESS, ocr_backends.TESSEROCR):
+        if backend == ocr_backends.TESSEROCR and ocr_backends.tesserocr is None:
+            print(f"{backend:<12} unavailable (pip install tesserocr)")
+            continue
+        try:
+            timings = latency(backend, corpus, args.rounds)
+        except ocr_worker.OCRError as e:
+            print(f"{backend:<12} unavailable ({e})")
+            continue
+        timings.sort()
+        rate = asyncio.run(throughput(backend, corpus, args.workers, args.rounds))
+        print(
+            f"{backend:<12} {statistics.mean(timings) * 1000:9.1f} "
+            f"{timings[int(len(timings) * 0.95)] * 1000:9.1f} {rate:10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
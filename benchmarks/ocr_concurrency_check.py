@@ -0,0 +1,148 @@
+"""Check that updates keep being handled while an OCR job is running.
+
+Run from the repository root (BOT_TOKEN may be any value, nothing is sent):
+
+    python benchmarks/ocr_concurrency_check.py
+
+A private photo is fed through the bot's real handlers with an OCR pool
+whose jobs wait until released. A text message sent meanwhile must be
+answered before the OCR job finishes, and a second photo from the same
+user must be turned away by the per-user limit.
+"""
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '123456:check')
+
+from telegram import Update  # noqa: E402
+from telegram.ext import ExtBot  # noqa: E402
+
+import bot as bot_module  # noqa: E402
+from database import AsyncDatabase  # noqa: E402
+from ocr_worker import OCRResult, OCRWorkerPool  # noqa: E402
+
+USER_ID = 4242
+TIMEOUT = 5.0  # Seconds to wait for each expected reply
+
+
+class HeldOCRPool(OCRWorkerPool):
+    """OCRWorkerPool whose jobs keep their slot until ``released`` is set."""
+
+    def __init__(self):
+        super().__init__(workers=1, max_queue=1, per_user=1)
+        self.started = asyncio.Event()
+        self.released = asyncio.Event()
+
+    async def submit(self, user_id, image_bytes):
+        self.check(user_id)
+        self._jobs += 1
+        self._user_jobs[user_id] += 1
+        try:
+            self.started.set()
+            await self.released.wait()
+            return OCRResult("Traceback (most recent call last):\nValueError: boom", 'python')
+        finally:
+            self._jobs -= 1
+            self._user_jobs[user_id] -= 1
+
+
+class OutboxBot(ExtBot):
+    """ExtBot that answers the Bot API calls the handlers make instead of sending them."""
+
+    def __init__(self, token: str):
+        super().__init__(token)
+        self._events = []
+
+    async def wait_for(self, endpoint: str, fragment: str) -> bool:
+        """Wait up to TIMEOUT seconds for a call to endpoint whose text contains fragment."""
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline:
+            if any(name == endpoint and fragment in text for name, text in self._events):
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def _post(self, endpoint, data=None, *args, **kwargs):
+        if endpoint == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Check', 'username': 'check_bot'}
+        if endpoint in ('sendMessage', 'editMessageText'):
+            self._events.append((endpoint, data['text']))
+            return {'message_id': len(self._events), 'date': 0, 'text': data['text'],
+                    'chat': {'id': data['chat_id'], 'type': 'private'}}
+        raise AssertionError(f"unexpected Bot API call {endpoint}")
+
+    async def get_file(self, file_id, *args, **kwargs):
+        async def download_as_bytearray():
+            return bytearray(b'not really a png')
+        return SimpleNamespace(download_as_bytearray=download_as_bytearray)
+
+
+def private_update(application, update_id: int, **message) -> Update:
+    data = {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': USER_ID, 'type': 'private'},
+            'from': {'id': USER_ID, 'is_bot': False, 'first_name': 'Check'},
+            **message,
+        },
+    }
+    return Update.de_json(data, application.bot)
+
+
+def photo(file_unique_id: str) -> dict:
+    return {'photo': [{'file_id': file_unique_id, 'file_unique_id': file_unique_id,
+                       'width': 800, 'height': 600}]}
+
+
+async def main() -> int:
+    # Keep the check's writes out of bot.db
+    db_path = os.path.join(tempfile.mkdtemp(), 'check.db')
+    bot_module.AsyncDatabase = functools.partial(AsyncDatabase, db_path)
+    telegram_bot = bot_module.TelegramBot(os.environ['BOT_TOKEN'])
+    telegram_bot.ocr_pool = pool = HeldOCRPool()
+    application = telegram_bot.application
+    # Nothing may reach Telegram
+    application.bot = outbox = OutboxBot(os.environ['BOT_TOKEN'])
+    application.updater = None  # updates are fed in below, not polled
+    await application.initialize()
+    await application.start()
+    telegram_bot.dispatcher.start()
+
+    failures = []
+    # Through the update queue, so updates are processed the way polling does it
+    await application.update_queue.put(private_update(application, 1, **photo('first')))
+    await asyncio.wait_for(pool.started.wait(), TIMEOUT)
+
+    await application.update_queue.put(private_update(application, 2, text='hello'))
+    if not await outbox.wait_for('sendMessage', 'Ku soo dhawoow'):
+        failures.append("text message wasn't answered while OCR was running")
+
+    await application.update_queue.put(private_update(application, 3, **photo('second')))
+    if not await outbox.wait_for('sendMessage', 'still reading your previous image'):
+        failures.append("second photo from the same user wasn't turned away")
+
+    pool.released.set()
+    if not await outbox.wait_for('editMessageText', 'Extracted Error Message'):
+        failures.append("OCR result was never delivered")
+
+    pool.released.set()
+    await telegram_bot.dispatcher.stop()
+    await application.stop()
+    await application.shutdown()
+    await telegram_bot.db_manager.close()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,106 @@
+"""Image handling before Tesseract: old temp-file path vs in-memory bounded preprocessing.
+
+Run from the repository root:
+
+    python benchmarks/ocr_preprocess_bench.py [screenshot_dir]
+
+Without a directory, a corpus of synthetic screenshots (small phone crops up to
+full-resolution camera photos, PNG and JPEG) is generated. Tesseract itself is
+not run; only download-to-image and preprocessing are timed.
+"""
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageEnhance  # noqa: E402
+
+from ocr_worker import preprocess  # noqa: E402
+
+SYNTHETIC_SIZES = [(480, 240), (1080, 720), (1280, 1280), (2560, 1440), (4032, 3024)]
+
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "main.py", line 12, in <module>\n'
+    "    print(totals[key])\n"
+    "KeyError: 'total'\n"
+)
+
+
+def legacy_preprocess(image: Image.Image) -> Image.Image:
+    """The preprocessing handle_photo used to run inline."""
+    image = image.convert('L')
+    image = ImageEnhance.Contrast(image).enhance(2.0)
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    if image.size[0] < 1000 or image.size[1] < 1000:
+        ratio = max(1000 / image.size[0], 1000 / image.size[1])
+        new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    return image
+
+
+def synthetic_corpus() -> list:
+    corpus = []
+    for width, height in SYNTHETIC_SIZES:
+        image = Image.new('RGB', (width, height), (30, 30, 30))
+        draw = ImageDraw.Draw(image)
+        for y in range(10, height - 60, 80):
+            draw.multiline_text((10, y), TRACEBACK, fill=(220, 220, 220))
+        for fmt in ('PNG', 'JPEG'):
+            buffer = io.BytesIO()
+            image.save(buffer, fmt)
+            corpus.append((f"{width}x{height}.{fmt.lower()}", buffer.getvalue()))
+    return corpus
+
+
+def directory_corpus(path: str) -> list:
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+            with open(os.path.join(path, name), 'rb') as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def disk_path(data: bytes) -> Image.Image:
+    """Old flow: download to a temp file, reopen it, preprocess, delete."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
+        tmp_file.write(data)
+    try:
+        with Image.open(tmp_file.name) as image:
+            return legacy_preprocess(image)
+    finally:
+        os.unlink(tmp_file.name)
+
+
+def memory_path(data: bytes) -> Image.Image:
+    """New flow: bytes from download_as_bytearray straight into PIL."""
+    with Image.open(io.BytesIO(bytearray(data))) as image:
+        return preprocess(image)
+
+
+def bench(func, data: bytes, number: int) -> float:
+    return timeit.timeit(lambda: func(data), number=number) / number * 1000
+
+
+def main():
+    corpus = directory_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    print(f"{'image':<24} {'disk ms':>9} {'memory ms':>10} {'disk out':>12} {'memory out':>12}")
+    disk_total = memory_total = 0.0
+    for name, data in corpus:
+        number = 5
+        disk_ms = bench(disk_path, data, number)
+        memory_ms = bench(memory_path, data, number)
+        disk_total += disk_ms
+        memory_total += memory_ms
+        disk_size = 'x'.join(map(str, disk_path(data).size))
+        memory_size = 'x'.join(map(str, memory_path(data).size))
+        print(f"{name:<24} {disk_ms:9.1f} {memory_ms:10.1f} {disk_size:>12} {memory_size:>12}")
+    print(f"{'total':<24} {disk_total:9.1f} {memory_total:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
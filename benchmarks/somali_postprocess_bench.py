@@ -0,0 +1,137 @@
+"""Somali post-processing: old per-correction re.sub loop vs the compiled SomaliPostProcessor.
+
+Run from the repository root:
+
+    python benchmarks/somali_postprocess_bench.py [--rounds N]
+
+Before timing, both implementations are run over golden cases and a
+generated corpus; the script exits with status 1 if any output differs.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from somali_postprocess import SomaliPostProcessor  # noqa: E402
+
+CORRECTIONS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources', 'somali_corrections.json'
+)
+
+# (input, expected output) pairs, including chained and case-folded corrections
+GOLDEN = [
+    ("Ku dar variable cusub.", "ku dar doorsoon cusub."),
+    ("Ku soo dar Function kale", "ku dar shaqo kale"),
+    ("Waa maxay Python ?", "maxay tahay python?"),
+    ("Qoraalka koodhka ee database-ka.Code wanaagsan", "koodka ee kayd xogeed-ka.\n\nkood wanaagsan"),
+    ("Web development iyo websites", "horumarinta bogagga iyo bogag internet"),
+    ("programming language iyo programmer", "luuqadda barnaamijyada iyo programmer"),
+    ("Method-ka cusub.Classes", "hab (method)-ka cusub.\n\nClasses"),
+    ("waa in aad in la sameeyo", "waa in aad inuu la sameeyo"),
+    ("", ""),
+]
+
+WORDS = (
+    "waa maxay ku dar ku soo dar ku soo dhawaada class Class CLASS function Function method Method "
+    "code Code codes program programming language server servers database python JavaScript bugs "
+    "solution software hardware security web development websites write application waxaa jira "
+    "wuxuu nooca dhibaatooyinka qoraalka koodhka waa in waxa in iyo ee oo , . ! ? ka la"
+).split()
+
+
+def legacy_improve_somali_text(text: str) -> str:
+    """TelegramBot._improve_somali_text before the compiled post-processor."""
+    corrections = {
+        "ku soo dhawaada": "kusoo dhowoow",
+        "qoraalka koodhka": "koodka",
+        "dhibaatooyinka": "caqabadaha",
+        "class": "fasal",
+        "function": "shaqo",
+        "waa maxay": "maxay tahay",
+        "ku dar": "ku soo dar",
+        "ku soo dar": "ku dar",
+        "programming language": "luuqadda barnaamijyada",
+        "code": "kood",
+        "variable": "doorsoon",
+        "algorithm": "khwaarisinm",
+        "websites": "bogag internet",
+        "server": "adeege",
+        "database": "kayd xogeed",
+        "python": "python",
+        "javascript": "javascript",
+        "solution": "xal",
+        "bugs": "cilado",
+        "nooca": "nooca",
+        "waxaa jira": "waa jiraan",
+        "wuxuu": "wuxuu",
+        "software": "barnaamij",
+        "hardware": "qalabka",
+        "security": "amniga",
+        "web development": "horumarinta bogagga",
+        "write": "qor",
+        "program": "barnaamij",
+        "application": "barnaamij"
+    }
+    for awkward, natural in corrections.items():
+        text = re.sub(r'\b' + re.escape(awkward) + r'\b', natural, text, flags=re.IGNORECASE)
+    text = re.sub(r'(\w)\s+([,.!?])', r'\1\2', text)
+    text = re.sub(r'([.!?])\s*(\w)', lambda m: m.group(1) + '\n\n' + m.group(2), text)
+    text = re.sub(r'\b([Ff]unction)\b', 'shaqada (function)', text)
+    text = re.sub(r'\b([Cc]lass)\b', 'fasalka (class)', text)
+    text = re.sub(r'\b([Mm]ethod)\b', 'hab (method)', text)
+    text = re.sub(r'\b(waa in|waxa)\s+(\w+)\s+in\b', r'\1 \2 inuu', text)
+    return text
+
+
+def generated_corpus(count: int, seed: int = 1) -> list:
+    """Random texts built from correction phrases, near misses and punctuation."""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 120)))
+        for _ in range(count)
+    ]
+
+
+def check(processor: SomaliPostProcessor, corpus: list) -> int:
+    """Compare both implementations; return the number of mismatches."""
+    failures = 0
+    for text, expected in GOLDEN:
+        for name, output in (('legacy', legacy_improve_somali_text(text)), ('compiled', processor(text))):
+            if output != expected:
+                failures += 1
+                print(f"golden mismatch ({name}): {text!r} -> {output!r}, expected {expected!r}")
+    for text in corpus:
+        old, new = legacy_improve_somali_text(text), processor(text)
+        if old != new:
+            failures += 1
+            print(f"mismatch: {text!r}\n  legacy:   {old!r}\n  compiled: {new!r}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--corpus', type=int, default=2000)
+    args = parser.parse_args()
+
+    processor = SomaliPostProcessor.from_file(CORRECTIONS_PATH)
+    corpus = generated_corpus(args.corpus)
+    failures = check(processor, corpus)
+    print(f"{len(GOLDEN)} golden cases, {len(corpus)} generated texts: {failures} mismatches")
+    if failures:
+        return 1
+
+    chars = sum(map(len, corpus))
+    for name, func in (('legacy', legacy_improve_somali_text), ('compiled', processor)):
+        seconds = min(timeit.repeat(lambda: [func(text) for text in corpus], number=1, repeat=args.rounds))
+        print(f"{name:<9} {seconds * 1000:8.1f} ms  {len(corpus) / seconds:10.0f} texts/s  "
+              f"{chars / seconds / 1e6:6.2f} MB/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,21 +3,13 @@ K-Tech Somali Bot - A Telegram bot for managing tech learning communities.
 """
 import logging
 import asyncio
-import sqlite3
-import json
-import re
 import os
 import sys
 import signal
 import random
 from datetime import datetime, timedelta, time
-from collections import defaultdict
 from urllib.parse import urlparse
 import html
-import tempfile
-from PIL import Image
-import pytesseract
-from PIL import ImageEnhance
 from typing import Optional, List
 import traceback
 
@@ -27,14 +19,28 @@ from telegram.ext import (
     ContextTypes, CallbackQueryHandler, ChatMemberHandler
 )
 from telegram.constants import ParseMode
-from telegram.error import TelegramError, RetryAfter
+from telegram.error import TelegramError
 from telegram.request import HTTPXRequest
 import telegram
-from deep_translator import GoogleTranslator
 import psutil
 
 import config
+from dispatcher import SendDispatcher, PRIORITY_ALERT, PRIORITY_BROADCAST, PRIORITY_MODERATION
+from database import AsyncDatabase, GLOBAL_SCOPE, ALL_TIME, week_period, month_period
+from admin_cache import AdminCache
+from broadcast import Broadcaster
+from content_repository import get_content_repository
+from content_watcher import ContentWatcher
+from leaderboard import Leaderboard
+from moderation import ModerationEngine, LINK_KIND_LABELS
+from ocr_cache import OCRCache, hash_image
+from somali_postprocess import SomaliPostProcessor
+from translation import DISCLAIMER, TranslationBundle, TranslationService
+from ocr_worker import OCRBusyError, OCRWorkerPool
+from rate_limiter import RateLimiter
 from scheduler import ScheduleManager
+from shuffle_bag import ShuffleBags
+from timers import DurableTimers
 from utils.content_validator import ContentValidator
 
 # Set up logging
@@ -50,369 +56,101 @@ file_handler.setFormatter(logging.Formatter(
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 logger.addHandler(file_handler)
 
-class DatabaseManager:
-    """Manage database operations."""
-    
-    def __init__(self):
-        """Initialize database connection."""
-        self.conn = sqlite3.connect('bot.db')
-        self.cursor = self.conn.cursor()
-        self.setup_database()
-    
-    def setup_database(self):
-        """Create necessary tables if they don't exist."""
-        # User points and progress
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_points (
-                user_id INTEGER PRIMARY KEY,
-                points INTEGER DEFAULT 0,
-                last_updated TIMESTAMP,
-                completed_challenges TEXT DEFAULT '[]'
-            )
-        ''')
-        
-        # Challenge tracking
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS challenge_progress (
-                user_id INTEGER,
-                challenge_id TEXT,
-                category TEXT,
-                difficulty TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                completion_date TIMESTAMP,
-                PRIMARY KEY (user_id, challenge_id)
-            )
-        ''')
-        
-        # Quiz tracking
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quiz_progress (
-                user_id INTEGER,
-                quiz_id TEXT,
-                category TEXT,
-                correct BOOLEAN,
-                points_earned INTEGER DEFAULT 0,
-                attempt_date TIMESTAMP,
-                answer TEXT,
-                PRIMARY KEY (user_id, quiz_id)
-            )
-        ''')
-        
-        # Quiz history
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quiz_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                quiz_id TEXT,
-                category TEXT,
-                attempt_count INTEGER DEFAULT 1,
-                last_attempt_date TIMESTAMP,
-                best_score INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id, quiz_id) REFERENCES quiz_progress (user_id, quiz_id)
-            )
-        ''')
-        
-        # Translation cache
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS translation_cache (
-                original_text TEXT PRIMARY KEY,
-                translated_text TEXT,
-                language TEXT,
-                timestamp TIMESTAMP
-            )
-        ''')
-        
-        # Group management
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS group_settings (
-                group_id INTEGER PRIMARY KEY,
-                welcome_message TEXT,
-                rules TEXT,
-                spam_protection BOOLEAN DEFAULT TRUE,
-                link_filter BOOLEAN DEFAULT TRUE
-            )
-        ''')
-        
-        # User warnings
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_warnings (
-                user_id INTEGER,
-                group_id INTEGER,
-                warning_count INTEGER DEFAULT 0,
-                last_warning TIMESTAMP,
-                reason TEXT,
-                PRIMARY KEY (user_id, group_id)
-            )
-        ''')
-        
-        self.conn.commit()
-    
-    def get_user_progress(self, user_id: int) -> dict:
-        """Get user's challenge progress."""
-        self.cursor.execute(
-            "SELECT completed_challenges FROM user_points WHERE user_id = ?",
-            (user_id,)
-        )
-        result = self.cursor.fetchone()
-        if result:
-            return json.loads(result[0])
-        return []
-    
-    def update_challenge_progress(self, user_id: int, challenge_id: str, 
-                                category: str, difficulty: str, completed: bool = True):
-        """Update user's challenge progress."""
-        timestamp = datetime.now().isoformat()
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO challenge_progress 
-            (user_id, challenge_id, category, difficulty, completed, completion_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, challenge_id, category, difficulty, completed, timestamp))
-        self.conn.commit()
-    
-    def get_translation(self, text: str, language: str = 'so') -> str:
-        """Get cached translation if available."""
-        self.cursor.execute(
-            "SELECT translated_text FROM translation_cache WHERE original_text = ? AND language = ?",
-            (text, language)
-        )
-        result = self.cursor.fetchone()
-        return result[0] if result else None
-    
-    def cache_translation(self, original: str, translated: str, language: str = 'so'):
-        """Cache a translation."""
-        timestamp = datetime.now().isoformat()
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO translation_cache 
-            (original_text, translated_text, language, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (original, translated, language, timestamp))
-        self.conn.commit()
-    
-    def add_warning(self, user_id: int, group_id: int, reason: str):
-        """Add a warning for a user in a group."""
-        self.cursor.execute('''
-            INSERT INTO user_warnings (user_id, group_id, warning_count, last_warning, reason)
-            VALUES (?, ?, 1, ?, ?)
-            ON CONFLICT (user_id, group_id) DO UPDATE SET
-            warning_count = warning_count + 1,
-            last_warning = excluded.last_warning,
-            reason = excluded.reason
-        ''', (user_id, group_id, datetime.now().isoformat(), reason))
-        self.conn.commit()
-    
-    def get_warnings(self, user_id: int, group_id: int) -> int:
-        """Get number of warnings for a user in a group."""
-        self.cursor.execute(
-            "SELECT warning_count FROM user_warnings WHERE user_id = ? AND group_id = ?",
-            (user_id, group_id)
-        )
-        result = self.cursor.fetchone()
-        return result[0] if result else 0
-
-    def record_quiz_attempt(self, user_id: int, quiz_id: str, category: str, 
-                          correct: bool, points: int, answer: str):
-        """Record a quiz attempt in the database."""
-        timestamp = datetime.now().isoformat()
-        
-        # Record the attempt in quiz_progress
-        self.cursor.execute('''
-            INSERT INTO quiz_progress 
-            (user_id, quiz_id, category, correct, points_earned, attempt_date, answer)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT (user_id, quiz_id) DO UPDATE SET
-            correct = ?,
-            points_earned = CASE WHEN points_earned < ? THEN ? ELSE points_earned END,
-            attempt_date = ?,
-            answer = ?
-        ''', (
-            user_id, quiz_id, category, correct, points, timestamp, answer,
-            correct, points, points, timestamp, answer
-        ))
-        
-        # Update quiz history
-        self.cursor.execute('''
-            INSERT INTO quiz_history 
-            (user_id, quiz_id, category, attempt_count, last_attempt_date, best_score)
-            VALUES (?, ?, ?, 1, ?, ?)
-            ON CONFLICT (user_id, quiz_id) DO UPDATE SET
-            attempt_count = attempt_count + 1,
-            last_attempt_date = ?,
-            best_score = CASE WHEN best_score < ? THEN ? ELSE best_score END
-        ''', (
-            user_id, quiz_id, category, timestamp, points,
-            timestamp, points, points
-        ))
-        
-        # Update total user points
-        self.cursor.execute('''
-            INSERT INTO user_points (user_id, points, last_updated)
-            VALUES (?, ?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET
-            points = points + ?,
-            last_updated = ?
-        ''', (
-            user_id, points, timestamp,
-            points if correct else 0, timestamp
-        ))
-        
-        self.conn.commit()
-    
-    def get_quiz_stats(self, user_id: int) -> dict:
-        """Get quiz statistics for a user."""
-        self.cursor.execute('''
-            SELECT 
-                COUNT(*) as total_attempts,
-                SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct_answers,
-                SUM(points_earned) as total_points,
-                COUNT(DISTINCT category) as categories_attempted
-            FROM quiz_progress
-            WHERE user_id = ?
-        ''', (user_id,))
-        
-        result = self.cursor.fetchone()
-        if result:
-            return {
-                'total_attempts': result[0],
-                'correct_answers': result[1] or 0,
-                'total_points': result[2] or 0,
-                'categories_attempted': result[3],
-                'accuracy': (result[1] / result[0] * 100) if result[0] > 0 else 0
-            }
-        return {
-            'total_attempts': 0,
-            'correct_answers': 0,
-            'total_points': 0,
-            'categories_attempted': 0,
-            'accuracy': 0
-        }
-    
-    def get_quiz_history(self, user_id: int, category: str = None, limit: int = 10) -> list:
-        """Get recent quiz history for a user."""
-        query = '''
-            SELECT 
-                qp.quiz_id,
-                qp.category,
-                qp.correct,
-                qp.points_earned,
-                qp.attempt_date,
-                qh.attempt_count,
-                qh.best_score
-            FROM quiz_progress qp
-            JOIN quiz_history qh ON qp.user_id = qh.user_id AND qp.quiz_id = qh.quiz_id
-            WHERE qp.user_id = ?
-        '''
-        params = [user_id]
-        
-        if category:
-            query += ' AND qp.category = ?'
-            params.append(category)
-        
-        query += ' ORDER BY qp.attempt_date DESC LIMIT ?'
-        params.append(limit)
-        
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
-
 class CustomMessageHandler:
     """Handle message processing and moderation."""
     
-    def __init__(self, db_manager: DatabaseManager, bot=None):
-        self.user_message_counts = defaultdict(list)
+    def __init__(self, db_manager: AsyncDatabase, bot=None):
+        self.rate_limiter = RateLimiter()
+        self.spam_protection_disabled = set()  # Groups with spam_protection turned off
         self.db_manager = db_manager
-        self.spam_tracker = defaultdict(list)
-        self.recently_warned_users = set()  # Initialize the set to track recently warned users
+        self.recently_warned_users = {}  # user_id -> loop time their warning cooldown ends
+        self._warned_prune_at = 0.0
         self.bot = bot  # Store reference to the bot
-        # Comprehensive regex pattern for URLs
-        self.link_pattern = re.compile(
-            r'(?:(?:https?:\/\/)?'  # Optional protocol
-            r'(?:(?:[\w-]+\.)+[\w-]+|'  # domain name
-            r'localhost|'  # localhost
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP address
-            r'(?::\d+)?'  # Optional port
-            r'(?:\/\S*)?)',  # Optional path
-            re.IGNORECASE
-        )
-
-    def check_spam(self, user_id: int, message_time: datetime) -> bool:
-        """Check if user is spamming."""
-        self.user_message_counts[user_id] = [
-            time for time in self.user_message_counts[user_id]
-            if (message_time - time).total_seconds() < 60
-        ]
-        self.user_message_counts[user_id].append(message_time)
-        return len(self.user_message_counts[user_id]) > config.MAX_MESSAGES_PER_MINUTE
+        # Link patterns and keyword lists, compiled once
+        self.moderation = ModerationEngine()
+
+    def check_spam(self, chat_id: int, user_id: int) -> bool:
+        """Check if user is sending messages faster than the group allows."""
+        if chat_id in self.spam_protection_disabled:
+            return False
+        return self.rate_limiter.hit(chat_id, user_id)
+
+    def load_group_settings(self, rows):
+        """Apply (group_id, spam_protection, messages, window_seconds) rows from group_settings."""
+        for group_id, spam_protection, messages, window_seconds in rows:
+            if spam_protection is not None and not spam_protection:
+                self.spam_protection_disabled.add(group_id)
+            if messages or window_seconds:
+                self.rate_limiter.set_chat_limit(group_id, messages, window_seconds)
 
     async def check_links(self, message: Message) -> tuple[bool, str]:
         """Check for unauthorized links in message."""
-        if not message.text and not message.caption:
-            return False, ""
-            
         text = message.text or message.caption
+        if not text:
+            return False, ""
+        should_delete, _, warning_message = self._link_verdict(self.moderation.scan(text))
+        return should_delete, warning_message
+
+    # Why a message was removed, completing "Your message ... was removed because it ..."
+    LINK_REASON = "contained a potential link or external reference"
+    BLOCKED_WORD_REASON = "contained content that is not allowed in this group"
+    SPAM_REASON = "looked like spam or advertising"
+
+    def _link_verdict(self, scan) -> tuple[bool, str, str]:
+        """Decide whether the links found by a scan should get the message removed.
+
+        Returns (should_delete, reason, warning_message).
+        """
+        links = scan.links
+        if not links:
+            return False, "", ""
         
-        # Use multiple pattern matching approaches for better coverage
-        # 1. Standard URL detection with the existing pattern
-        standard_links = self.link_pattern.findall(text)
-        
-        # 2. Specific patterns for common platforms
-        telegram_links = re.findall(r'(?:t\.me|telegram\.me|telegram\.dog)\/\S+', text, re.IGNORECASE)
-        shorteners = re.findall(r'(?:bit\.ly|tinyurl\.com|goo\.gl|is\.gd|t\.co)\/\S+', text, re.IGNORECASE)
-        
-        # 3. Domain mentions without protocol (example.com format)
-        domain_mentions = re.findall(r'\b[\w-][\w-]+\.[a-zA-Z]{2,}\b', text)
-        
-        # 4. Telegram username mentions
-        mentions = re.findall(r'@[\w_]+', text)
+        # Log all detected links for debugging, grouped by type
+        link_types = {label: [] for label in LINK_KIND_LABELS.values()}
+        for link in links:
+            link_types[LINK_KIND_LABELS[link.kind]].append(link.text)
+        logger.info(f"Found potential links in message: {link_types}")
         
-        # Combine all detected links
-        all_links = standard_links + telegram_links + shorteners + domain_mentions + mentions
+        # All links point at allowed domains
+        if not self.moderation.disallowed_links(scan):
+            return False, "", ""
         
-        # Optional: Filter out allowed mentions if needed
-        allowed_mentions = [f"@{config.BOT_USERNAME}"] if hasattr(config, 'BOT_USERNAME') else []
-        all_links = [link for link in all_links if link not in allowed_mentions]
+        blocked = self.moderation.blocked_links(scan)
+        if blocked:
+            logger.info(f"Message links to blocked domains: {[link.text for link in blocked]}")
         
-        # Log all detected links for debugging
-        if all_links:
-            # Group links by type for better logging
-            link_types = {
-                'Standard URLs': standard_links,
-                'Telegram links': telegram_links,
-                'URL shorteners': shorteners,
-                'Domain mentions': domain_mentions,
-                'Username mentions': mentions
-            }
-            logger.info(f"Found potential links in message: {link_types}")
-            
-            # Check if any whitelisted domains should be allowed
-            if hasattr(config, 'ALLOWED_DOMAINS'):
-                # Keep only links that aren't in allowed domains
-                filtered_links = []
-                for link in all_links:
-                    is_allowed = False
-                    for allowed_domain in config.ALLOWED_DOMAINS:
-                        if allowed_domain.lower() in link.lower():
-                            is_allowed = True
-                            break
-                    if not is_allowed:
-                        filtered_links.append(link)
-                
-                if not filtered_links:  # All links were allowed
-                    return False, ""
-                all_links = filtered_links
-            
-            return True, (
-                "⚠️ Links, URLs, or external references are not allowed in this group "
-                "for security reasons.\n\n"
-                "If you need to share programming resources, please use:\n"
-                "1. Code snippets directly in the chat\n"
-                "2. Contact an admin to post the link for you\n"
-                "3. Use private messaging for sharing links"
+        return True, self.LINK_REASON, (
+            "⚠️ Links, URLs, or external references are not allowed in this group "
+            "for security reasons.\n\n"
+            "If you need to share programming resources, please use:\n"
+            "1. Code snippets directly in the chat\n"
+            "2. Contact an admin to post the link for you\n"
+            "3. Use private messaging for sharing links"
+        )
+
+    def _keyword_verdict(self, scan) -> tuple[bool, str, str]:
+        """Decide whether blocked words or spam phrases should get the message removed.
+
+        Returns (should_delete, reason, warning_message).
+        """
+        if scan.blocked_words:
+            logger.info(f"Found blocked words in message: {scan.blocked_words}")
+            return True, self.BLOCKED_WORD_REASON, (
+                "⚠️ Your message was removed because it contained content "
+                "that is not allowed in this group."
             )
-        
-        return False, ""
+        if scan.spam_words:
+            logger.info(f"Found spam phrases in message: {scan.spam_words}")
+            return True, self.SPAM_REASON, (
+                "⚠️ Your message was removed because it looked like spam or advertising. "
+                "Promotions are not allowed in this group."
+            )
+        return False, "", ""
 
-    async def moderate_message(self, message: Message) -> tuple[bool, str]:
+    async def moderate_message(self, message: Message) -> tuple[bool, str, str]:
         """
-        Moderate a message and return True if it should be deleted, along with the warning message.
+        Moderate a message and return True if it should be deleted, along with why
+        (see LINK_REASON and friends) and the warning message.
         """
         # Log message for debugging
         log_content = message.text or message.caption or "No text content"
@@ -420,48 +158,48 @@ class CustomMessageHandler:
         
         # If message is in private chat, allow all content
         if message.chat.type == "private":
-            return False, ""
+            return False, "", ""
             
         # Skip moderation of media types if needed
         if message.photo and hasattr(config, 'ALLOW_IMAGES') and config.ALLOW_IMAGES:
             logger.info("Allowing photo as per configuration")
-            return False, ""
+            return False, "", ""
                 
         if message.video and hasattr(config, 'ALLOW_VIDEOS') and config.ALLOW_VIDEOS:
             logger.info("Allowing video as per configuration")
-            return False, ""
+            return False, "", ""
                 
         if message.document and hasattr(config, 'ALLOW_DOCUMENTS') and config.ALLOW_DOCUMENTS:
             logger.info("Allowing document as per configuration")
-            return False, ""
+            return False, "", ""
 
-        # Check for unauthorized links
-        has_link, warning_message = await self.check_links(message)
-        if has_link:
+        # Check for unauthorized links, blocked words and spam phrases in one scan
+        text = message.text or message.caption
+        scan = self.moderation.scan(text) if text else None
+        should_delete, reason, warning_message = self._link_verdict(scan) if scan else (False, "", "")
+        if scan and not should_delete:
+            should_delete, reason, warning_message = self._keyword_verdict(scan)
+        if should_delete:
             # Add the user to a temporary warning list to avoid duplicate warnings
-            user_id = message.from_user.id
-            if user_id not in self.recently_warned_users:
-                self.recently_warned_users.add(user_id)
-                
-                # Schedule removal from warning list after certain time
-                asyncio.create_task(self.remove_from_warned(user_id, 60))
-                
-                # Add reference to the original message for context
-                warning_with_context = (
-                    f"Your message in {message.chat.title} was removed because it "
-                    f"contained a potential link or external reference.\n\n{warning_message}"
-                )
-                
-                # We'll let the TelegramBot class handle the actual sending of warnings
-                # since we now just return the warning message along with the delete flag
-                return True, warning_message
-
-        return False, ""
-
-    async def remove_from_warned(self, user_id: int, delay: int):
-        """Remove a user from the recently warned list after a delay."""
-        await asyncio.sleep(delay)
-        self.recently_warned_users.discard(user_id)
+            if self.mark_warned(message.from_user.id, 60):
+                # TelegramBot sends the warning and records it
+                return True, reason, warning_message
+
+        return False, "", ""
+
+    def mark_warned(self, user_id: int, cooldown: float) -> bool:
+        """Start a user's warning cooldown; returns False if one is still running."""
+        now = asyncio.get_running_loop().time()
+        if self.recently_warned_users.get(user_id, 0.0) > now:
+            return False
+        if now >= self._warned_prune_at:
+            # Drop expired cooldowns at most once per cooldown period
+            self.recently_warned_users = {
+                uid: until for uid, until in self.recently_warned_users.items() if until > now
+            }
+            self._warned_prune_at = now + cooldown
+        self.recently_warned_users[user_id] = now + cooldown
+        return True
 
 class TelegramBot:
     """Main bot class."""
@@ -478,14 +216,28 @@ class TelegramBot:
             ))
             .build()
         )
-        self.db_manager = DatabaseManager()
+        self.db_manager = AsyncDatabase()
+        self.leaderboard = Leaderboard()
+        self.shuffle_bags = ShuffleBags(self.db_manager.queue_save_shuffle_bag)
+        self.admin_cache = AdminCache()
+        self.dispatcher = SendDispatcher()
+        self.broadcaster = Broadcaster(self.application, self.db_manager, self.dispatcher)
+        self.timers = DurableTimers(self.db_manager)
+        self.timers.register('clear_warnings', self._clear_user_warnings)
+        self.timers.register('delete_message', self._delete_message)
+        self.content = get_content_repository()
+        self.content_watcher = ContentWatcher(self.content)
         self.msg_handler = CustomMessageHandler(self.db_manager, self)
         self.challenges_cache = None
         
-        # Configure Tesseract path - adjust this path based on your system
-        if os.name == 'nt':  # Windows
-            pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        # On Linux/Mac, Tesseract should be in PATH
+        # OCR runs in worker processes; they find Tesseract via config.TESSERACT_PATH
+        self.ocr_pool = OCRWorkerPool()
+        self.ocr_cache = OCRCache(self.db_manager)
+        self.translator = TranslationService(
+            self.db_manager,
+            postprocess=SomaliPostProcessor.from_file(),
+            bundle=TranslationBundle.load(config.TRANSLATION_BUNDLE_PATH)
+        )
         
         logger.info("Bot initialized with database-backed challenge tracking")
         self.setup_handlers()
@@ -506,10 +258,22 @@ class TelegramBot:
         self.application.add_handler(CommandHandler("rules", self.rules_command))
         self.application.add_handler(CommandHandler("quizstats", self.quiz_stats_command))
         self.application.add_handler(CommandHandler("progress", self.progress_command))
+        self.application.add_handler(CommandHandler("dbstats", self.db_stats_command))
+        self.application.add_handler(CommandHandler("metrics", self.metrics_command))
+        self.application.add_handler(CommandHandler("ratelimit", self.rate_limit_command))
 
         # Group event handlers
         self.application.add_handler(ChatMemberHandler(self.handle_member_join, ChatMemberHandler.CHAT_MEMBER))
         
+        # OCR of private screenshots takes seconds. block=False runs it as a task,
+        # so other updates are handled meanwhile and OCRWorkerPool's per-user and
+        # queue limits apply. Registered first, so these photos don't reach handle_message.
+        self.application.add_handler(MessageHandler(
+            filters.PHOTO & filters.ChatType.PRIVATE,
+            self.handle_photo,
+            block=False
+        ))
+        
         # Message handlers - handle ALL types of messages
         self.application.add_handler(MessageHandler(
             filters.ALL & ~filters.COMMAND,  # Handle all non-command messages
@@ -550,9 +314,21 @@ class TelegramBot:
             bot = self.application.bot
             self.msg_handler.bot = bot
             
+            # Outgoing announcements and warnings are queued through the dispatcher
+            self.dispatcher.start()
+            
             # Load challenges on startup
             self.load_challenges()
             
+            # Seed the in-memory leaderboard from the points table
+            self.leaderboard.load(await self.db_manager.get_all_points())
+            
+            # Restore each user's no-repeat order for challenges, quizzes and tips
+            self.shuffle_bags.load(await self.db_manager.get_shuffle_bags())
+            
+            # Per-group rate limits
+            self.msg_handler.load_group_settings(await self.db_manager.get_group_rate_limits())
+            
             # Setup scheduled tasks
             job_queue = self.application.job_queue
             
@@ -575,6 +351,19 @@ class TelegramBot:
             self.scheduler = ScheduleManager(self.application, self)
             await self.scheduler.start_scheduler()
             
+            # Run moderation timers, including any that came due while stopped
+            self.timers.start()
+            
+            # Move the old translation cache into the new table in the background
+            self.translator.start()
+            
+            # Finish broadcasts that were cut off by the last shutdown
+            self.broadcaster.start()
+            
+            # Pick up edits to content files without a restart
+            if config.CONTENT_WATCH_ENABLED:
+                self.content_watcher.start()
+            
             # Create stop event
             stop_event = asyncio.Event()
             
@@ -599,12 +388,20 @@ class TelegramBot:
                 logger.info("Shutting down...")
                 if hasattr(self, 'scheduler'):
                     self.scheduler.stop_scheduler()
+                await self.content_watcher.stop()
+                await self.timers.stop()
+                await self.translator.stop()
+                await self.broadcaster.stop()
+                await self.dispatcher.stop()
+                self.ocr_pool.shutdown()
                 if hasattr(self.application, 'updater') and self.application.updater.running:
                     await self.application.updater.stop()
                 if hasattr(self.application, 'stop'):
                     await self.application.stop()
                 if hasattr(self.application, 'shutdown'):
                     await self.application.shutdown()
+                # Flush queued writes before the process exits
+                await self.db_manager.close()
                 logger.info("Bot stopped gracefully")
                 # Clean up PID file
                 try:
@@ -624,17 +421,40 @@ class TelegramBot:
             message = f"⚠️ Exception caught: {context.error}\n\n{''.join(tb_string)}"
             for admin_id in config.ADMIN_IDS:
                 try:
-                    await context.bot.send_message(chat_id=admin_id, text=message[:4000])
+                    await self.dispatcher.send_message(
+                        context.bot, admin_id, message[:4000], priority=PRIORITY_ALERT
+                    )
                 except Exception as e:
                     logger.error(f"Failed to send error message to admin {admin_id}: {e}")
     
+    @staticmethod
+    def _log_send_error(future: asyncio.Future):
+        """Done callback for messages queued without waiting."""
+        error = None if future.cancelled() else future.exception()
+        if isinstance(error, telegram.error.Forbidden):
+            logger.info(f"Queued message not delivered, the user hasn't started the bot: {error}")
+        elif error is not None:
+            logger.error(f"Queued message failed: {error}")
+
     async def _delete_after_delay(self, message, delay_seconds: int):
         """Helper to delete messages after a delay."""
         try:
-            await asyncio.sleep(delay_seconds)
-            await message.delete()
+            await self.timers.schedule(
+                'delete_message',
+                f"{message.chat_id}:{message.message_id}",
+                delay_seconds,
+                {'chat_id': message.chat_id, 'message_id': message.message_id}
+            )
         except Exception as e:
-            logger.error(f"Failed to delete message after delay: {e}")
+            logger.error(f"Failed to schedule message deletion: {e}")
+
+    async def _delete_message(self, data: dict):
+        """Timer action: delete a message scheduled by _delete_after_delay."""
+        try:
+            await self.application.bot.delete_message(data['chat_id'], data['message_id'])
+        except telegram.error.BadRequest as e:
+            # Already deleted, or too old to delete; retrying won't help
+            logger.warning(f"Could not delete message {data['message_id']} in {data['chat_id']}: {e}")
 
     async def first_time_setup(self):
         """Check if this is the first run and send introduction if needed."""
@@ -681,9 +501,11 @@ class TelegramBot:
                             logger.error(f"Failed to check bot membership in group {group_id}: {e}")
                             continue
                             
-                        await self.application.bot.send_message(
-                            chat_id=group_id,
-                            text=intro_message,
+                        await self.dispatcher.send_message(
+                            self.application.bot,
+                            group_id,
+                            intro_message,
+                            priority=PRIORITY_BROADCAST,
                             parse_mode=ParseMode.MARKDOWN
                         )
                         logger.info(f"Sent introduction message to group {group_id}")
@@ -734,9 +556,10 @@ class TelegramBot:
             "*Interactive Features*\n"
             "/quiz - Take a quiz\n"
             "/points - Check your points\n"
-            "/leaderboard - View top performers\n\n"
+            "/leaderboard - View top performers (add week, month or group)\n\n"
             "*Group Management*\n"
-            "/groupinfo - Get group information"
+            "/groupinfo - Get group information\n"
+            "/ratelimit - Show or set the group's message rate limit (admins)"
         )
         await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
 
@@ -769,8 +592,7 @@ class TelegramBot:
     async def resources_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /resources command."""
         try:
-            with open('resources/learning_resources.json', 'r', encoding='utf-8') as f:
-                resources = json.load(f)
+            resources = self.content.learning_resources
             
             categories = list(resources.keys())
             keyboard = []
@@ -793,12 +615,11 @@ class TelegramBot:
     async def tip_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Send a random programming tip."""
         try:
-            with open('resources/tips.json', 'r', encoding='utf-8') as f:
-                tips = json.load(f)
+            tips = self.content.tips
             
             # Get random category and tip
             category = random.choice(list(tips.keys()))
-            tip = random.choice(tips[category])
+            tip = self.shuffle_bags.draw(update.effective_user.id, f"tip:{category}", tips[category])
             
             message = (
                 f"💡 *{tip['title']}*\n\n"
@@ -820,8 +641,7 @@ class TelegramBot:
     async def quiz_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start a quiz."""
         try:
-            with open('resources/quizzes.json', 'r', encoding='utf-8') as f:
-                quizzes = json.load(f)
+            quizzes = self.content.quizzes
             
             categories = list(quizzes.keys())
             keyboard = []
@@ -845,17 +665,14 @@ class TelegramBot:
         """Show user's points."""
         user_id = update.effective_user.id
         try:
-            # Get points from database
-            self.db_manager.cursor.execute(
-                "SELECT points FROM user_points WHERE user_id = ?",
-                (user_id,)
-            )
-            result = self.db_manager.cursor.fetchone()
-            points = result[0] if result else 0
+            points = self.leaderboard.points(user_id)
+            rank = self.leaderboard.rank(user_id)
+            rank_line = f"Your rank: *#{rank}* of {len(self.leaderboard)}\n" if rank else ""
             
             await update.message.reply_text(
                 f"🏆 *Your Points*\n\n"
                 f"You have earned *{points}* points!\n"
+                f"{rank_line}"
                 f"Keep participating to earn more.",
                 parse_mode=ParseMode.MARKDOWN
             )
@@ -866,24 +683,44 @@ class TelegramBot:
             )
 
     async def leaderboard_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Show the leaderboard."""
+        """Show the leaderboard.
+
+        Usage: /leaderboard [week|month] [group]
+        """
         try:
-            # Get top 10 users from database
-            self.db_manager.cursor.execute(
-                "SELECT user_id, points FROM user_points ORDER BY points DESC LIMIT 10"
-            )
-            results = self.db_manager.cursor.fetchall()
+            args = [arg.lower() for arg in (context.args or [])]
+            by_group = 'group' in args
+            if by_group and update.effective_chat.type == 'private':
+                await update.message.reply_text("The group leaderboard only works in groups!")
+                return
+            
+            now = datetime.now()
+            if 'week' in args:
+                period, title = week_period(now), "This Week's Leaderboard"
+            elif 'month' in args:
+                period, title = month_period(now), "This Month's Leaderboard"
+            else:
+                period, title = ALL_TIME, "Leaderboard"
+            if by_group:
+                title = f"{title} ({update.effective_chat.title})"
+            
+            if by_group or period != ALL_TIME:
+                # Served from the points_rollup index
+                scope = str(update.effective_chat.id) if by_group else GLOBAL_SCOPE
+                results = await self.db_manager.get_rollup_top(scope, period, 10)
+            else:
+                results = self.leaderboard.top(10)
             
             if not results:
                 await update.message.reply_text(
-                    "🏆 *Leaderboard*\n\n"
+                    f"🏆 *{title}*\n\n"
                     "No points recorded yet.\n"
                     "Be the first to earn points!",
                     parse_mode=ParseMode.MARKDOWN
                 )
                 return
             
-            message = "🏆 *Leaderboard*\n\n"
+            message = f"🏆 *{title}*\n\n"
             for i, (user_id, points) in enumerate(results, 1):
                 message += f"{i}. User {user_id}: {points} points\n"
             
@@ -925,11 +762,6 @@ class TelegramBot:
                     await self._handle_challenge_answer(update, context)
                     return
                 
-                # Handle photos for OCR in private chat
-                if message.photo:
-                    await self.handle_photo(update, context)
-                    return
-                
                 # Handle other private chat interactions
                 await message.reply_text(
                     "👋 Ku soo dhawoow K-Tech Somali Bot!\n\n"
@@ -942,10 +774,11 @@ class TelegramBot:
                 return
                     
             # From here on, we're handling group messages
-            # Get user's status in the group
+            # Get user's status in the group from the cached admin roster
             try:
-                chat_member = await context.bot.get_chat_member(update.effective_chat.id, update.effective_user.id)
-                is_admin = chat_member.status in ['administrator', 'creator'] or update.effective_user.id in config.ADMIN_IDS
+                is_admin = await self.admin_cache.is_admin(
+                    context.bot, update.effective_chat.id, update.effective_user.id
+                )
             except Exception as e:
                 logger.error(f"Error checking user status: {e}")
                 is_admin = False
@@ -956,76 +789,46 @@ class TelegramBot:
                 return
 
             # Check rate limiting
-            if self.msg_handler.check_spam(update.effective_user.id, datetime.now()):
+            if self.msg_handler.check_spam(update.effective_chat.id, update.effective_user.id):
                 logger.warning(f"Rate limit exceeded for user: {update.effective_user.id}")
                 try:
-                    warning = await context.bot.send_message(
-                        chat_id=update.effective_user.id,
-                        text="⚠️ Fadlan sug daqiiqad. Farriimo badan ayaad diraysaa."
-                    )
+                    # Queued, not awaited: the notice may wait on the flood limits
+                    self.dispatcher.submit_message(
+                        context.bot,
+                        update.effective_user.id,
+                        "⚠️ Fadlan sug daqiiqad. Farriimo badan ayaad diraysaa.",
+                        priority=PRIORITY_MODERATION
+                    ).add_done_callback(self._log_send_error)
                     await message.delete()
                 except Exception as e:
                     logger.error(f"Error handling rate limit message: {e}")
                     return
                     
             # Moderate message
-            should_delete, warning_message = await self.msg_handler.moderate_message(message)
+            should_delete, reason, warning_message = await self.msg_handler.moderate_message(message)
             
             if should_delete:
                 try:
                     # Delete the message first
                     await message.delete()
                     
-                    # Send warning message privately to the user
-                    try:
-                        # Add reference to the original message for context
-                        warning_with_context = (
-                            f"Your message in {message.chat.title} was removed because it "
-                            f"contained a potential link or external reference.\n\n{warning_message}"
-                        )
-                        await context.bot.send_message(
-                            chat_id=update.effective_user.id,
-                            text=warning_with_context,
-                            disable_web_page_preview=True
-                        )
-                        
-                        logger.info(f"Sent private warning to user {update.effective_user.id}")
-                        
-                        # Let the group know a warning was sent privately (optional)
-                        if hasattr(config, 'NOTIFY_GROUP_ON_DELETION') and config.NOTIFY_GROUP_ON_DELETION:
-                            group_notification = await context.bot.send_message(
-                                chat_id=update.effective_chat.id,
-                                text=f"⚠️ {message.from_user.mention_html()}'s message was removed. A detailed explanation has been sent privately.",
-                                parse_mode=ParseMode.HTML,
-                                disable_notification=True
-                            )
-                            
-                            # Auto-delete group notification after 15 seconds
-                            if config.AUTO_DELETE_WARNINGS:
-                                asyncio.create_task(self._delete_after_delay(group_notification, 15))
-                    except telegram.error.Forbidden:
-                        # If bot can't message user privately, send warning in group
-                        logger.warning(f"Could not message user {update.effective_user.id} privately, sending warning to group")
-                        group_warning = await context.bot.send_message(
-                            chat_id=update.effective_chat.id,
-                            text=f"⚠️ {message.from_user.mention_html()}, fadlan ila bilow chat gaar ah si aad u hesho digniin faahfaahsan.\n\n{warning_message}",
-                            parse_mode=ParseMode.HTML,
-                            disable_web_page_preview=True
-                        )
-                        
-                        # Auto-delete group warning after 30 seconds
-                        if config.AUTO_DELETE_WARNINGS:
-                            asyncio.create_task(self._delete_after_delay(group_warning, 30))
+                    # Deliver the warning in the background so the handler doesn't
+                    # wait on the flood limits
+                    context.application.create_task(
+                        self._send_moderation_warning(context.bot, message, reason, warning_message),
+                        update=update
+                    )
                     
                     # Add warning to database
-                    self.db_manager.add_warning(
+                    await self.db_manager.add_warning(
                         user_id=update.effective_user.id,
                         group_id=update.effective_chat.id,
-                        reason=warning_message
+                        reason=warning_message,
+                        durable=True  # read back just below
                     )
                     
                     # Check if user has multiple warnings and needs to be restricted
-                    warnings_count = self.db_manager.get_warnings(
+                    warnings_count = await self.db_manager.get_warnings(
                         user_id=update.effective_user.id,
                         group_id=update.effective_chat.id
                     )
@@ -1049,6 +852,60 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Error in message handler: {e}", exc_info=True)
 
+    async def _send_moderation_warning(self, bot, message: Message, reason: str, warning_message: str):
+        """Tell a user privately why their message was removed, or warn them in the group."""
+        user_id = message.from_user.id
+        chat_id = message.chat.id
+        try:
+            # Send warning message privately to the user
+            try:
+                # Add reference to the original message for context
+                warning_with_context = (
+                    f"Your message in {message.chat.title} was removed because it "
+                    f"{reason}.\n\n{warning_message}"
+                )
+                await self.dispatcher.send_message(
+                    bot,
+                    user_id,
+                    warning_with_context,
+                    priority=PRIORITY_MODERATION,
+                    disable_web_page_preview=True
+                )
+                
+                logger.info(f"Sent private warning to user {user_id}")
+                
+                # Let the group know a warning was sent privately (optional)
+                if hasattr(config, 'NOTIFY_GROUP_ON_DELETION') and config.NOTIFY_GROUP_ON_DELETION:
+                    group_notification = await self.dispatcher.send_message(
+                        bot,
+                        chat_id,
+                        f"⚠️ {message.from_user.mention_html()}'s message was removed. A detailed explanation has been sent privately.",
+                        priority=PRIORITY_MODERATION,
+                        parse_mode=ParseMode.HTML,
+                        disable_notification=True
+                    )
+                    
+                    # Auto-delete group notification after 15 seconds
+                    if config.AUTO_DELETE_WARNINGS:
+                        await self._delete_after_delay(group_notification, 15)
+            except telegram.error.Forbidden:
+                # If bot can't message user privately, send warning in group
+                logger.warning(f"Could not message user {user_id} privately, sending warning to group")
+                group_warning = await self.dispatcher.send_message(
+                    bot,
+                    chat_id,
+                    f"⚠️ {message.from_user.mention_html()}, fadlan ila bilow chat gaar ah si aad u hesho digniin faahfaahsan.\n\n{warning_message}",
+                    priority=PRIORITY_MODERATION,
+                    parse_mode=ParseMode.HTML,
+                    disable_web_page_preview=True
+                )
+                
+                # Auto-delete group warning after 30 seconds
+                if config.AUTO_DELETE_WARNINGS:
+                    await self._delete_after_delay(group_warning, 30)
+        except Exception as e:
+            logger.error(f"Error sending moderation warning to user {user_id}: {e}")
+
     async def apply_temporary_restriction(self, user_id: int, chat_id: int, days: int, context: ContextTypes.DEFAULT_TYPE):
         """Apply a temporary restriction on a user in a group."""
         try:
@@ -1068,53 +925,40 @@ class TelegramBot:
                 until_date=until_date
             )
             
-            # Notify the user about the restriction
-            try:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=f"⚠️ Due to multiple violations of group rules, your ability to send messages "
-                         f"in the group has been temporarily restricted for {days} days.\n\n"
-                         f"Please review the group rules. Your restriction will be lifted automatically "
-                         f"after {days} days."
-                )
-            except telegram.error.Forbidden:
-                pass  # Can't message user directly
+            # Notify the user about the restriction; queued, not awaited
+            self.dispatcher.submit_message(
+                context.bot,
+                user_id,
+                f"⚠️ Due to multiple violations of group rules, your ability to send messages "
+                f"in the group has been temporarily restricted for {days} days.\n\n"
+                f"Please review the group rules. Your restriction will be lifted automatically "
+                f"after {days} days.",
+                priority=PRIORITY_MODERATION
+            ).add_done_callback(self._log_send_error)
                 
             # Log the restriction
             logger.warning(f"User {user_id} has been restricted in chat {chat_id} for {days} days")
             
-            # Create a job to remove all warnings after restriction period
-            job_name = f"clear_warnings_{user_id}_{chat_id}"
-            context.job_queue.run_once(
-                self._clear_user_warnings,
-                when=days * 86400,  # Convert days to seconds
-                data={
-                    'user_id': user_id,
-                    'chat_id': chat_id
-                },
-                name=job_name
+            # Remove all warnings after the restriction period; survives restarts
+            await self.timers.schedule(
+                'clear_warnings',
+                f"{user_id}:{chat_id}",
+                days * 86400,  # Convert days to seconds
+                {'user_id': user_id, 'chat_id': chat_id}
             )
             
         except Exception as e:
             logger.error(f"Failed to restrict user {user_id}: {e}")
     
-    async def _clear_user_warnings(self, context: ContextTypes.DEFAULT_TYPE):
-        """Clear all warnings for a user after restriction period."""
-        job_data = context.job.data
-        user_id = job_data.get('user_id')
-        chat_id = job_data.get('chat_id')
+    async def _clear_user_warnings(self, data: dict):
+        """Timer action: clear all warnings for a user after restriction period."""
+        user_id = data.get('user_id')
+        chat_id = data.get('chat_id')
         
-        try:
-            # Clear warnings in database
-            self.db_manager.cursor.execute(
-                "DELETE FROM user_warnings WHERE user_id = ? AND group_id = ?",
-                (user_id, chat_id)
-            )
-            self.db_manager.conn.commit()
-            
-            logger.info(f"Cleared warnings for user {user_id} in chat {chat_id} after restriction period")
-        except Exception as e:
-            logger.error(f"Failed to clear warnings for user {user_id}: {e}")
+        # Clear warnings in database; a failure is retried by the timer
+        await self.db_manager.clear_warnings(user_id, chat_id, durable=True)
+        
+        logger.info(f"Cleared warnings for user {user_id} in chat {chat_id} after restriction period")
 
     async def handle_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button clicks."""
@@ -1209,7 +1053,7 @@ class TelegramBot:
                 difficulty = data_parts[3]
 
             # Get a challenge
-            challenge = self.get_challenge(category, difficulty)
+            challenge = self.get_challenge(category, difficulty, user_id=query.from_user.id)
             
             if not challenge:
                 await query.edit_message_text("Sorry, couldn't load challenge. Please try again.")
@@ -1254,6 +1098,24 @@ class TelegramBot:
                 parse_mode=ParseMode.HTML
             )
 
+    @staticmethod
+    def _parse_challenge_callback(data: str, prefix: str) -> tuple:
+        """Split '<prefix>[category_]difficulty_id' into (category, difficulty, id)."""
+        parts = data[len(prefix):].split('_')
+        if len(parts) < 2:
+            return None, parts[0] if parts else None, None
+        category = '_'.join(parts[:-2]) or None
+        return category, parts[-2], parts[-1]
+
+    def _resolve_challenge(self, challenge_id: Optional[str], category: Optional[str],
+                           difficulty: Optional[str], context: ContextTypes.DEFAULT_TYPE) -> Optional[dict]:
+        """Find the challenge a button refers to, falling back to the user's current one."""
+        if challenge_id:
+            entry = self.content.find_challenge(challenge_id, category, difficulty)
+            if entry:
+                return entry.as_dict()
+        return context.user_data.get('current_challenge')
+
     async def handle_challenge_hint(self, query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
         """Handle challenge hint request."""
         try:
@@ -1298,12 +1160,9 @@ class TelegramBot:
             
             logger.info(f"Loading hint for category={category}, difficulty={difficulty}, id={challenge_id}")
             
-            # Load challenges from file
-            try:
-                with open('resources/programming_challenges.json', 'r', encoding='utf-8') as f:
-                    challenges = json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load challenges file: {e}")
+            challenges = self.content.challenges
+            if not challenges:
+                logger.error("Challenges are not loaded")
                 await self._safe_edit_message(query,
                     "Sorry, couldn't load the challenges. Please try again later.",
                     InlineKeyboardMarkup([[
@@ -1317,13 +1176,12 @@ class TelegramBot:
             if category not in challenges and category.startswith('programming'):
                 category = 'programming'
             
-            # Find the challenge
+            # Find the challenge by id, whichever source it came from
             challenge = None
-            if category in challenges and difficulty in challenges.get(category, {}):
-                for c in challenges[category][difficulty]:
-                    if str(c.get('id')) == challenge_id:
-                        challenge = c
-                        break
+            entry = self.content.find_challenge(challenge_id, category, difficulty)
+            if entry:
+                challenge = entry.challenge
+                category, difficulty = entry.category, entry.difficulty
             
             if challenge and 'hint' in challenge:
                 # Format the hint message with HTML
@@ -1409,7 +1267,7 @@ class TelegramBot:
             
         try:
             category = query.data.replace('quiz_', '')
-            quiz = self.get_quiz_for_category(category)
+            quiz = self.get_quiz_for_category(category, user_id=query.from_user.id)
             
             if not quiz:
                 await query.answer("No quiz available for this category")
@@ -1508,18 +1366,21 @@ class TelegramBot:
             is_correct = selected_answer == quiz['correct']
             points_earned = quiz['points'] if is_correct else 0
             
-            # Record the attempt
-            self.db_manager.record_quiz_attempt(
+            # Record the attempt; the ranking is updated as the write is queued
+            self.leaderboard.add_points(user_id, points_earned)
+            await self.db_manager.record_quiz_attempt(
                 user_id,
                 quiz_id,
                 category,
                 is_correct,
                 points_earned,
-                selected_answer
+                selected_answer,
+                group_id=self._scoring_group_id(query.message),
+                durable=True  # stats below must include this attempt
             )
             
             # Get user's updated stats
-            stats = self.db_manager.get_quiz_stats(user_id)
+            stats = await self.db_manager.get_quiz_stats(user_id)
             
             # Format response message
             if is_correct:
@@ -1611,18 +1472,21 @@ class TelegramBot:
             is_correct = selected_answers_set == correct_answers
             points_earned = quiz['points'] if is_correct else 0
             
-            # Record the attempt
-            self.db_manager.record_quiz_attempt(
+            # Record the attempt; the ranking is updated as the write is queued
+            self.leaderboard.add_points(user_id, points_earned)
+            await self.db_manager.record_quiz_attempt(
                 user_id,
                 quiz_id,
                 category,
                 is_correct,
                 points_earned,
-                ", ".join(selected_answers)
+                ", ".join(selected_answers),
+                group_id=self._scoring_group_id(query.message),
+                durable=True  # stats below must include this attempt
             )
             
             # Get user's updated stats
-            stats = self.db_manager.get_quiz_stats(user_id)
+            stats = await self.db_manager.get_quiz_stats(user_id)
             
             # Format response message
             if is_correct:
@@ -1677,8 +1541,8 @@ class TelegramBot:
         """Show user's quiz statistics."""
         try:
             user_id = update.effective_user.id
-            stats = self.db_manager.get_quiz_stats(user_id)
-            history = self.db_manager.get_quiz_history(user_id, limit=5)
+            stats = await self.db_manager.get_quiz_stats(user_id)
+            history = await self.db_manager.get_quiz_history(user_id, limit=5)
             
             message = (
                 "📊 *Your Quiz Statistics*\n\n"
@@ -1723,6 +1587,17 @@ class TelegramBot:
             # Get the largest photo (best quality)
             photo = message.photo[-1]
             
+            # Forwarded copies of a screenshot keep its file_unique_id
+            result = await self.ocr_cache.get_by_file(photo.file_unique_id)
+            
+            # Turn the job away before downloading anything if the pool is full
+            if result is None:
+                try:
+                    self.ocr_pool.check(update.effective_user.id)
+                except OCRBusyError as e:
+                    await message.reply_text(self._ocr_busy_text(e))
+                    return
+            
             # Send acknowledgment
             processing_msg = await message.reply_text(
                 "🔍 Processing your error message...\n"
@@ -1732,105 +1607,77 @@ class TelegramBot:
             logger.info(f"Starting OCR process for image from user {update.effective_user.id}")
             
             try:
-                # Download the image
-                file = await context.bot.get_file(photo.file_id)
-                logger.info("Image downloaded successfully")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                    await file.download_to_drive(tmp_file.name)
-                    logger.info(f"Image saved to temporary file: {tmp_file.name}")
+                if result is None:
+                    # Download the image into memory; no temporary file
+                    file = await context.bot.get_file(photo.file_id)
+                    image_bytes = await file.download_as_bytearray()
+                    logger.info(f"Image downloaded successfully ({len(image_bytes)} bytes)")
                     
-                    try:
-                        image = Image.open(tmp_file.name)
-                        logger.info(f"Original image size: {image.size}")
-                        
-                        # Enhanced preprocessing for better OCR
-                        # Convert to grayscale
-                        image = image.convert('L')
-                        
-                        # Increase contrast
-                        enhancer = ImageEnhance.Contrast(image)
-                        image = enhancer.enhance(2.0)
-                        
-                        # Increase sharpness
-                        enhancer = ImageEnhance.Sharpness(image)
-                        image = enhancer.enhance(2.0)
-                        
-                        # Resize if image is too small
-                        if image.size[0] < 1000 or image.size[1] < 1000:
-                            ratio = max(1000/image.size[0], 1000/image.size[1])
-                            new_size = (int(image.size[0]*ratio), int(image.size[1]*ratio))
-                            image = image.resize(new_size, Image.Resampling.LANCZOS)
-                        
-                        logger.info("Extracting text with Tesseract...")
-                        extracted_text = pytesseract.image_to_string(
-                            image,
-                            config='--psm 6 --oem 3'
-                        )
-                        logger.info(f"Extracted text length: {len(extracted_text)}")
-                        logger.info(f"First 100 chars: {extracted_text[:100]}")
-                        
-                        # Clean up the extracted text
-                        extracted_text = extracted_text.strip()
-                        # Remove multiple newlines
-                        extracted_text = re.sub(r'\n{3,}', '\n\n', extracted_text)
-                        
-                        if not extracted_text:
-                            await processing_msg.edit_text(
-                                "❌ I couldn't detect any text in this image.\n"
-                                "Please make sure the error message is clearly visible and the text is not blurry."
-                            )
-                            return
+                    # The same screenshot uploaded again has a new file id but the same bytes
+                    image_hash = hash_image(image_bytes)
+                    result = await self.ocr_cache.get_by_hash(image_hash, photo.file_unique_id)
+                
+                if result is None:
+                    # Preprocessing and Tesseract run in a worker process
+                    logger.info("Extracting text with Tesseract...")
+                    result = await self.ocr_pool.submit(update.effective_user.id, image_bytes)
+                    await self.ocr_cache.put(photo.file_unique_id, image_hash, result)
+                else:
+                    logger.info("Using cached OCR result")
+                extracted_text = result.text
+                logger.info(f"Extracted text length: {len(extracted_text)}")
+
+                if not extracted_text:
+                    await processing_msg.edit_text(
+                        "❌ I couldn't detect any text in this image.\n"
+                        "Please make sure the error message is clearly visible and the text is not blurry."
+                    )
+                    return
 
-                        # Format the extracted text with better markdown escaping
-                        error_type = self._detect_error_type(extracted_text)
-                        error_type_display = error_type.replace('_', ' ').title()
-
-                        formatted_text = (
-                            "📝 *Extracted Error Message:*\n"
-                            f"Type: _{error_type_display}_\n\n"
-                            f"```\n{extracted_text[:4000].replace('`', '')}```\n\n"
-                            "_You can now copy this text to search for solutions or share it with others._\n\n"
-                            "💡 *Tip:* For better results, try to:\n"
-                            "• Take clear screenshots with good contrast\n"
-                            "• Ensure the text is not blurry\n"
-                            "• Avoid background patterns or colors"
-                        )
+                # Format the extracted text with better markdown escaping
+                error_type = result.error_type
+                error_type_display = error_type.replace('_', ' ').title()
+
+                formatted_text = (
+                    "📝 *Extracted Error Message:*\n"
+                    f"Type: _{error_type_display}_\n\n"
+                    f"```\n{extracted_text[:4000].replace('`', '')}```\n\n"
+                    "_You can now copy this text to search for solutions or share it with others._\n\n"
+                    "💡 *Tip:* For better results, try to:\n"
+                    "• Take clear screenshots with good contrast\n"
+                    "• Ensure the text is not blurry\n"
+                    "• Avoid background patterns or colors"
+                )
 
-                        try:
-                            await processing_msg.edit_text(
-                                formatted_text,
+                try:
+                    await processing_msg.edit_text(
+                        formatted_text,
+                        parse_mode=ParseMode.MARKDOWN
+                    )
+                except Exception as e:
+                    if "Message is too long" in str(e):
+                        # Split into multiple messages if too long
+                        chunks = [formatted_text[i:i+4000] for i in range(0, len(formatted_text), 4000)]
+                        await processing_msg.edit_text(chunks[0], parse_mode=ParseMode.MARKDOWN)
+                        for chunk in chunks[1:]:
+                            await context.bot.send_message(
+                                chat_id=update.effective_chat.id,
+                                text=chunk,
                                 parse_mode=ParseMode.MARKDOWN
                             )
-                        except Exception as e:
-                            if "Message is too long" in str(e):
-                                # Split into multiple messages if too long
-                                chunks = [formatted_text[i:i+4000] for i in range(0, len(formatted_text), 4000)]
-                                await processing_msg.edit_text(chunks[0], parse_mode=ParseMode.MARKDOWN)
-                                for chunk in chunks[1:]:
-                                    await context.bot.send_message(
-                                        chat_id=update.effective_chat.id,
-                                        text=chunk,
-                                        parse_mode=ParseMode.MARKDOWN
-                                    )
-                            else:
-                                raise
+                    else:
+                        raise
 
-                    except Exception as e:
-                        logger.error(f"OCR error: {e}")
-                        await processing_msg.edit_text(
-                            "❌ Sorry, I had trouble reading the text from your image.\n"
-                            "Please make sure the text is clear and try again."
-                        )
-                        
-            finally:
-                # Clean up temporary file
-                try:
-                    if 'tmp_file' in locals():
-                        os.unlink(tmp_file.name)
-                except Exception as e:
-                    logger.error(f"Error cleaning up temp file: {e}")
-                    
+            except OCRBusyError as e:
+                logger.warning(f"Rejected OCR job from user {update.effective_user.id}: {e.reason}")
+                await processing_msg.edit_text(self._ocr_busy_text(e))
+            except Exception as e:
+                logger.error(f"OCR error: {e}")
+                await processing_msg.edit_text(
+                    "❌ Sorry, I had trouble reading the text from your image.\n"
+                    "Please make sure the text is clear and try again."
+                )
+                
         except Exception as e:
             logger.error(f"Error handling image: {e}", exc_info=True)
             await update.message.reply_text(
@@ -1838,79 +1685,46 @@ class TelegramBot:
                 "Please try again later."
             )
 
-    def _detect_error_type(self, text: str) -> str:
-        """Detect the type of error message from the extracted text."""
-        text_lower = text.lower()
-        
-        # Common error types and their keywords
-        error_patterns = {
-            'syntax_error': ['syntaxerror', 'syntax error', 'invalid syntax'],
-            'name_error': ['nameerror', 'name error', 'not defined'],
-            'type_error': ['typeerror', 'type error'],
-            'value_error': ['valueerror', 'value error'],
-            'index_error': ['indexerror', 'index error', 'list index out of range'],
-            'key_error': ['keyerror', 'key error'],
-            'attribute_error': ['attributeerror', 'attribute error', 'has no attribute'],
-            'import_error': ['importerror', 'import error', 'no module named'],
-            'indentation_error': ['indentationerror', 'indentation error', 'unexpected indent'],
-            'runtime_error': ['runtimeerror', 'runtime error'],
-            'zero_division_error': ['zerodivisionerror', 'zero division error', 'division by zero'],
-            'file_not_found_error': ['filenotfounderror', 'file not found', 'no such file'],
-            'permission_error': ['permissionerror', 'permission error', 'permission denied'],
-            'memory_error': ['memoryerror', 'memory error', 'out of memory'],
-            'overflow_error': ['overflowerror', 'overflow error'],
-            'recursion_error': ['recursionerror', 'recursion error', 'maximum recursion depth'],
-            'assertion_error': ['assertionerror', 'assertion error', 'assertion failed'],
-            'unicode_error': ['unicodeerror', 'unicode error'],
-            'module_not_found_error': ['modulenotfounderror', 'module not found'],
-            'connection_error': ['connectionerror', 'connection error', 'connection refused']
-        }
-        
-        # Check for each error type
-        for error_type, patterns in error_patterns.items():
-            if any(pattern in text_lower for pattern in patterns):
-                return error_type
-                
-        # If no specific error type is found
-        if 'error' in text_lower or 'exception' in text_lower:
-            return 'general_error'
-                
-        return 'unknown'
+    @staticmethod
+    def _ocr_busy_text(error: OCRBusyError) -> str:
+        if error.reason == 'user_limit':
+            return "⏳ I'm still reading your previous image. Please wait for it to finish."
+        return "⏳ I'm reading a lot of images right now. Please try again in a minute."
 
     async def handle_challenge_translate(self, query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
         """Handle challenge translation to Somali"""
         try:
-            parts = query.data.split('_')
-            category = parts[2]
-            difficulty = parts[3]
+            category, difficulty, challenge_id = self._parse_challenge_callback(query.data, 'challenge_translate_')
             
-            # Get challenge from existing user_data if available
-            challenge = context.user_data.get('current_challenge')
+            # Get the challenge by id, or from existing user_data if available
+            challenge = self._resolve_challenge(challenge_id, category, difficulty, context)
             
-            # If no challenge in user_data, get a new one using the 2-parameter get_challenge
+            # If neither works, get a new one using the 2-parameter get_challenge
             if not challenge:
                 # Use the 2-parameter get_challenge method defined at line ~2442
-                challenge = self.get_challenge(category, difficulty)
+                challenge = self.get_challenge(category, difficulty, user_id=query.from_user.id)
                 
             if not challenge:
                 await query.answer("Could not find challenge to translate")
                 return
                 
-            # Translate components
-            translated_title = await self.translate_to_somali(challenge['title'])
-            translated_desc = await self.translate_to_somali(challenge['description'])
-            translated_hint = await self.translate_to_somali(challenge.get('hint', ''))
+            # Translate all components in one batch
+            translated_title, translated_desc, translated_hint, somali_disclaimer = await self.translator.translate_many([
+                challenge['title'],
+                challenge['description'],
+                challenge.get('hint', ''),
+                DISCLAIMER
+            ])
             
             # Format the Somali text to make it more natural
             # Add paragraph breaks for readability and fix common translation issues
             translated_desc = translated_desc.replace(". ", ".\n\n")
             
             # Add disclaimer in both languages
-            somali_disclaimer = await self.translate_to_somali("Note: This is an automated translation. Some phrases may not be accurate.")
             disclaimer = (
                 f"\n\n<i>──────────────</i>\n\n"
                 f"<i>🇸🇴 {somali_disclaimer}</i>\n\n"
-                f"<i>🇬🇧 Note: This is an automated translation. Some phrases may not be accurate.</i>"
+                f"<i>🇬🇧 {DISCLAIMER}</i>"
             )
             
             # Build translated message
@@ -1945,111 +1759,76 @@ class TelegramBot:
     async def translate_to_somali(self, text: str) -> str:
         """Translate text to Somali with caching and post-processing for more natural results."""
         try:
-            if not text:
-                return text
-
-            # Check cache first
-            cached = self.db_manager.get_translation(text)
-            if cached:
-                logger.info("Using cached translation")
-                return cached
-
-            # Use deep_translator for reliable translation
-            try:
-                translator = GoogleTranslator(source='en', target='so')
-                translated_text = translator.translate(text)
-                
-                # Post-process to make Somali more natural
-                if translated_text:
-                    # Common improvements for Somali translations
-                    translated_text = self._improve_somali_text(translated_text)
-                    
-                    # Cache the improved translation
-                    self.db_manager.cache_translation(text, translated_text)
-                    return translated_text
-                
-                return text
-            except Exception as inner_e:
-                logger.error(f"Translation failed: {str(inner_e)}")
-                return text
-
+            return await self.translator.translate(text)
         except Exception as e:
             logger.error(f"Translation error: {e}")
             return text
 
-    def _improve_somali_text(self, text: str) -> str:
-        """Apply common corrections to make automatically translated Somali text more natural."""
-        # Replace common awkward translations with more natural Somali phrases
-        corrections = {
-            "ku soo dhawaada": "kusoo dhowoow",
-            "qoraalka koodhka": "koodka",
-            "dhibaatooyinka": "caqabadaha",
-            "class": "fasal",
-            "function": "shaqo",
-            "waa maxay": "maxay tahay",
-            "ku dar": "ku soo dar",
-            "ku soo dar": "ku dar",
-            "programming language": "luuqadda barnaamijyada",
-            "code": "kood",
-            "variable": "doorsoon",
-            "algorithm": "khwaarisinm",
-            "websites": "bogag internet",
-            "server": "adeege",
-            "database": "kayd xogeed",
-            "python": "python",
-            "javascript": "javascript",
-            "solution": "xal",
-            "bugs": "cilado",
-            "nooca": "nooca",
-            "waxaa jira": "waa jiraan",
-            "wuxuu": "wuxuu",
-            "software": "barnaamij",
-            "hardware": "qalabka",
-            "security": "amniga",
-            "web development": "horumarinta bogagga",
-            "write": "qor",
-            "program": "barnaamij",
-            "application": "barnaamij"
-        }
-        
-        for awkward, natural in corrections.items():
-            text = re.sub(r'\b' + re.escape(awkward) + r'\b', natural, text, flags=re.IGNORECASE)
-        
-        # Fix spacing issues common in Somali machine translations
-        text = re.sub(r'(\w)\s+([,.!?])', r'\1\2', text)  # Remove space before punctuation
-        
-        # Improve readability with better sentence spacing
-        text = re.sub(r'([.!?])\s*(\w)', lambda m: m.group(1) + '\n\n' + m.group(2), text)
-        
-        # Make sure important technical terms are clear
-        text = re.sub(r'\b([Ff]unction)\b', 'shaqada (function)', text)
-        text = re.sub(r'\b([Cc]lass)\b', 'fasalka (class)', text)
-        text = re.sub(r'\b([Mm]ethod)\b', 'hab (method)', text)
-        
-        # Fix common grammatical patterns in Somali
-        text = re.sub(r'\b(waa in|waxa)\s+(\w+)\s+in\b', r'\1 \2 inuu', text)
-        
-        return text
-
     async def cleanup_translation_cache(self):
         """Clean up old translations from cache."""
         try:
-            current_time = datetime.now()
-            self.db_manager.cursor.execute("""
-                DELETE FROM translation_cache 
-                WHERE strftime('%s', 'now') - strftime('%s', timestamp) > ?
-            """, (config.TRANSLATION_CACHE_DURATION,))
-            self.db_manager.conn.commit()
-            logger.info("Cleaned up translation cache")
+            deleted = await self.db_manager.cleanup_translation_cache()
+            logger.info(f"Cleaned up translation cache ({deleted} expired)")
         except Exception as e:
             logger.error(f"Error cleaning translation cache: {e}")
 
+    @staticmethod
+    def _scoring_group_id(message: Optional[Message]) -> Optional[int]:
+        """Return the group chat a score was earned in, or None for private chats."""
+        if message and message.chat.type != 'private':
+            return message.chat.id
+        return None
+
+    async def cleanup_broadcasts(self):
+        """Drop delivery records of old broadcasts."""
+        try:
+            deleted = await self.broadcaster.cleanup()
+            logger.info(f"Deleted {deleted} old broadcasts")
+        except Exception as e:
+            logger.error(f"Error cleaning up broadcasts: {e}")
+
+    async def cleanup_ocr_cache(self):
+        """Drop stored OCR results that haven't been used in a while."""
+        try:
+            deleted = await self.ocr_cache.cleanup()
+            logger.info(f"Deleted {deleted} old OCR results")
+        except Exception as e:
+            logger.error(f"Error cleaning up OCR cache: {e}")
+
+    async def compact_leaderboards(self):
+        """Drop weekly and monthly leaderboards that are past retention."""
+        try:
+            deleted = await self.db_manager.compact_rollups(
+                config.LEADERBOARD_KEEP_WEEKS, config.LEADERBOARD_KEEP_MONTHS
+            )
+            logger.info(f"Compacted {deleted} old leaderboard rows")
+        except Exception as e:
+            logger.error(f"Error compacting leaderboards: {e}")
+
+    async def verify_leaderboard(self):
+        """Check the in-memory leaderboard against the user_points table."""
+        try:
+            # The ranking is updated whenever a points write is queued, so a
+            # snapshot taken by the writer after everything queued so far
+            # matches the ranking as it is now. Users scored while waiting
+            # for it are left alone.
+            version = self.leaderboard.version
+            rows = await self.db_manager.get_all_points_after_writes()
+            fixed = self.leaderboard.reconcile(rows, since=version)
+            if fixed:
+                logger.warning(f"Leaderboard check corrected {fixed} users")
+            else:
+                logger.info("Leaderboard check passed")
+        except Exception as e:
+            logger.error(f"Error checking leaderboard: {e}")
+
     def load_challenges(self, force_reload=False):
-        """Load challenges from file with caching."""
+        """Get challenges from the content repository."""
         try:
-            if self.challenges_cache is None or force_reload:
-                with open('resources/programming_challenges.json', 'r', encoding='utf-8') as f:
-                    self.challenges_cache = json.load(f)
+            if force_reload:
+                self.content.load_all()
+            self.challenges_cache = self.content.challenges or None
+            if self.challenges_cache is not None:
                 logger.info("Successfully loaded challenges into cache")
             return self.challenges_cache
         except Exception as e:
@@ -2059,20 +1838,10 @@ class TelegramBot:
     def get_challenge(self, category: str, difficulty: str, challenge_id: str = None):
         """Get a specific challenge or random challenge from category/difficulty."""
         try:
-            # Try to find the challenges file in both possible locations
-            challenges_file = 'resources/programming_challenges.json'
-            custom_file = 'custom_challenges.json'
-            
-            # First try the regular file
-            try:
-                with open(challenges_file, 'r', encoding='utf-8') as f:
-                    challenges = json.load(f)
-                    logger.info("Loaded challenges from programming_challenges.json")
-            except FileNotFoundError:
-                # Try the custom file
-                with open(custom_file, 'r', encoding='utf-8') as f:
-                    challenges = json.load(f)
-                    logger.info("Loaded challenges from custom_challenges.json")
+            # Prefer the regular challenges, fall back to the custom ones
+            challenges = self.content.challenges or self.content.custom_challenges
+            if not challenges:
+                raise FileNotFoundError("No challenges loaded")
             
             # Check if category exists, if not, use a default
             if category not in challenges:
@@ -2080,8 +1849,8 @@ class TelegramBot:
                 if difficulty in challenges:
                     # If difficulty is a top-level key, use it directly
                     category_challenges = challenges[difficulty]
-                    if isinstance(category_challenges, list):
-                        random_challenge = random.choice(category_challenges)
+                    if isinstance(category_challenges, tuple):
+                        random_challenge = dict(random.choice(category_challenges))
                         random_challenge['category'] = category  # Add category for consistent output
                         return random_challenge
                 # Fall back to security category if available
@@ -2105,16 +1874,14 @@ class TelegramBot:
 
             if challenge_id:
                 # Find specific challenge by ID
-                for challenge in category_challenges:
-                    if str(challenge.get('id', '')) == challenge_id:
-                        challenge['category'] = category  # Ensure category is included
-                        challenge['difficulty'] = difficulty  # Ensure difficulty is included
-                        return challenge
+                entry = self.content.find_challenge(challenge_id, category, difficulty)
+                if entry:
+                    return entry.as_dict()
                 # If ID not found, get random
                 logger.warning(f"Challenge ID {challenge_id} not found, using random")
             
             # Get random challenge
-            random_challenge = random.choice(category_challenges)
+            random_challenge = dict(random.choice(category_challenges))
             random_challenge['category'] = category  # Ensure category is included
             random_challenge['difficulty'] = difficulty  # Ensure difficulty is included
             return random_challenge
@@ -2156,15 +1923,10 @@ class TelegramBot:
         }
         return fallback_challenges.get(difficulty, fallback_challenges["medium"])
 
-    def get_quiz_for_category(self, category: str) -> Optional[dict]:
-        """Get a random quiz for the given category."""
+    def get_quiz_for_category(self, category: str, user_id: Optional[int] = None) -> Optional[dict]:
+        """Get the user's next unseen quiz for the given category (random without a user)."""
         try:
-            with open('resources/quizzes.json', 'r', encoding='utf-8') as f:
-                quizzes = json.load(f)
-            
-            if category in quizzes and quizzes[category]:
-                return random.choice(quizzes[category])
-            return None
+            return self.shuffle_bags.draw(user_id, f"quiz:{category}", self.content.quizzes_for(category))
         except Exception as e:
             logger.error(f"Error getting quiz for category {category}: {e}")
             return None
@@ -2172,16 +1934,7 @@ class TelegramBot:
     def get_resources_for_category(self, category: str) -> List[dict]:
         """Get resources for the given category."""
         try:
-            with open('resources/learning_resources.json', 'r', encoding='utf-8') as f:
-                resources = json.load(f)
-            
-            if category in resources['categories']:
-                cat_data = resources['categories'][category]
-                all_resources = []
-                for level in cat_data['levels'].values():
-                    all_resources.extend(level['resources'])
-                return all_resources
-            return []
+            return list(self.content.resources_for(category))
         except Exception as e:
             logger.error(f"Error getting resources for category {category}: {e}")
             return []
@@ -2237,6 +1990,10 @@ class TelegramBot:
             if not update.chat_member or not update.chat_member.new_chat_member:
                 return
 
+            # Keep the admin roster in step with promotions, demotions and departures
+            new_member = update.chat_member.new_chat_member
+            self.admin_cache.apply_member_update(update.effective_chat.id, new_member.user.id, new_member.status)
+
             if update.chat_member.new_chat_member.status == "member":
                 # Send welcome message
                 welcome_msg = (
@@ -2296,19 +2053,14 @@ class TelegramBot:
                     points = challenge.get('points', 5)
                     
                     # Update user points in database
-                    self.db_manager.cursor.execute(
-                        """
-                        INSERT INTO user_points (user_id, points, last_updated)
-                        VALUES (?, ?, CURRENT_TIMESTAMP)
-                        ON CONFLICT(user_id) DO UPDATE SET
-                            points = points + ?,
-                            last_updated = CURRENT_TIMESTAMP
-                        """,
-                        (update.effective_user.id, points, points)
+                    self.leaderboard.add_points(update.effective_user.id, points)
+                    await self.db_manager.add_points(
+                        update.effective_user.id, points,
+                        group_id=self._scoring_group_id(update.message)
                     )
                     
                     # Mark challenge as completed
-                    self.db_manager.update_challenge_progress(
+                    await self.db_manager.update_challenge_progress(
                         user_id=update.effective_user.id,
                         challenge_id=challenge.get('id', '0'),
                         category=challenge.get('category', 'security'),
@@ -2316,8 +2068,6 @@ class TelegramBot:
                         completed=True
                     )
                     
-                    self.db_manager.conn.commit()
-                    
                     # Create keyboard with options for next steps
                     keyboard = [
                         [InlineKeyboardButton("🔄 Try Another Challenge", 
@@ -2378,17 +2128,11 @@ class TelegramBot:
                 
                 # Still award some points for attempting
                 points = challenge.get('points', 5) // 2
-                self.db_manager.cursor.execute(
-                    """
-                    INSERT INTO user_points (user_id, points, last_updated)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                    ON CONFLICT(user_id) DO UPDATE SET
-                        points = points + ?,
-                        last_updated = CURRENT_TIMESTAMP
-                    """,
-                    (update.effective_user.id, points, points)
+                self.leaderboard.add_points(update.effective_user.id, points)
+                await self.db_manager.add_points(
+                    update.effective_user.id, points,
+                    group_id=self._scoring_group_id(update.message)
                 )
-                self.db_manager.conn.commit()
             
             # Clear waiting state
             if 'waiting_for_challenge_answer' in context.user_data:
@@ -2517,7 +2261,7 @@ class TelegramBot:
                             start_time = datetime.now()
                             
                             # Get and display a challenge
-                            challenge = self.get_challenge(category, difficulty)
+                            challenge = self.get_challenge(category, difficulty, user_id=query.from_user.id)
                             
                             if not challenge:
                                 await self._safe_edit_message(query, 
@@ -2595,7 +2339,7 @@ class TelegramBot:
                         logger.info(f"Handling difficulty selection: category={category}, difficulty={difficulty}")
                         
                         # Get and display a challenge
-                        challenge = self.get_challenge(category, difficulty)
+                        challenge = self.get_challenge(category, difficulty, user_id=query.from_user.id)
                         
                         if not challenge:
                             await self._safe_edit_message(query, 
@@ -2687,52 +2431,34 @@ class TelegramBot:
                 # Re-raise other BadRequest errors
                 raise
 
-    def get_challenge(self, category, difficulty):
-        """Get a random challenge from the given category and difficulty."""
+    def get_challenge(self, category, difficulty, user_id: Optional[int] = None):
+        """Get the user's next unseen challenge from the given category and difficulty.
+
+        Without a user_id the challenge is picked at random.
+        """
         try:
-            # Check if we have cached challenges
-            if hasattr(self, '_challenge_cache') and category in self._challenge_cache and difficulty in self._challenge_cache[category]:
-                # Use cached challenges
-                challenges_for_difficulty = self._challenge_cache[category][difficulty]
-                if challenges_for_difficulty:
-                    challenge = random.choice(challenges_for_difficulty)
-                    # Add category and difficulty info
-                    challenge_copy = challenge.copy()  # Create a copy to avoid modifying the cached version
-                    challenge_copy['category'] = category
-                    challenge_copy['difficulty'] = difficulty
-                    return challenge_copy
-            
-            # Load challenges
-            with open('resources/programming_challenges.json', 'r', encoding='utf-8') as f:
-                all_challenges = json.load(f)
-            
-            # Initialize cache if needed
-            if not hasattr(self, '_challenge_cache'):
-                self._challenge_cache = {}
+            challenges = self.content.challenges
             
             # Handle legacy category naming
-            if category not in all_challenges and category.startswith('programming'):
+            if category not in challenges and category.startswith('programming'):
                 category = 'programming'
                 
             # Make sure the category exists
-            if category not in all_challenges:
+            if category not in challenges:
                 logger.warning(f"Invalid category selected: {category}")
                 return None
                 
-            # Cache the entire category
-            self._challenge_cache[category] = all_challenges[category]
-                
             # Make sure the difficulty exists
-            difficulty_challenges = all_challenges.get(category, {}).get(difficulty, [])
+            difficulty_challenges = self.content.challenges_for(category, difficulty)
             if not difficulty_challenges:
                 logger.warning(f"No challenges found for category {category} at {difficulty} level")
                 return None
                 
-            # Pick a random challenge
-            challenge = random.choice(difficulty_challenges)
+            # Pick the next challenge this user hasn't seen
+            challenge = self.shuffle_bags.draw(user_id, f"challenge:{category}:{difficulty}", difficulty_challenges)
             
             # Add category and difficulty info
-            challenge_copy = challenge.copy()  # Create a copy to avoid modifying the original
+            challenge_copy = dict(challenge)  # Copy the read-only repository entry
             challenge_copy['category'] = category
             challenge_copy['difficulty'] = difficulty
             
@@ -2755,20 +2481,122 @@ class TelegramBot:
             parse_mode=ParseMode.MARKDOWN
         )
 
+    async def db_stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show database settings and query plans (admins only)."""
+        if update.effective_user.id not in config.ADMIN_IDS:
+            await update.message.reply_text("You don't have permission to use this command.")
+            return
+
+        try:
+            diagnostics = await self.db_manager.get_diagnostics()
+
+            message = "🗄 <b>Database Diagnostics</b>\n\n"
+            for name, value in diagnostics['settings'].items():
+                message += f"{html.escape(name)}: <code>{html.escape(str(value))}</code>\n"
+
+            message += "\n<b>Query Plans</b>\n"
+            for name, plan in diagnostics['plans'].items():
+                details = "\n".join(plan) or "(no plan)"
+                message += f"\n<b>{html.escape(name)}</b>\n<pre>{html.escape(details)}</pre>\n"
+
+            await update.message.reply_text(message[:4000], parse_mode=ParseMode.HTML)
+        except Exception as e:
+            logger.error(f"Error in dbstats command: {e}")
+            await update.message.reply_text("Sorry, couldn't collect database diagnostics right now.")
+
+    async def metrics_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show outbound send queue and translation statistics (admins only)."""
+        if update.effective_user.id not in config.ADMIN_IDS:
+            await update.message.reply_text("You don't have permission to use this command.")
+            return
+
+        try:
+            stats = self.dispatcher.stats()
+            queued = ", ".join(f"{name} {count}" for name, count in stats['queued'].items())
+            message = (
+                "📈 <b>Send Queue</b>\n\n"
+                f"Pending: <code>{stats['pending']}</code> (queued: {queued})\n"
+                f"Waiting on chat limits: <code>{stats['deferred']}</code>, "
+                f"behind another send: <code>{stats['parked']}</code>\n"
+                f"In flight: <code>{stats['in_flight']}</code>, chats tracked: <code>{stats['chats_tracked']}</code>\n\n"
+                f"Sent: <code>{stats['sent']}</code>, failed: <code>{stats['failed']}</code>, "
+                f"retried: <code>{stats['retried']}</code>, RetryAfter: <code>{stats['retry_after']}</code>\n"
+                f"Queue wait avg/p95/max: <code>{stats['wait_avg']:.2f}s / {stats['wait_p95']:.2f}s / "
+                f"{stats['wait_max']:.2f}s</code>"
+            )
+
+            translation = self.translator.stats()
+            provider = translation['provider']
+            breaker = provider['breaker']
+            breaker_state = breaker['state']
+            if breaker['retry_in']:
+                breaker_state += f", retry in {breaker['retry_in']:.0f}s"
+            message += (
+                "\n\n🌍 <b>Translation</b>\n\n"
+                f"Breaker: <code>{breaker_state}</code>, error rate <code>{breaker['error_rate']:.0%}</code> "
+                f"over {breaker['calls_in_window']} calls, opened <code>{breaker['times_opened']}</code>x, "
+                f"rejected <code>{breaker['rejected']}</code>\n"
+                f"Provider calls: <code>{provider['calls']}</code>, failed: <code>{provider['failures']}</code>, "
+                f"timed out: <code>{provider['timeouts']}</code>\n"
+                f"Provider latency avg/p95/max: <code>{provider['latency_avg']:.2f}s / "
+                f"{provider['latency_p95']:.2f}s / {provider['latency_max']:.2f}s</code>\n"
+                f"Hits memory/bundle/db: <code>{translation['lru_hits']} / {translation['bundle_hits']} / "
+                f"{translation['db_hits']}</code>, translated: <code>{translation['translated']}</code>\n"
+                f"Stale served: <code>{translation['stale_served']}</code>, refreshed: "
+                f"<code>{translation['refreshed']}</code>, left in English: <code>{translation['untranslated']}</code>"
+            )
+            await update.message.reply_text(message, parse_mode=ParseMode.HTML)
+        except Exception as e:
+            logger.error(f"Error in metrics command: {e}")
+            await update.message.reply_text("Sorry, couldn't collect metrics right now.")
+
+    async def rate_limit_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show or set this group's message rate limit (group admins only)."""
+        chat = update.effective_chat
+        if chat.type == 'private':
+            await update.message.reply_text("This command only works in groups.")
+            return
+
+        try:
+            if not await self.admin_cache.is_admin(context.bot, chat.id, update.effective_user.id):
+                await update.message.reply_text("Only group admins can change the rate limit.")
+                return
+
+            args = context.args or []
+            if args and args[0] == 'default':
+                messages, window = None, None
+            elif len(args) == 2 and all(arg.isdigit() and int(arg) > 0 for arg in args):
+                messages, window = int(args[0]), int(args[1])
+            elif args:
+                await update.message.reply_text(
+                    "Usage: /ratelimit <messages> <seconds>, or /ratelimit default"
+                )
+                return
+
+            if args:
+                await self.db_manager.set_group_rate_limit(chat.id, messages, window)
+                self.msg_handler.rate_limiter.set_chat_limit(chat.id, messages, window)
+
+            limit, window = self.msg_handler.rate_limiter.limits_for(chat.id)
+            await update.message.reply_text(
+                f"⏱ Rate limit: {limit} messages per {int(window)} seconds"
+            )
+        except Exception as e:
+            logger.error(f"Error in ratelimit command: {e}")
+            await update.message.reply_text("Sorry, couldn't update the rate limit right now.")
+
     async def handle_challenge_submit(self, query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE):
         """Handle challenge submission button click."""
         try:
             # Parse the callback data to get challenge details
-            data_parts = query.data.split('_')
             logger.info(f"Handling submission request with data: {query.data}")
             
-            difficulty = data_parts[2]
-            challenge_id = data_parts[3] if len(data_parts) > 3 else None
+            category, difficulty, challenge_id = self._parse_challenge_callback(query.data, 'challenge_submit_')
             
-            # Get challenge from existing user_data if available
-            challenge = context.user_data.get('current_challenge')
+            # Get the challenge by id, or from existing user_data if available
+            challenge = self._resolve_challenge(challenge_id, category, difficulty, context)
             
-            # If no challenge in user_data, we can't proceed
+            # If neither works, we can't proceed
             if not challenge:
                 await self._safe_edit_message(query,
                     "Sorry, I couldn't find which challenge you're submitting. Please try selecting a challenge again.",
@@ -2780,6 +2608,7 @@ class TelegramBot:
                 return
             
             # Set waiting state for answer
+            context.user_data['current_challenge'] = challenge
             context.user_data['waiting_for_challenge_answer'] = True
             
             # Update message to prompt for answer
@@ -0,0 +1,135 @@
+"""Fan scheduled posts out to every target group, resumably."""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+from telegram import InlineKeyboardMarkup
+from telegram.ext import Application
+
+import config
+from database import AsyncDatabase
+from dispatcher import PRIORITY_BROADCAST, SendDispatcher
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+EXPIRED = 'expired'
+
+
+def step(method: str, **kwargs) -> dict:
+    """One Bot API call of a broadcast payload, in a form that can be stored as JSON."""
+    markup = kwargs.get('reply_markup')
+    if isinstance(markup, InlineKeyboardMarkup):
+        kwargs['reply_markup'] = markup.to_dict()
+    return {'method': method, 'kwargs': kwargs}
+
+
+class Broadcaster:
+    """Send a rendered payload to many groups with bounded concurrency.
+
+    A payload is a list of steps (see step()) that every group receives in
+    order, e.g. an intro message followed by a poll. The broadcast and one
+    delivery row per group are stored before anything is sent, and each
+    group's progress is recorded after every step. If the bot stops
+    mid-broadcast, resume() picks up the groups that hadn't finished,
+    from the step they were on. A step that was sent just before a crash
+    may be sent again, but a finished group never is.
+
+    Sends go through the SendDispatcher at broadcast priority, so the rate
+    limits apply; ``concurrency`` caps how many groups are in progress.
+    """
+
+    def __init__(self, application: Application, db: AsyncDatabase, dispatcher: SendDispatcher,
+                 concurrency: int = config.BROADCAST_CONCURRENCY,
+                 resume_max_age_hours: float = config.BROADCAST_RESUME_MAX_AGE_HOURS):
+        self.app = application
+        self.db = db
+        self.dispatcher = dispatcher
+        self.concurrency = concurrency
+        self.resume_max_age = timedelta(hours=resume_max_age_hours)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def broadcast(self, kind: str, steps: List[dict],
+                        group_ids: Optional[Iterable[int]] = None) -> dict:
+        """Send steps to every group (TARGET_GROUPS by default); returns counts per status."""
+        group_ids = list(config.TARGET_GROUPS if group_ids is None else group_ids)
+        broadcast_id = await self.db.create_broadcast(kind, steps, group_ids)
+        return await self._run(broadcast_id, kind, steps)
+
+    def start(self):
+        """Resume unfinished broadcasts in the background."""
+        self._spawn(self.resume())
+
+    async def stop(self):
+        """Cancel broadcasts running in the background; they resume on the next start."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def resume(self):
+        """Finish broadcasts that were interrupted; expire ones too old to still send."""
+        try:
+            for broadcast_id, kind, steps, created_at in await self.db.get_unfinished_broadcasts():
+                if datetime.now() - created_at > self.resume_max_age:
+                    await self.db.expire_pending_deliveries(broadcast_id)
+                    await self.db.complete_broadcast(broadcast_id)
+                    logger.info(f"Expired unfinished {kind} broadcast {broadcast_id} from {created_at}")
+                    continue
+                logger.info(f"Resuming {kind} broadcast {broadcast_id}")
+                await self._run(broadcast_id, kind, steps)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error resuming broadcasts: {e}", exc_info=True)
+
+    async def _run(self, broadcast_id: int, kind: str, steps: List[dict]) -> dict:
+        pending = await self.db.get_pending_deliveries(broadcast_id)
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(group_id: int, start_step: int):
+            async with limit:
+                await self._deliver(broadcast_id, kind, steps, group_id, start_step)
+
+        await asyncio.gather(*(deliver(group_id, start) for group_id, start in pending))
+        counts = await self.db.complete_broadcast(broadcast_id)
+        logger.info(
+            f"{kind.capitalize()} broadcast {broadcast_id} finished: "
+            f"{counts.get(SENT, 0)} sent, {counts.get(FAILED, 0)} failed"
+        )
+        return counts
+
+    async def _deliver(self, broadcast_id: int, kind: str, steps: List[dict],
+                       group_id: int, start_step: int):
+        bot = self.app.bot
+        index = start_step
+        try:
+            for index in range(start_step, len(steps)):
+                kwargs = dict(steps[index]['kwargs'])
+                if isinstance(kwargs.get('reply_markup'), dict):
+                    kwargs['reply_markup'] = InlineKeyboardMarkup.de_json(kwargs['reply_markup'], bot)
+                await self.dispatcher.send(
+                    group_id, getattr(bot, steps[index]['method']),
+                    priority=PRIORITY_BROADCAST, chat_id=group_id, **kwargs
+                )
+                if index + 1 < len(steps):
+                    await self.db.update_delivery(broadcast_id, group_id, PENDING, index + 1)
+            await self.db.update_delivery(broadcast_id, group_id, SENT, len(steps))
+            logger.info(f"Sent {kind} to group {group_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The dispatcher already retried transient errors
+            logger.error(f"Failed to send {kind} to group {group_id}: {e}")
+            await self.db.update_delivery(broadcast_id, group_id, FAILED, index, str(e))
+
+    async def cleanup(self, keep_days: int = config.BROADCAST_KEEP_DAYS) -> int:
+        """Delete finished broadcasts older than keep_days."""
+        return await self.db.cleanup_broadcasts(keep_days)
@@ -1,13 +1,14 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-import json
+
+from content_repository import get_content_repository
 
 logger = logging.getLogger(__name__)
 
 class CallbackHandlers:
     def __init__(self):
-        self.resources_file = "resources/learning_resources.json"
+        self.content = get_content_repository()
 
     async def handle_resource_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle callbacks for resource navigation."""
@@ -15,9 +16,7 @@ class CallbackHandlers:
         await query.answer()
         
         try:
-            # Load resources
-            with open(self.resources_file, 'r', encoding='utf-8') as f:
-                resources = json.load(f)
+            resources = self.content.learning_resources
             
             # Parse callback data
             data = query.data.split('_', 3)  # Split into max 4 parts
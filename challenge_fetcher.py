@@ -1,22 +1,20 @@
-import json
 import random
 import logging
 import uuid
 
+from content_repository import get_content_repository
+
 class ChallengeFetcher:
     def __init__(self):
-        self.challenges_file = "resources/programming_challenges.json"
-        self.challenges = self._load_challenges()
+        if get_content_repository().challenges:
+            logging.info("Successfully loaded custom challenges")
+        else:
+            logging.error("Error loading custom challenges: none in the content repository")
 
-    def _load_challenges(self):
-        try:
-            with open(self.challenges_file, "r", encoding='utf-8') as f:
-                challenges = json.load(f)
-                logging.info("Successfully loaded custom challenges")
-                return challenges
-        except Exception as e:
-            logging.error(f"Error loading custom challenges: {e}")
-            return self._get_fallback_challenges()
+    @property
+    def challenges(self):
+        """Current challenges, read from the repository so reloads are picked up."""
+        return get_content_repository().challenges or self._get_fallback_challenges()
 
     def get_challenge(self, category="programming", difficulty="medium"):
         """Get a challenge with consistent structure."""
@@ -35,7 +33,8 @@ class ChallengeFetcher:
             if not challenges:
                 return self._get_fallback_challenge(difficulty)
             
-            challenge = random.choice(challenges)
+            # Copy so the shared read-only entry isn't modified
+            challenge = dict(random.choice(challenges))
             
             # Ensure all required fields are present
             if 'id' not in challenge:
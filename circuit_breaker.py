@@ -0,0 +1,121 @@
+"""Circuit breaker for calls to an unreliable external service."""
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Stop calling a service once its recent error rate exceeds a budget.
+
+    The outcomes of the last ``window`` calls are kept. Once at least
+    ``min_calls`` of them are recorded and more than ``error_budget`` of
+    them failed, the breaker opens and allow() refuses calls for
+    ``cooldown`` seconds. After that one trial call is let through
+    (half-open): success closes the breaker with a clean window, failure
+    opens it again.
+
+    allow() returns a token for each permitted call, to be passed back with
+    its outcome. Only the trial call's outcome decides a half-open breaker;
+    calls that were already running when it opened are ignored.
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 error_budget: float = 0.5, cooldown: float = 30.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_budget = error_budget
+        self.cooldown = cooldown
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._tokens = itertools.count(1)
+        self._trial: Optional[int] = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a trial call through."""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> Optional[int]:
+        """Token for a call that may be made now, or None (counted as refused) if it may not."""
+        state = self.state
+        if state == CLOSED:
+            return next(self._tokens)
+        if state == HALF_OPEN and self._trial is None:
+            self._trial = next(self._tokens)
+            return self._trial
+        self.rejected += 1
+        return None
+
+    def _is_stale(self, token: int) -> bool:
+        # A call allowed before the breaker opened, finishing while it is open
+        return self._state != CLOSED and token != self._trial
+
+    def record_success(self, token: int):
+        if self._is_stale(token):
+            return
+        if self._state != CLOSED:
+            logger.info(f"{self.name} recovered, closing circuit breaker")
+            self._state = CLOSED
+            self._outcomes.clear()
+            self._trial = None
+        self._outcomes.append(True)
+
+    def record_cancelled(self, token: int):
+        """A permitted call ended without an outcome, e.g. it was cancelled."""
+        if token == self._trial:
+            self._trial = None
+
+    def record_failure(self, token: int):
+        if self._is_stale(token):
+            return
+        if self._state == OPEN:
+            # The trial call failed
+            self._trial = None
+            self._open()
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls and self.error_rate > self.error_budget:
+            self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(
+            f"{self.name} error rate {self.error_rate:.0%} is over budget, "
+            f"not calling it for {self.cooldown:.0f}s"
+        )
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'error_rate': self.error_rate,
+            'calls_in_window': len(self._outcomes),
+            'times_opened': self.times_opened,
+            'rejected': self.rejected,
+            'retry_in': self.retry_in(),
+        }
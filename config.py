@@ -104,9 +104,21 @@ QUIZ_CATEGORIES = {
 }
 
 # Rate Limiting
-MAX_MESSAGES_PER_MINUTE = 5
+MAX_MESSAGES_PER_MINUTE = 5  # Default limit; groups can override it with /ratelimit
+RATE_LIMIT_WINDOW_SECONDS = 60  # Default window the limit above applies to
+RATE_LIMIT_WHEEL_SLOTS = 128  # One-second slots in the idle-sender eviction wheel
 MAX_WARNINGS = 3  # After 3 warnings, user gets temporarily restricted
 
+# Leaderboard
+LEADERBOARD_CHECK_INTERVAL_HOURS = 6  # How often the in-memory ranking is checked against the database
+LEADERBOARD_KEEP_WEEKS = 8  # Weekly leaderboards older than this are compacted away
+LEADERBOARD_KEEP_MONTHS = 12  # Monthly leaderboards older than this are compacted away
+
+# Content hot reload
+CONTENT_WATCH_ENABLED = True  # Reload edited content files without a restart
+CONTENT_POLL_INTERVAL_SECONDS = 5  # mtime polling interval when inotify is unavailable
+CONTENT_RELOAD_DEBOUNCE_SECONDS = 0.5  # Wait for editors to finish writing before reloading
+
 # Security Settings
 TRUSTED_DOMAINS = [
     'github.com',
@@ -123,6 +135,47 @@ TRUSTED_DOMAINS = [
 # Allowed domains can bypass link filtering
 ALLOWED_DOMAINS = TRUSTED_DOMAINS
 
+# Optional files with one domain per line, merged into the lists above and below
+ALLOWED_DOMAINS_FILE = os.getenv('ALLOWED_DOMAINS_FILE')
+BLOCKED_DOMAINS_FILE = os.getenv('BLOCKED_DOMAINS_FILE')
+
+# OCR of error screenshots
+TESSERACT_PATH = os.environ.get('TESSERACT_PATH')  # tesseract binary, if it isn't on PATH
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'subprocess')  # 'subprocess' (pytesseract) or 'tesserocr'
+OCR_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Worker processes running Tesseract
+OCR_MAX_QUEUE = 8  # Jobs that may wait for a free worker before new ones are rejected
+OCR_MAX_JOBS_PER_USER = 1  # Jobs one user may have queued or running
+OCR_TIMEOUT_SECONDS = 30  # Kill a Tesseract run that takes longer than this
+OCR_MIN_SIDE = 1000  # Upscale images until their shorter side is at least this many pixels
+OCR_MAX_SIDE = 3000  # Downscale images whose longer side is bigger than this
+OCR_CACHE_SIZE = 512  # OCR results kept in memory; older ones are read back from bot.db
+OCR_CACHE_KEEP_DAYS = 30  # Drop stored OCR results unused for this long
+OCR_CACHE_TOUCH_SECONDS = 24 * 60 * 60  # In-memory hits refresh a result's last_used at most this often
+
+# Outbound message dispatcher (Telegram flood limits)
+DISPATCH_GLOBAL_PER_SECOND = 30  # Bot-wide sends per second
+DISPATCH_GROUP_PER_MINUTE = 20  # Sends per minute to one group or channel
+DISPATCH_PRIVATE_PER_SECOND = 1  # Sends per second to one private chat
+DISPATCH_CHAT_BURST = 3  # Sends a quiet chat may receive back to back
+DISPATCH_CONCURRENCY = 8  # API calls in flight at once
+DISPATCH_MAX_RETRIES = 3  # Retries after RetryAfter or a network error before the call was sent
+DISPATCH_RETRY_BASE_SECONDS = 1.0  # Backoff base; doubled per attempt, with jitter
+
+# Broadcasts to TARGET_GROUPS
+BROADCAST_CONCURRENCY = 20  # Groups a broadcast sends to at once
+BROADCAST_RESUME_MAX_AGE_HOURS = 6  # Don't resume interrupted broadcasts older than this
+BROADCAST_KEEP_DAYS = 30  # Delivery records kept for finished broadcasts
+
+# Durable timers (warning expiry, auto-deleted notices)
+TIMER_RETRY_SECONDS = 60  # First retry delay for a failed timer action; doubles each attempt
+TIMER_MAX_ATTEMPTS = 5  # Give up on a timer action after this many failed runs
+TIMER_MAX_SLEEP_SECONDS = 3600  # Re-check the timer table at least this often
+TIMER_BATCH_SIZE = 100  # Due actions fetched per database read
+
+# Admin roster cache
+ADMIN_CACHE_TTL_SECONDS = 600  # Refetch a group's admin list after this long
+ADMIN_CACHE_ERROR_TTL_SECONDS = 60  # Back off this long when fetching admins fails
+
 # Message Moderation
 DELETE_MESSAGES_CONTAINING = [
     'http://',  # Block non-HTTPS links
@@ -143,11 +196,18 @@ SPAM_WORDS = [
 # Group configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot.db')
 
+# Database settings
+DB_READ_POOL_SIZE = 4  # Read-only connections used for async queries
+DB_BATCH_WINDOW_MS = 5  # How long queued writes wait to be committed together
+DB_BATCH_MAX_STATEMENTS = 100  # Commit early once this many writes are queued
+DB_BUSY_TIMEOUT_MS = 5000  # How long a connection waits on a locked database
+DB_MMAP_SIZE = 64 * 1024 * 1024  # Bytes of the database file memory-mapped per connection
+
 # Feature Settings
 TIP_INTERVAL_HOURS = 24  # Send tips every 24 hours
 POLL_INTERVAL_HOURS = 72  # Send polls every 72 hours
 
-# Blocked domains for link filtering
+# Blocked domains for link filtering; a block beats an allow for the same domain
 BLOCKED_DOMAINS = [
     'example.com',
     'spam.com'
@@ -155,6 +215,19 @@ BLOCKED_DOMAINS = [
 
 # Translation settings
 TRANSLATION_CACHE_DURATION = 24 * 60 * 60  # 24 hours in seconds
+TRANSLATION_LRU_SIZE = 1024  # Translations kept in memory in front of the database cache
+TRANSLATION_BATCH_CHARS = 4500  # Google rejects requests over 5000 characters
+TRANSLATION_BUNDLE_PATH = 'resources/translations_so.json'  # Built by pretranslate.py
+TRANSLATION_MIGRATION_CHUNK = 500  # Legacy translation_cache rows moved per write
+TRANSLATION_MIGRATION_PAUSE_SECONDS = 0.1  # Pause between chunks so other writes get through
+SOMALI_CORRECTIONS_PATH = 'resources/somali_corrections.json'  # Phrase fixes applied to translations
+TRANSLATION_STALE_SECONDS = 7 * 24 * 60 * 60  # Expired translations are still served (and refreshed) this long
+TRANSLATION_TIMEOUT_SECONDS = 8  # Give up on a provider call after this long and answer in English
+TRANSLATION_PROVIDER_THREADS = 4  # Threads for provider calls, so hung requests can't exhaust the default pool
+TRANSLATION_BREAKER_WINDOW = 20  # Recent provider calls the error rate is measured over
+TRANSLATION_BREAKER_MIN_CALLS = 5  # Calls needed in the window before the breaker can open
+TRANSLATION_BREAKER_ERROR_BUDGET = 0.5  # Open the breaker when more than this share of calls fail
+TRANSLATION_BREAKER_COOLDOWN_SECONDS = 60  # Wait this long before trying the provider again
 
 # Poll settings
 MAX_POLL_OPTIONS = 5
@@ -0,0 +1,464 @@
+"""Shared, load-once access to the bot's JSON content files."""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Content source name -> file path, relative to the repository base directory
+CONTENT_FILES = {
+    'challenges': 'resources/programming_challenges.json',
+    'custom_challenges': 'custom_challenges.json',
+    'temp_challenges': 'resources/temp_challenges.json',
+    'quizzes': 'resources/quizzes.json',
+    'learning_resources': 'resources/learning_resources.json',
+    'tips': 'resources/tips.json',
+    'tip_library': 'tips.json',
+    'polls': 'resources/polls.json',
+    'discussions': 'resources/discussions.json',
+}
+
+# Challenge sources in lookup precedence order, for ids that appear in more than one
+CHALLENGE_SOURCES = ('challenges', 'temp_challenges', 'custom_challenges')
+
+# Category used for challenge lists that aren't filed under a category
+CUSTOM_CATEGORY = 'custom'
+UNCATEGORIZED_TEMP_CATEGORY = 'programming'
+
+# Per-category quiz question files, named <category>_questions.json
+QUIZ_QUESTIONS_DIR = 'quiz_questions'
+QUIZ_QUESTIONS_SUFFIX = '_questions.json'
+
+EMPTY_MAPPING = MappingProxyType({})
+
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise ValueError(message)
+
+
+def _validate_entries(entries: Any, what: str, required: Tuple[str, ...] = ()):
+    _require(isinstance(entries, tuple), f"{what} must be a list")
+    for index, entry in enumerate(entries):
+        _require(isinstance(entry, Mapping), f"{what}[{index}] must be an object")
+        for key in required:
+            _require(key in entry, f"{what}[{index}] is missing '{key}'")
+
+
+def validate_content(name: str, data: Any):
+    """Check the shape of a parsed content source; raise ValueError if it is wrong."""
+    if name == 'challenges':
+        _require(isinstance(data, Mapping), "challenges must be an object of categories")
+        for category, levels in data.items():
+            if isinstance(levels, Mapping):
+                for difficulty, challenges in levels.items():
+                    _validate_entries(challenges, f"{category}.{difficulty}", ('title', 'description'))
+    elif name == 'custom_challenges':
+        _require(isinstance(data, Mapping), "custom challenges must be an object of difficulties")
+        for difficulty, challenges in data.items():
+            _validate_entries(challenges, difficulty, ('title', 'description'))
+    elif name == 'temp_challenges':
+        _require(isinstance(data, Mapping), "temp challenges must be an object")
+        for key, value in data.items():
+            if isinstance(value, Mapping):
+                for difficulty, challenges in value.items():
+                    _validate_entries(challenges, f"{key}.{difficulty}", ('title', 'description'))
+            else:
+                _validate_entries(value, key, ('title', 'description'))
+    elif name == 'quizzes':
+        _require(isinstance(data, Mapping), "quizzes must be an object of categories")
+        for category, quizzes in data.items():
+            _validate_entries(quizzes, category, ('question', 'options'))
+    elif name == 'learning_resources':
+        _require(isinstance(data, Mapping) and isinstance(data.get('categories'), Mapping),
+                 "learning resources must have a 'categories' object")
+    elif name == 'tips':
+        _require(isinstance(data, (Mapping, tuple)), "tips must be an object or a list")
+    elif name == 'tip_library':
+        _require(isinstance(data, Mapping) and isinstance(data.get('categories'), Mapping),
+                 "tip library must have a 'categories' object")
+    elif name == 'polls':
+        _require(isinstance(data, (Mapping, tuple)), "polls must be an object or a list")
+    elif name == 'discussions':
+        _require(isinstance(data, Mapping) and isinstance(data.get('topics'), Mapping),
+                 "discussions must have a 'topics' object")
+    elif name.startswith('questions:'):
+        _require(isinstance(data, Mapping), "question file must be an object")
+        _validate_entries(data.get('questions'), 'questions', ('question', 'options'))
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only view of parsed JSON: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def custom_challenge_id(difficulty: str, challenge: Mapping) -> str:
+    """Stable id for a custom challenge, which has none in the file."""
+    digest = hashlib.sha1(f"{difficulty}:{challenge['title']}".encode('utf-8')).hexdigest()
+    return f"c{digest[:8]}"
+
+
+def _with_custom_ids(data: Mapping) -> Mapping:
+    return MappingProxyType({
+        difficulty: tuple(
+            challenge if 'id' in challenge
+            else MappingProxyType({**challenge, 'id': custom_challenge_id(difficulty, challenge)})
+            for challenge in challenges
+        )
+        for difficulty, challenges in data.items()
+    })
+
+
+@dataclass(frozen=True)
+class IndexedChallenge:
+    """A challenge together with where it was found."""
+    challenge: Mapping
+    category: str
+    difficulty: str
+    source: str
+
+    @property
+    def id(self) -> str:
+        return str(self.challenge['id'])
+
+    def as_dict(self) -> dict:
+        """Mutable copy of the challenge with category and difficulty filled in."""
+        challenge = dict(self.challenge)
+        challenge['category'] = self.category
+        challenge['difficulty'] = self.difficulty
+        return challenge
+
+
+def _iter_challenges(name: str, data: Mapping):
+    """Yield (category, difficulty, challenge) for every challenge in a source."""
+    if name == 'custom_challenges':
+        for difficulty, challenges in data.items():
+            for challenge in challenges:
+                yield CUSTOM_CATEGORY, difficulty, challenge
+        return
+    for key, value in data.items():
+        if isinstance(value, Mapping):
+            for difficulty, challenges in value.items():
+                for challenge in challenges:
+                    yield key, difficulty, challenge
+        else:
+            # temp_challenges has bare difficulty lists next to its categories
+            for challenge in value:
+                yield UNCATEGORIZED_TEMP_CATEGORY, key, challenge
+
+
+@dataclass(frozen=True)
+class ContentSnapshot:
+    """Parsed content plus the lookup indexes built from it."""
+    sources: Mapping[str, Any]
+    challenges_by_key: Mapping[Tuple[str, str], tuple]
+    challenges_by_id: Mapping[str, IndexedChallenge]
+    challenges_by_location: Mapping[Tuple[str, str, str], IndexedChallenge]
+    challenge_id_collisions: Mapping[str, tuple]
+    quizzes_by_category: Mapping[str, tuple]
+    quizzes_by_id: Mapping[str, Mapping]
+    resources_by_category: Mapping[str, tuple]
+    tips_by_category: Mapping[str, tuple]
+    all_tips: tuple
+    all_polls: tuple
+    questions_by_category: Mapping[str, tuple]
+    versions: Mapping[str, int]
+
+
+class ContentRepository:
+    """Parse every content file once and serve indexed, read-only lookups.
+
+    All returned objects are immutable views (mappingproxy/tuple); callers
+    that need to add fields must copy first, e.g. ``dict(challenge)``.
+    """
+
+    def __init__(self, base_dir: str = '.'):
+        self.base_dir = base_dir
+        self._reload_lock = threading.Lock()
+        self._snapshot = self._build_snapshot({}, {})
+        self.load_all()
+
+    def _path(self, relative_path: str) -> str:
+        return os.path.join(self.base_dir, relative_path)
+
+    def source_files(self) -> Dict[str, str]:
+        """Map every content source name to its file path."""
+        files = {name: self._path(path) for name, path in CONTENT_FILES.items()}
+        questions_dir = self._path(QUIZ_QUESTIONS_DIR)
+        if os.path.isdir(questions_dir):
+            for filename in sorted(os.listdir(questions_dir)):
+                if filename.endswith(QUIZ_QUESTIONS_SUFFIX):
+                    category = filename[:-len(QUIZ_QUESTIONS_SUFFIX)]
+                    files[f"questions:{category}"] = os.path.join(questions_dir, filename)
+        return files
+
+    @staticmethod
+    def _parse(name: str, path: str) -> Any:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = freeze(json.load(f))
+        validate_content(name, data)
+        if name == 'custom_challenges':
+            data = _with_custom_ids(data)
+        return data
+
+    def load_all(self):
+        """(Re)load every content file and rebuild the indexes."""
+        sources = {}
+        for name, path in self.source_files().items():
+            try:
+                sources[name] = self._parse(name, path)
+            except FileNotFoundError:
+                logger.warning(f"Content file not found: {path}")
+            except Exception as e:
+                logger.error(f"Error loading content file {path}: {e}")
+        with self._reload_lock:
+            versions = {name: self._snapshot.versions.get(name, 0) + 1 for name in sources}
+            self._snapshot = self._build_snapshot(sources, versions)
+        logger.info(f"Loaded {len(sources)} content files")
+
+    def reload_source(self, name: str) -> bool:
+        """Re-parse one content source and swap in a new snapshot.
+
+        Blocking; run it off the event loop. If the file is missing or
+        invalid the current version is kept and False is returned.
+        """
+        path = self.source_files().get(name)
+        if path is None:
+            logger.warning(f"Unknown content source: {name}")
+            return False
+        try:
+            data = self._parse(name, path)
+        except Exception as e:
+            logger.error(f"Keeping previous version of {path}, reload failed: {e}")
+            return False
+
+        with self._reload_lock:
+            old = self._snapshot
+            sources = dict(old.sources)
+            sources[name] = data
+            versions = dict(old.versions)
+            versions[name] = versions.get(name, 0) + 1
+            # Readers keep whatever snapshot they already hold; this is a single reference swap
+            self._snapshot = self._build_snapshot(sources, versions)
+        logger.info(f"Reloaded content {name} from {path} (version {versions[name]})")
+        return True
+
+    def version(self, name: str) -> int:
+        """Get how many times a source has been loaded, 0 if never."""
+        return self._snapshot.versions.get(name, 0)
+
+    def _build_snapshot(self, sources: Dict[str, Any], versions: Dict[str, int]) -> ContentSnapshot:
+        """Build all indexes for a set of parsed sources."""
+        challenges_by_key = {}
+        for category, levels in (sources.get('challenges') or {}).items():
+            if isinstance(levels, Mapping):
+                for difficulty, challenges in levels.items():
+                    challenges_by_key[(category, difficulty)] = challenges
+
+        challenges_by_id = {}
+        challenges_by_location = {}
+        locations_by_id = {}
+        for name in CHALLENGE_SOURCES:
+            for category, difficulty, challenge in _iter_challenges(name, sources.get(name) or {}):
+                if 'id' not in challenge:
+                    continue
+                entry = IndexedChallenge(challenge, category, difficulty, name)
+                challenges_by_location.setdefault((category, difficulty, entry.id), entry)
+                # First source in CHALLENGE_SOURCES order wins a contested id
+                challenges_by_id.setdefault(entry.id, entry)
+                locations_by_id.setdefault(entry.id, []).append(f"{name}:{category}/{difficulty}")
+        challenge_id_collisions = {
+            challenge_id: tuple(locations)
+            for challenge_id, locations in locations_by_id.items()
+            if len(locations) > 1
+        }
+        for challenge_id, locations in challenge_id_collisions.items():
+            logger.warning(
+                f"Challenge id {challenge_id} is used {len(locations)} times "
+                f"({', '.join(locations)}); by id it resolves to {locations[0]}"
+            )
+
+        quizzes_by_category = {}
+        quizzes_by_id = {}
+        for category, quizzes in (sources.get('quizzes') or {}).items():
+            quizzes_by_category[category] = quizzes
+            for quiz in quizzes:
+                if 'id' in quiz:
+                    quizzes_by_id.setdefault(str(quiz['id']), quiz)
+
+        resources_by_category = {}
+        resource_data = sources.get('learning_resources') or {}
+        for category, cat_data in (resource_data.get('categories') or {}).items():
+            resources_by_category[category] = tuple(
+                resource
+                for level in cat_data.get('levels', {}).values()
+                for resource in level.get('resources', ())
+            )
+
+        tips_by_category = {}
+        tips = sources.get('tips') or {}
+        if isinstance(tips, Mapping):
+            for category, category_tips in tips.items():
+                if isinstance(category_tips, tuple):
+                    tips_by_category[category] = category_tips
+        all_tips = tuple(tip for category_tips in tips_by_category.values() for tip in category_tips)
+        if isinstance(tips, tuple):
+            all_tips = tips
+
+        polls = sources.get('polls') or {}
+        if isinstance(polls, Mapping):
+            all_polls = tuple(
+                poll
+                for category_polls in polls.values() if isinstance(category_polls, tuple)
+                for poll in category_polls
+            )
+        else:
+            all_polls = polls
+
+        questions_by_category = {
+            name.split(':', 1)[1]: data.get('questions', ())
+            for name, data in sources.items()
+            if name.startswith('questions:')
+        }
+
+        return ContentSnapshot(
+            sources=MappingProxyType(dict(sources)),
+            challenges_by_key=MappingProxyType(challenges_by_key),
+            challenges_by_id=MappingProxyType(challenges_by_id),
+            challenges_by_location=MappingProxyType(challenges_by_location),
+            challenge_id_collisions=MappingProxyType(challenge_id_collisions),
+            quizzes_by_category=MappingProxyType(quizzes_by_category),
+            quizzes_by_id=MappingProxyType(quizzes_by_id),
+            resources_by_category=MappingProxyType(resources_by_category),
+            tips_by_category=MappingProxyType(tips_by_category),
+            all_tips=all_tips,
+            all_polls=all_polls,
+            questions_by_category=MappingProxyType(questions_by_category),
+            versions=MappingProxyType(dict(versions)),
+        )
+
+    def source(self, name: str) -> Optional[Any]:
+        """Get the parsed content of a source, or None if it failed to load."""
+        return self._snapshot.sources.get(name)
+
+    # Challenges
+
+    @property
+    def challenges(self) -> Mapping:
+        """Programming challenges as {category: {difficulty: (challenge, ...)}}."""
+        return self.source('challenges') or EMPTY_MAPPING
+
+    @property
+    def custom_challenges(self) -> Mapping:
+        """Custom challenges as {difficulty: (challenge, ...)}."""
+        return self.source('custom_challenges') or EMPTY_MAPPING
+
+    def challenges_for(self, category: str, difficulty: str) -> tuple:
+        """Get the challenges for a category and difficulty."""
+        return self._snapshot.challenges_by_key.get((category, difficulty), ())
+
+    def get_challenge_by_id(self, challenge_id: str) -> Optional[IndexedChallenge]:
+        """Look up a challenge by id across all challenge sources."""
+        return self._snapshot.challenges_by_id.get(str(challenge_id))
+
+    def find_challenge(self, challenge_id: str, category: Optional[str] = None,
+                       difficulty: Optional[str] = None) -> Optional[IndexedChallenge]:
+        """Look up a challenge by id, preferring the given category and difficulty.
+
+        The location only matters for ids that appear more than once.
+        """
+        snapshot = self._snapshot
+        if category and difficulty:
+            entry = snapshot.challenges_by_location.get((category, difficulty, str(challenge_id)))
+            if entry is not None:
+                return entry
+        return snapshot.challenges_by_id.get(str(challenge_id))
+
+    @property
+    def challenge_id_collisions(self) -> Mapping[str, tuple]:
+        """Ids used by more than one challenge, with where each one is."""
+        return self._snapshot.challenge_id_collisions
+
+    def all_challenges(self) -> tuple:
+        """Get every challenge from every challenge source, with or without an id."""
+        sources = self._snapshot.sources
+        return tuple(
+            challenge
+            for name in CHALLENGE_SOURCES
+            for _, _, challenge in _iter_challenges(name, sources.get(name) or {})
+        )
+
+    # Quizzes
+
+    @property
+    def quizzes(self) -> Mapping:
+        """Quizzes as {category: (quiz, ...)}."""
+        return self.source('quizzes') or EMPTY_MAPPING
+
+    def quizzes_for(self, category: str) -> tuple:
+        """Get the quizzes for a category."""
+        return self._snapshot.quizzes_by_category.get(category, ())
+
+    def get_quiz_by_id(self, quiz_id: str) -> Optional[Mapping]:
+        """Look up a quiz by id."""
+        return self._snapshot.quizzes_by_id.get(str(quiz_id))
+
+    @property
+    def quiz_questions(self) -> Mapping:
+        """Quiz questions from quiz_questions/ as {category: (question, ...)}."""
+        return self._snapshot.questions_by_category
+
+    # Learning resources
+
+    @property
+    def learning_resources(self) -> Mapping:
+        """The raw learning resources document."""
+        return self.source('learning_resources') or EMPTY_MAPPING
+
+    def resources_for(self, category: str) -> tuple:
+        """Get every resource in a category across all levels."""
+        return self._snapshot.resources_by_category.get(category, ())
+
+    # Tips, polls and discussions
+
+    @property
+    def tips(self) -> Mapping:
+        """Tips as {category: (tip, ...)}."""
+        return self.source('tips') or EMPTY_MAPPING
+
+    def tips_for(self, category: str) -> tuple:
+        """Get the tips for a category."""
+        return self._snapshot.tips_by_category.get(category, ())
+
+    def all_tips(self) -> tuple:
+        """Get every tip across all categories."""
+        return self._snapshot.all_tips
+
+    def all_polls(self) -> tuple:
+        """Get every poll across all categories."""
+        return self._snapshot.all_polls
+
+    @property
+    def discussions(self) -> Optional[Mapping]:
+        """The discussions document, or None if it failed to load."""
+        return self.source('discussions')
+
+
+_repository = None
+
+
+def get_content_repository() -> ContentRepository:
+    """Return the process-wide content repository, loading it on first use."""
+    global _repository
+    if _repository is None:
+        _repository = ContentRepository()
+    return _repository
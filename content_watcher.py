@@ -0,0 +1,130 @@
+"""Reload content files into the ContentRepository when they change on disk."""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Set, Tuple
+
+import config
+from content_repository import ContentRepository
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not installed or not on Linux: fall back to polling
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class ContentWatcher:
+    """Watch the content files and hot-reload the ones that change.
+
+    Uses inotify when available and falls back to polling file mtimes.
+    Only the changed file is re-parsed, in a worker thread, and the
+    repository keeps the old version if the new one fails to validate.
+    """
+
+    def __init__(self, repository: ContentRepository,
+                 poll_interval: float = config.CONTENT_POLL_INTERVAL_SECONDS,
+                 debounce: float = config.CONTENT_RELOAD_DEBOUNCE_SECONDS):
+        self.repository = repository
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._task: Optional[asyncio.Task] = None
+        self._inotify = None
+
+    def start(self):
+        """Start watching in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop watching."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _paths(self) -> Dict[str, str]:
+        """Map absolute file path -> content source name."""
+        return {os.path.abspath(path): name for name, path in self.repository.source_files().items()}
+
+    async def _run(self):
+        try:
+            if INotify is not None:
+                try:
+                    await self._watch_inotify()
+                    return
+                except OSError as e:
+                    logger.warning(f"inotify unavailable ({e}), polling content files instead")
+            await self._watch_polling()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Content watcher stopped: {e}", exc_info=True)
+
+    async def _reload(self, names: Set[str]):
+        for name in sorted(names):
+            await asyncio.to_thread(self.repository.reload_source, name)
+
+    async def _watch_inotify(self):
+        self._inotify = INotify()
+        loop = asyncio.get_running_loop()
+        watch_mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        watched_dirs = {}
+        for path in self._paths():
+            directory = os.path.dirname(path)
+            if directory not in watched_dirs and os.path.isdir(directory):
+                watched_dirs[self._inotify.add_watch(directory, watch_mask)] = directory
+
+        changed = asyncio.Event()
+        pending: Set[str] = set()
+
+        def on_readable():
+            for event in self._inotify.read(timeout=0):
+                directory = watched_dirs.get(event.wd)
+                if directory and event.name:
+                    pending.add(os.path.join(directory, event.name))
+            changed.set()
+
+        loop.add_reader(self._inotify.fileno(), on_readable)
+        logger.info(f"Watching {len(watched_dirs)} content directories with inotify")
+        try:
+            while True:
+                await changed.wait()
+                # Editors often write a file in several steps; let them finish
+                await asyncio.sleep(self.debounce)
+                changed.clear()
+                # Re-read the mapping so new quiz_questions files are picked up
+                paths = self._paths()
+                names = {paths[path] for path in pending if path in paths}
+                pending.clear()
+                await self._reload(names)
+        finally:
+            loop.remove_reader(self._inotify.fileno())
+            self._inotify.close()
+            self._inotify = None
+
+    def _stat_all(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for path, name in self._paths().items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[name] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    async def _watch_polling(self):
+        logger.info(f"Polling content files for changes every {self.poll_interval}s")
+        known = await asyncio.to_thread(self._stat_all)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(self._stat_all)
+            names = {name for name, stat in current.items() if known.get(name) != stat}
+            known = current
+            if names:
+                await asyncio.sleep(self.debounce)
+                await self._reload(names)
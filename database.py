@@ -0,0 +1,1295 @@
+"""Database access for the bot."""
+import asyncio
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'bot.db'
+
+# Versioned schema changes applied on top of setup_database(). The current
+# version is kept in PRAGMA user_version; append new steps, never edit old ones.
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # record_quiz_attempt upserts on (user_id, quiz_id), which needs a
+        # unique key. Keep the newest row of any duplicates before adding it.
+        """
+        DELETE FROM quiz_history WHERE id NOT IN (
+            SELECT MAX(id) FROM quiz_history GROUP BY user_id, quiz_id
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_history_user_quiz ON quiz_history (user_id, quiz_id)",
+        # Leaderboard: ORDER BY points DESC LIMIT n
+        "CREATE INDEX IF NOT EXISTS idx_user_points_points ON user_points (points DESC)",
+        # Quiz history: WHERE user_id = ? ORDER BY attempt_date DESC
+        "CREATE INDEX IF NOT EXISTS idx_quiz_progress_user_date ON quiz_progress (user_id, attempt_date)",
+        # Translation cache expiry: WHERE timestamp < ?
+        "CREATE INDEX IF NOT EXISTS idx_translation_cache_timestamp ON translation_cache (timestamp)",
+    ]),
+    (2, [
+        # Points per (scope, period, user), maintained on every scoring write.
+        # scope is 'global' or a group chat id; period is 'all', 'week:YYYY-Www'
+        # or 'month:YYYY-MM' (see rollup_periods()).
+        """
+        CREATE TABLE IF NOT EXISTS points_rollup (
+            scope TEXT NOT NULL,
+            period TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, period, user_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_points_rollup_rank ON points_rollup (scope, period, points DESC)",
+    ]),
+    (3, [
+        # No-repeat draw order per (user, bag): item i of a cycle is
+        # (multiplier * i + offset) % size, see shuffle_bag.ShuffleBags.
+        """
+        CREATE TABLE IF NOT EXISTS shuffle_bags (
+            user_id INTEGER NOT NULL,
+            bag TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            multiplier INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            cursor INTEGER NOT NULL,
+            PRIMARY KEY (user_id, bag)
+        )
+        """,
+    ]),
+    (4, [
+        # Per-group message rate limit; NULL means the config default
+        "ALTER TABLE group_settings ADD COLUMN rate_limit_messages INTEGER",
+        "ALTER TABLE group_settings ADD COLUMN rate_limit_window_seconds INTEGER",
+    ]),
+    (5, [
+        # Durable timers (see timers.DurableTimers). due_at is a unix
+        # timestamp; scheduling the same (action, key) again replaces it.
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            key TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (action, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_actions_due ON scheduled_actions (due_at)",
+    ]),
+    (6, [
+        # Scheduled posts fanned out to every target group (see broadcast.py).
+        # steps is the rendered payload as JSON; completed_at stays NULL until
+        # every delivery has finished, so unfinished broadcasts can resume.
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            steps TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            completed_at TIMESTAMP
+        )
+        """,
+        # One row per (broadcast, group); step is the next payload step to send
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+            broadcast_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            step INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (broadcast_id, group_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_broadcasts_unfinished ON broadcasts (completed_at)",
+    ]),
+    (7, [
+        # OCR results by SHA-256 of the image bytes (see ocr_cache.OCRCache)
+        """
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            image_hash TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            error_type TEXT NOT NULL,
+            last_used TIMESTAMP NOT NULL
+        )
+        """,
+        # Telegram file_unique_id -> image_hash, so repeats skip the download
+        """
+        CREATE TABLE IF NOT EXISTS ocr_files (
+            file_unique_id TEXT PRIMARY KEY,
+            image_hash TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used)",
+        "CREATE INDEX IF NOT EXISTS idx_ocr_files_hash ON ocr_files (image_hash)",
+    ]),
+    (8, [
+        # Replaces translation_cache, whose key was the full original text and
+        # didn't include the language. text_hash is the SHA-256 digest of the
+        # original text and payload the zlib-compressed translation (see
+        # translation_key() and pack_translation()). Existing rows are moved
+        # over in the background by AsyncDatabase.migrate_legacy_translations().
+        """
+        CREATE TABLE IF NOT EXISTS translations (
+            text_hash BLOB NOT NULL,
+            language TEXT NOT NULL,
+            provider_version TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (text_hash, language, provider_version)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_translations_expires ON translations (expires_at)",
+    ]),
+    (9, [
+        # Shuffle bags now store a seed for shuffle_bag.permute() instead of
+        # an affine (multiplier, offset) pair. Old rows can't be converted,
+        # so every bag starts a fresh cycle.
+        "DROP TABLE IF EXISTS shuffle_bags",
+        """
+        CREATE TABLE IF NOT EXISTS shuffle_bags (
+            user_id INTEGER NOT NULL,
+            bag TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            seed INTEGER NOT NULL,
+            cursor INTEGER NOT NULL,
+            PRIMARY KEY (user_id, bag)
+        )
+        """,
+    ]),
+]
+
+
+def translation_key(text: str) -> bytes:
+    """Key of a cached translation: the SHA-256 digest of the original text."""
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+def pack_translation(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'))
+
+
+def unpack_translation(payload: bytes) -> str:
+    return zlib.decompress(payload).decode('utf-8')
+
+
+GLOBAL_SCOPE = 'global'
+ALL_TIME = 'all'
+
+
+def week_period(when: datetime) -> str:
+    """Rollup period key for the ISO week containing when."""
+    year, week, _ = when.isocalendar()
+    return f"week:{year}-W{week:02d}"
+
+
+def month_period(when: datetime) -> str:
+    """Rollup period key for the month containing when."""
+    return f"month:{when:%Y-%m}"
+
+
+def rollup_periods(group_id: int = None, when: datetime = None) -> list:
+    """List the (scope, period) rollups a scoring event contributes to.
+
+    Global all-time points live in user_points, so they are not rolled up.
+    """
+    when = when or datetime.now()
+    periods = [week_period(when), month_period(when)]
+    keys = [(GLOBAL_SCOPE, period) for period in periods]
+    if group_id is not None:
+        keys += [(str(group_id), period) for period in [ALL_TIME] + periods]
+    return keys
+
+# Hot queries whose plans are reported by the /dbstats command
+DIAGNOSTIC_QUERIES = {
+    'leaderboard': (
+        "SELECT user_id, points FROM user_points ORDER BY points DESC LIMIT ?",
+        (10,)
+    ),
+    'user_points': (
+        "SELECT points FROM user_points WHERE user_id = ?",
+        (0,)
+    ),
+    'quiz_history': (
+        """
+        SELECT qp.quiz_id, qh.attempt_count
+        FROM quiz_progress qp
+        JOIN quiz_history qh ON qp.user_id = qh.user_id AND qp.quiz_id = qh.quiz_id
+        WHERE qp.user_id = ?
+        ORDER BY qp.attempt_date DESC LIMIT ?
+        """,
+        (0, 10)
+    ),
+    'translation_lookup': (
+        "SELECT payload FROM translations WHERE text_hash IN (?) AND language = ? "
+        "AND provider_version = ? AND expires_at > ?",
+        (b'', 'so', '', 0)
+    ),
+    'translation_cleanup': (
+        "SELECT COUNT(*) FROM translations WHERE expires_at < ?",
+        (0,)
+    ),
+    'warnings': (
+        "SELECT warning_count FROM user_warnings WHERE user_id = ? AND group_id = ?",
+        (0, 0)
+    ),
+}
+
+
+class DatabaseManager:
+    """Manage database operations."""
+
+    def __init__(self, db_path: str = DB_PATH, read_only: bool = False):
+        """Initialize database connection."""
+        self.db_path = db_path
+        self.read_only = read_only
+        # When False the caller owns the transaction and commits in batches
+        self.autocommit = True
+        if read_only:
+            # Read-only connections are handed to pool threads and closed on
+            # shutdown from the main thread, so they can't be thread-bound.
+            uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_path)
+        self.cursor = self.conn.cursor()
+        self._apply_pragmas()
+        if not read_only:
+            self.setup_database()
+            self.migrate()
+
+    def _apply_pragmas(self):
+        """Configure the connection for a single-writer, many-reader workload."""
+        self.cursor.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+        self.cursor.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)}")
+        # With WAL, NORMAL only syncs at checkpoints and is still crash-safe
+        self.cursor.execute("PRAGMA synchronous = NORMAL")
+        if not self.read_only:
+            # WAL lets readers run alongside the writer
+            self.cursor.execute("PRAGMA journal_mode = WAL")
+
+    def migrate(self):
+        """Apply any schema migrations newer than the database's user_version."""
+        self.cursor.execute("PRAGMA user_version")
+        current = self.cursor.fetchone()[0]
+        for version, statements in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                self.cursor.execute("BEGIN")
+                for statement in statements:
+                    self.cursor.execute(statement)
+                self.cursor.execute(f"PRAGMA user_version = {int(version)}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                logger.error(f"Schema migration {version} failed", exc_info=True)
+                raise
+            logger.info(f"Applied schema migration {version}")
+
+    def setup_database(self):
+        """Create necessary tables if they don't exist."""
+        # User points and progress
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_points (
+                user_id INTEGER PRIMARY KEY,
+                points INTEGER DEFAULT 0,
+                last_updated TIMESTAMP,
+                completed_challenges TEXT DEFAULT '[]'
+            )
+        ''')
+
+        # Challenge tracking
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS challenge_progress (
+                user_id INTEGER,
+                challenge_id TEXT,
+                category TEXT,
+                difficulty TEXT,
+                completed BOOLEAN DEFAULT FALSE,
+                completion_date TIMESTAMP,
+                PRIMARY KEY (user_id, challenge_id)
+            )
+        ''')
+
+        # Quiz tracking
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_progress (
+                user_id INTEGER,
+                quiz_id TEXT,
+                category TEXT,
+                correct BOOLEAN,
+                points_earned INTEGER DEFAULT 0,
+                attempt_date TIMESTAMP,
+                answer TEXT,
+                PRIMARY KEY (user_id, quiz_id)
+            )
+        ''')
+
+        # Quiz history
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                quiz_id TEXT,
+                category TEXT,
+                attempt_count INTEGER DEFAULT 1,
+                last_attempt_date TIMESTAMP,
+                best_score INTEGER DEFAULT 0,
+                FOREIGN KEY (user_id, quiz_id) REFERENCES quiz_progress (user_id, quiz_id)
+            )
+        ''')
+
+        # Translation cache
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS translation_cache (
+                original_text TEXT PRIMARY KEY,
+                translated_text TEXT,
+                language TEXT,
+                timestamp TIMESTAMP
+            )
+        ''')
+
+        # Group management
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS group_settings (
+                group_id INTEGER PRIMARY KEY,
+                welcome_message TEXT,
+                rules TEXT,
+                spam_protection BOOLEAN DEFAULT TRUE,
+                link_filter BOOLEAN DEFAULT TRUE
+            )
+        ''')
+
+        # User warnings
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_warnings (
+                user_id INTEGER,
+                group_id INTEGER,
+                warning_count INTEGER DEFAULT 0,
+                last_warning TIMESTAMP,
+                reason TEXT,
+                PRIMARY KEY (user_id, group_id)
+            )
+        ''')
+
+        self.conn.commit()
+
+    def _commit(self):
+        if self.autocommit:
+            self.conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def get_user_progress(self, user_id: int) -> dict:
+        """Get user's challenge progress."""
+        self.cursor.execute(
+            "SELECT completed_challenges FROM user_points WHERE user_id = ?",
+            (user_id,)
+        )
+        result = self.cursor.fetchone()
+        if result:
+            return json.loads(result[0])
+        return []
+
+    def update_challenge_progress(self, user_id: int, challenge_id: str,
+                                category: str, difficulty: str, completed: bool = True):
+        """Update user's challenge progress."""
+        timestamp = datetime.now().isoformat()
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO challenge_progress
+            (user_id, challenge_id, category, difficulty, completed, completion_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, challenge_id, category, difficulty, completed, timestamp))
+        self._commit()
+
+    def get_user_points(self, user_id: int) -> int:
+        """Get a user's total points."""
+        self.cursor.execute(
+            "SELECT points FROM user_points WHERE user_id = ?",
+            (user_id,)
+        )
+        result = self.cursor.fetchone()
+        return result[0] if result else 0
+
+    def get_top_users(self, limit: int = 10) -> list:
+        """Get the users with the most points."""
+        self.cursor.execute(
+            "SELECT user_id, points FROM user_points ORDER BY points DESC LIMIT ?",
+            (limit,)
+        )
+        return self.cursor.fetchall()
+
+    def get_all_points(self) -> list:
+        """Get (user_id, points) for every user."""
+        self.cursor.execute("SELECT user_id, points FROM user_points")
+        return self.cursor.fetchall()
+
+    def add_points(self, user_id: int, points: int, group_id: int = None):
+        """Add points to a user's total."""
+        self.cursor.execute('''
+            INSERT INTO user_points (user_id, points, last_updated)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                points = points + ?,
+                last_updated = CURRENT_TIMESTAMP
+        ''', (user_id, points, points))
+        self._add_rollup_points(user_id, points, group_id)
+        self._commit()
+
+    def _add_rollup_points(self, user_id: int, points: int, group_id: int = None):
+        """Add points to the weekly, monthly and per-group rollups."""
+        if not points:
+            return
+        self.cursor.executemany('''
+            INSERT INTO points_rollup (scope, period, user_id, points)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (scope, period, user_id) DO UPDATE SET
+                points = points + excluded.points
+        ''', [
+            (scope, period, user_id, points)
+            for scope, period in rollup_periods(group_id)
+        ])
+
+    def get_rollup_top(self, scope: str, period: str, limit: int = 10) -> list:
+        """Get the top (user_id, points) pairs for a scope and period."""
+        self.cursor.execute('''
+            SELECT user_id, points FROM points_rollup
+            WHERE scope = ? AND period = ?
+            ORDER BY points DESC LIMIT ?
+        ''', (scope, period, limit))
+        return self.cursor.fetchall()
+
+    def compact_rollups(self, keep_weeks: int, keep_months: int):
+        """Delete weekly and monthly rollups older than the retention window."""
+        now = datetime.now()
+        oldest_week = week_period(now - timedelta(weeks=keep_weeks))
+        month_index = now.year * 12 + now.month - 1 - keep_months
+        oldest_month = f"month:{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+        self.cursor.execute(
+            "DELETE FROM points_rollup WHERE period >= 'week:' AND period < ?",
+            (oldest_week,)
+        )
+        deleted = self.cursor.rowcount
+        self.cursor.execute(
+            "DELETE FROM points_rollup WHERE period >= 'month:' AND period < ?",
+            (oldest_month,)
+        )
+        deleted += self.cursor.rowcount
+        self._commit()
+        return deleted
+
+    def get_shuffle_bags(self) -> list:
+        """Get (user_id, bag, size, seed, cursor) for every shuffle bag."""
+        self.cursor.execute(
+            "SELECT user_id, bag, size, seed, cursor FROM shuffle_bags"
+        )
+        return self.cursor.fetchall()
+
+    def save_shuffle_bag(self, user_id: int, bag: str, size: int, seed: int, cursor: int):
+        """Store the draw state of a user's shuffle bag."""
+        self.cursor.execute('''
+            INSERT INTO shuffle_bags (user_id, bag, size, seed, cursor)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, bag) DO UPDATE SET
+                size = excluded.size,
+                seed = excluded.seed,
+                cursor = excluded.cursor
+        ''', (user_id, bag, size, seed, cursor))
+        self._commit()
+
+    def get_group_rate_limits(self) -> list:
+        """Get (group_id, spam_protection, messages, window_seconds) for every group."""
+        self.cursor.execute('''
+            SELECT group_id, spam_protection, rate_limit_messages, rate_limit_window_seconds
+            FROM group_settings
+        ''')
+        return self.cursor.fetchall()
+
+    def set_group_rate_limit(self, group_id: int, messages: int = None, window_seconds: int = None):
+        """Set a group's message rate limit; None restores the default."""
+        self.cursor.execute('''
+            INSERT INTO group_settings (group_id, rate_limit_messages, rate_limit_window_seconds)
+            VALUES (?, ?, ?)
+            ON CONFLICT (group_id) DO UPDATE SET
+                rate_limit_messages = excluded.rate_limit_messages,
+                rate_limit_window_seconds = excluded.rate_limit_window_seconds
+        ''', (group_id, messages, window_seconds))
+        self._commit()
+
+    def schedule_action(self, action: str, key: str, due_at: float, payload: dict = None):
+        """Schedule an action, replacing any pending one with the same key."""
+        self.cursor.execute('''
+            INSERT INTO scheduled_actions (action, key, due_at, payload, attempts)
+            VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT (action, key) DO UPDATE SET
+                due_at = excluded.due_at,
+                payload = excluded.payload,
+                attempts = 0
+        ''', (action, key, due_at, json.dumps(payload or {})))
+        self._commit()
+
+    def cancel_action(self, action: str, key: str):
+        """Drop a pending action."""
+        self.cursor.execute(
+            "DELETE FROM scheduled_actions WHERE action = ? AND key = ?",
+            (action, key)
+        )
+        self._commit()
+
+    def next_action_due(self) -> float:
+        """Get the earliest due_at of any pending action, or None."""
+        self.cursor.execute("SELECT MIN(due_at) FROM scheduled_actions")
+        return self.cursor.fetchone()[0]
+
+    def get_due_actions(self, until: float, limit: int = 100) -> list:
+        """Get (id, action, key, due_at, payload, attempts) of actions due by until, oldest first."""
+        self.cursor.execute('''
+            SELECT id, action, key, due_at, payload, attempts FROM scheduled_actions
+            WHERE due_at <= ? ORDER BY due_at LIMIT ?
+        ''', (until, limit))
+        return [
+            (row[0], row[1], row[2], row[3], json.loads(row[4]), row[5])
+            for row in self.cursor.fetchall()
+        ]
+
+    def finish_action(self, action_id: int, due_at: float, attempts: int):
+        """Remove an action that has run.
+
+        due_at and attempts are the values the action was claimed with; if it
+        was rescheduled while running, the new schedule is kept.
+        """
+        self.cursor.execute(
+            "DELETE FROM scheduled_actions WHERE id = ? AND due_at = ? AND attempts = ?",
+            (action_id, due_at, attempts)
+        )
+        self._commit()
+
+    def retry_action(self, action_id: int, due_at: float, attempts: int, retry_at: float):
+        """Push a failed action back to retry_at and count the attempt, unless it was rescheduled."""
+        self.cursor.execute('''
+            UPDATE scheduled_actions SET due_at = ?, attempts = attempts + 1
+            WHERE id = ? AND due_at = ? AND attempts = ?
+        ''', (retry_at, action_id, due_at, attempts))
+        self._commit()
+
+    def create_broadcast(self, kind: str, steps: list, group_ids: list) -> int:
+        """Record a broadcast and a pending delivery per group; returns its id."""
+        now = datetime.now().isoformat()
+        self.cursor.execute(
+            "INSERT INTO broadcasts (kind, steps, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(steps), now)
+        )
+        broadcast_id = self.cursor.lastrowid
+        self.cursor.executemany(
+            "INSERT INTO broadcast_deliveries (broadcast_id, group_id, updated_at) VALUES (?, ?, ?)",
+            [(broadcast_id, group_id, now) for group_id in group_ids]
+        )
+        self._commit()
+        return broadcast_id
+
+    def get_unfinished_broadcasts(self) -> list:
+        """Get (id, kind, steps, created_at) of broadcasts that haven't completed."""
+        self.cursor.execute('''
+            SELECT id, kind, steps, created_at FROM broadcasts
+            WHERE completed_at IS NULL ORDER BY id
+        ''')
+        return [
+            (row[0], row[1], json.loads(row[2]), datetime.fromisoformat(row[3]))
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_pending_deliveries(self, broadcast_id: int) -> list:
+        """Get (group_id, step) of a broadcast's deliveries that are still pending."""
+        self.cursor.execute('''
+            SELECT group_id, step FROM broadcast_deliveries
+            WHERE broadcast_id = ? AND status = 'pending'
+        ''', (broadcast_id,))
+        return self.cursor.fetchall()
+
+    def update_delivery(self, broadcast_id: int, group_id: int, status: str,
+                        step: int, error: str = None):
+        """Record how far delivery to one group got."""
+        self.cursor.execute('''
+            UPDATE broadcast_deliveries SET status = ?, step = ?, error = ?, updated_at = ?
+            WHERE broadcast_id = ? AND group_id = ?
+        ''', (status, step, error, datetime.now().isoformat(), broadcast_id, group_id))
+        self._commit()
+
+    def expire_pending_deliveries(self, broadcast_id: int):
+        """Give up on a broadcast's deliveries that are still pending."""
+        self.cursor.execute('''
+            UPDATE broadcast_deliveries SET status = 'expired', updated_at = ?
+            WHERE broadcast_id = ? AND status = 'pending'
+        ''', (datetime.now().isoformat(), broadcast_id))
+        self._commit()
+
+    def complete_broadcast(self, broadcast_id: int) -> dict:
+        """Mark a broadcast finished and return its delivery count per status."""
+        self.cursor.execute(
+            "UPDATE broadcasts SET completed_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), broadcast_id)
+        )
+        self.cursor.execute('''
+            SELECT status, COUNT(*) FROM broadcast_deliveries
+            WHERE broadcast_id = ? GROUP BY status
+        ''', (broadcast_id,))
+        counts = dict(self.cursor.fetchall())
+        self._commit()
+        return counts
+
+    def cleanup_broadcasts(self, max_age_days: int) -> int:
+        """Delete finished broadcasts older than max_age_days with their deliveries."""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        self.cursor.execute('''
+            DELETE FROM broadcast_deliveries WHERE broadcast_id IN (
+                SELECT id FROM broadcasts WHERE completed_at IS NOT NULL AND created_at < ?
+            )
+        ''', (cutoff,))
+        self.cursor.execute(
+            "DELETE FROM broadcasts WHERE completed_at IS NOT NULL AND created_at < ?",
+            (cutoff,)
+        )
+        deleted = self.cursor.rowcount
+        self._commit()
+        return deleted
+
+    def get_ocr_result(self, image_hash: str):
+        """Get (text, error_type) of a cached OCR result, or None."""
+        self.cursor.execute(
+            "SELECT text, error_type FROM ocr_cache WHERE image_hash = ?",
+            (image_hash,)
+        )
+        return self.cursor.fetchone()
+
+    def get_ocr_result_by_file(self, file_unique_id: str):
+        """Get (image_hash, text, error_type) of the OCR result for a Telegram file, or None."""
+        self.cursor.execute('''
+            SELECT c.image_hash, c.text, c.error_type
+            FROM ocr_files f JOIN ocr_cache c ON c.image_hash = f.image_hash
+            WHERE f.file_unique_id = ?
+        ''', (file_unique_id,))
+        return self.cursor.fetchone()
+
+    def save_ocr_result(self, file_unique_id: str, image_hash: str, text: str, error_type: str):
+        """Store an OCR result and link the Telegram file to it."""
+        self.cursor.execute('''
+            INSERT INTO ocr_cache (image_hash, text, error_type, last_used)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (image_hash) DO UPDATE SET
+                text = excluded.text,
+                error_type = excluded.error_type,
+                last_used = excluded.last_used
+        ''', (image_hash, text, error_type, datetime.now().isoformat()))
+        self.link_ocr_file(file_unique_id, image_hash)
+
+    def link_ocr_file(self, file_unique_id: str, image_hash: str):
+        """Point a Telegram file at a cached OCR result and mark the result used."""
+        if file_unique_id:
+            self.cursor.execute(
+                "INSERT OR REPLACE INTO ocr_files (file_unique_id, image_hash) VALUES (?, ?)",
+                (file_unique_id, image_hash)
+            )
+        self.cursor.execute(
+            "UPDATE ocr_cache SET last_used = ? WHERE image_hash = ?",
+            (datetime.now().isoformat(), image_hash)
+        )
+        self._commit()
+
+    def cleanup_ocr_cache(self, max_age_days: int) -> int:
+        """Delete OCR results unused for max_age_days, and the file links to them."""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        self.cursor.execute('''
+            DELETE FROM ocr_files WHERE image_hash IN (
+                SELECT image_hash FROM ocr_cache WHERE last_used < ?
+            )
+        ''', (cutoff,))
+        self.cursor.execute("DELETE FROM ocr_cache WHERE last_used < ?", (cutoff,))
+        deleted = self.cursor.rowcount
+        self._commit()
+        return deleted
+
+    def get_translations(self, texts: list, language: str, provider_version: str,
+                         stale_seconds: float = 0, include_legacy: bool = False) -> dict:
+        """Get cached translations of several texts as {original text: (translation, expires_at)}.
+
+        Rows that expired less than stale_seconds ago are included, so the
+        caller can serve them while it fetches a fresh translation. With
+        include_legacy, texts not found are also looked up in the old
+        translation_cache table (expires_at None), for use until its rows
+        have been migrated.
+        """
+        if not texts:
+            return {}
+        keys = {translation_key(text): text for text in texts}
+        placeholders = ','.join('?' * len(keys))
+        self.cursor.execute(
+            f"SELECT text_hash, payload, expires_at FROM translations "
+            f"WHERE text_hash IN ({placeholders}) AND language = ? AND provider_version = ? "
+            f"AND expires_at > ?",
+            (*keys, language, provider_version, time.time() - stale_seconds)
+        )
+        found = {
+            keys[text_hash]: (unpack_translation(payload), expires_at)
+            for text_hash, payload, expires_at in self.cursor.fetchall()
+        }
+
+        missing = [text for text in texts if text not in found]
+        if include_legacy and missing:
+            placeholders = ','.join('?' * len(missing))
+            self.cursor.execute(
+                f"SELECT original_text, translated_text FROM translation_cache "
+                f"WHERE original_text IN ({placeholders}) AND language = ?",
+                (*missing, language)
+            )
+            found.update((original, (translated, None)) for original, translated in self.cursor.fetchall())
+        return found
+
+    def cache_translations(self, translations: dict, language: str, provider_version: str,
+                           ttl_seconds: int):
+        """Cache several translations, given as original text -> translation."""
+        expires_at = time.time() + ttl_seconds
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO translations
+            (text_hash, language, provider_version, payload, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(translation_key(original), language, provider_version, pack_translation(translated), expires_at)
+              for original, translated in translations.items()])
+        self._commit()
+
+    def migrate_translation_chunk(self, chunk_size: int, provider_version: str, ttl_seconds: int) -> int:
+        """Move up to chunk_size rows of the legacy translation_cache table into translations.
+
+        Rows keep their original expiry; already expired ones are just
+        dropped. Returns how many legacy rows were consumed.
+        """
+        self.cursor.execute(
+            "SELECT rowid, original_text, translated_text, language, timestamp FROM translation_cache LIMIT ?",
+            (chunk_size,)
+        )
+        rows = self.cursor.fetchall()
+        now = time.time()
+        records = []
+        for _, original, translated, language, timestamp in rows:
+            try:
+                expires_at = datetime.fromisoformat(timestamp).timestamp() + ttl_seconds
+            except (TypeError, ValueError):
+                expires_at = now + ttl_seconds
+            if original and translated and expires_at > now:
+                records.append((translation_key(original), language or 'so', provider_version,
+                                pack_translation(translated), expires_at))
+        # A translation cached since the upgrade is newer than the legacy row
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO translations
+            (text_hash, language, provider_version, payload, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', records)
+        self.cursor.executemany("DELETE FROM translation_cache WHERE rowid = ?", [(row[0],) for row in rows])
+        self._commit()
+        return len(rows)
+
+    def cleanup_translation_cache(self, stale_seconds: float = 0) -> int:
+        """Delete cached translations that expired more than stale_seconds ago."""
+        self.cursor.execute("DELETE FROM translations WHERE expires_at < ?", (time.time() - stale_seconds,))
+        deleted = self.cursor.rowcount
+        self._commit()
+        return deleted
+
+    def add_warning(self, user_id: int, group_id: int, reason: str):
+        """Add a warning for a user in a group."""
+        self.cursor.execute('''
+            INSERT INTO user_warnings (user_id, group_id, warning_count, last_warning, reason)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT (user_id, group_id) DO UPDATE SET
+            warning_count = warning_count + 1,
+            last_warning = excluded.last_warning,
+            reason = excluded.reason
+        ''', (user_id, group_id, datetime.now().isoformat(), reason))
+        self._commit()
+
+    def get_warnings(self, user_id: int, group_id: int) -> int:
+        """Get number of warnings for a user in a group."""
+        self.cursor.execute(
+            "SELECT warning_count FROM user_warnings WHERE user_id = ? AND group_id = ?",
+            (user_id, group_id)
+        )
+        result = self.cursor.fetchone()
+        return result[0] if result else 0
+
+    def clear_warnings(self, user_id: int, group_id: int):
+        """Remove all warnings for a user in a group."""
+        self.cursor.execute(
+            "DELETE FROM user_warnings WHERE user_id = ? AND group_id = ?",
+            (user_id, group_id)
+        )
+        self._commit()
+
+    def record_quiz_attempt(self, user_id: int, quiz_id: str, category: str,
+                          correct: bool, points: int, answer: str, group_id: int = None):
+        """Record a quiz attempt in the database."""
+        timestamp = datetime.now().isoformat()
+
+        # Record the attempt in quiz_progress
+        self.cursor.execute('''
+            INSERT INTO quiz_progress
+            (user_id, quiz_id, category, correct, points_earned, attempt_date, answer)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, quiz_id) DO UPDATE SET
+            correct = ?,
+            points_earned = CASE WHEN points_earned < ? THEN ? ELSE points_earned END,
+            attempt_date = ?,
+            answer = ?
+        ''', (
+            user_id, quiz_id, category, correct, points, timestamp, answer,
+            correct, points, points, timestamp, answer
+        ))
+
+        # Update quiz history
+        self.cursor.execute('''
+            INSERT INTO quiz_history
+            (user_id, quiz_id, category, attempt_count, last_attempt_date, best_score)
+            VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT (user_id, quiz_id) DO UPDATE SET
+            attempt_count = attempt_count + 1,
+            last_attempt_date = ?,
+            best_score = CASE WHEN best_score < ? THEN ? ELSE best_score END
+        ''', (
+            user_id, quiz_id, category, timestamp, points,
+            timestamp, points, points
+        ))
+
+        # Update total user points
+        self.cursor.execute('''
+            INSERT INTO user_points (user_id, points, last_updated)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+            points = points + ?,
+            last_updated = ?
+        ''', (
+            user_id, points, timestamp,
+            points if correct else 0, timestamp
+        ))
+
+        if correct:
+            self._add_rollup_points(user_id, points, group_id)
+
+        self._commit()
+
+    def get_quiz_stats(self, user_id: int) -> dict:
+        """Get quiz statistics for a user."""
+        self.cursor.execute('''
+            SELECT
+                COUNT(*) as total_attempts,
+                SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct_answers,
+                SUM(points_earned) as total_points,
+                COUNT(DISTINCT category) as categories_attempted
+            FROM quiz_progress
+            WHERE user_id = ?
+        ''', (user_id,))
+
+        result = self.cursor.fetchone()
+        if result:
+            return {
+                'total_attempts': result[0],
+                'correct_answers': result[1] or 0,
+                'total_points': result[2] or 0,
+                'categories_attempted': result[3],
+                'accuracy': (result[1] / result[0] * 100) if result[0] > 0 else 0
+            }
+        return {
+            'total_attempts': 0,
+            'correct_answers': 0,
+            'total_points': 0,
+            'categories_attempted': 0,
+            'accuracy': 0
+        }
+
+    def get_quiz_history(self, user_id: int, category: str = None, limit: int = 10) -> list:
+        """Get recent quiz history for a user."""
+        query = '''
+            SELECT
+                qp.quiz_id,
+                qp.category,
+                qp.correct,
+                qp.points_earned,
+                qp.attempt_date,
+                qh.attempt_count,
+                qh.best_score
+            FROM quiz_progress qp
+            JOIN quiz_history qh ON qp.user_id = qh.user_id AND qp.quiz_id = qh.quiz_id
+            WHERE qp.user_id = ?
+        '''
+        params = [user_id]
+
+        if category:
+            query += ' AND qp.category = ?'
+            params.append(category)
+
+        query += ' ORDER BY qp.attempt_date DESC LIMIT ?'
+        params.append(limit)
+
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
+
+    def get_diagnostics(self) -> dict:
+        """Report connection settings and the query plans of the hot queries."""
+        settings = {}
+        for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'user_version'):
+            self.cursor.execute(f"PRAGMA {pragma}")
+            settings[pragma] = self.cursor.fetchone()[0]
+
+        plans = {}
+        for name, (query, params) in DIAGNOSTIC_QUERIES.items():
+            self.cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            plans[name] = [row[3] for row in self.cursor.fetchall()]
+
+        return {'settings': settings, 'plans': plans}
+
+
+class WriteBehindQueue:
+    """Single writer thread that commits queued mutations in batches.
+
+    Writes are collected for up to ``batch_window`` seconds (or
+    ``batch_size`` statements) and committed in one transaction, so a burst
+    of quiz answers costs one fsync instead of one per button tap. Every
+    write runs inside its own savepoint, so a failing statement is rolled
+    back without losing the rest of the batch.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: str, batch_window: float, batch_size: int):
+        self.db_path = db_path
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._started = Future()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        # Surface connection/setup errors in the caller's thread
+        self._started.result()
+
+    def submit(self, method: str, args: tuple = (), kwargs: dict = None) -> Future:
+        """Queue a DatabaseManager call; the future resolves once it is committed."""
+        future = Future()
+        self._queue.put((method, args, kwargs or {}, future))
+        return future
+
+    def flush(self) -> Future:
+        """Return a future that resolves once everything queued so far is committed."""
+        return self.submit(None)
+
+    def stop(self):
+        """Commit whatever is queued, close the connection and end the thread."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            db = DatabaseManager(self.db_path)
+            db.autocommit = False
+        except Exception as e:
+            self._started.set_exception(e)
+            return
+        self._started.set_result(None)
+
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._STOP
+            self._commit_batch(db, [item for item in batch if item is not self._STOP])
+
+        db.close()
+
+    def _commit_batch(self, db: DatabaseManager, batch: list):
+        if not batch:
+            return
+        results = []
+        db.cursor.execute('BEGIN')
+        for method, args, kwargs, future in batch:
+            if method is None:
+                results.append((future, None, None))
+                continue
+            db.cursor.execute('SAVEPOINT write_item')
+            try:
+                result = getattr(db, method)(*args, **kwargs)
+            except Exception as e:
+                db.cursor.execute('ROLLBACK TO write_item')
+                results.append((future, None, e))
+            else:
+                results.append((future, result, None))
+            db.cursor.execute('RELEASE write_item')
+        try:
+            db.conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to commit batch of {len(batch)} writes: {e}")
+            db.conn.rollback()
+            results = [(future, None, e) for future, _, _ in results]
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class AsyncDatabase:
+    """Awaitable front end for DatabaseManager.
+
+    All writes go through a write-behind queue whose single thread owns the
+    read-write connection and group-commits them. Reads are spread over a
+    small pool of threads, each with its own read-only connection, so
+    handlers never block the event loop on sqlite I/O.
+
+    Writes return as soon as they are queued. Pass ``durable=True`` when the
+    reply depends on the write having landed (e.g. it reads the result back).
+    """
+
+    def __init__(self, db_path: str = DB_PATH, read_pool_size: int = config.DB_READ_POOL_SIZE):
+        self.db_path = db_path
+        self._writes = WriteBehindQueue(
+            db_path,
+            batch_window=config.DB_BATCH_WINDOW_MS / 1000,
+            batch_size=config.DB_BATCH_MAX_STATEMENTS
+        )
+        self._readers = ThreadPoolExecutor(max_workers=read_pool_size, thread_name_prefix='db-reader')
+        self._reader_local = threading.local()
+        self._reader_dbs = []
+        self._reader_lock = threading.Lock()
+        # Whether translation_cache may still hold rows not yet moved to translations
+        self.legacy_translations = True
+
+    def _reader_db(self) -> DatabaseManager:
+        """Return the read-only connection for the current pool thread."""
+        db = getattr(self._reader_local, 'db', None)
+        if db is None:
+            db = DatabaseManager(self.db_path, read_only=True)
+            self._reader_local.db = db
+            with self._reader_lock:
+                self._reader_dbs.append(db)
+        return db
+
+    def _run_read(self, method: str, args: tuple, kwargs: dict):
+        return getattr(self._reader_db(), method)(*args, **kwargs)
+
+    @staticmethod
+    def _log_write_error(future: Future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Queued database write failed: {error}")
+
+    async def _write(self, method: str, *args, durable: bool = False, **kwargs):
+        future = self._writes.submit(method, args, kwargs)
+        if durable:
+            return await asyncio.wrap_future(future)
+        future.add_done_callback(self._log_write_error)
+
+    async def _read(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, self._run_read, method, args, kwargs
+        )
+
+    async def get_user_progress(self, user_id: int) -> dict:
+        return await self._read('get_user_progress', user_id)
+
+    async def update_challenge_progress(self, user_id: int, challenge_id: str,
+                                        category: str, difficulty: str, completed: bool = True,
+                                        durable: bool = False):
+        await self._write('update_challenge_progress', user_id, challenge_id,
+                          category, difficulty, completed, durable=durable)
+
+    async def get_user_points(self, user_id: int) -> int:
+        return await self._read('get_user_points', user_id)
+
+    async def get_top_users(self, limit: int = 10) -> list:
+        return await self._read('get_top_users', limit)
+
+    async def get_all_points(self) -> list:
+        return await self._read('get_all_points')
+
+    async def get_all_points_after_writes(self) -> list:
+        """get_all_points() run by the writer, so it sees every write queued before it."""
+        return await self._write('get_all_points', durable=True)
+
+    async def add_points(self, user_id: int, points: int, group_id: int = None,
+                         durable: bool = False):
+        await self._write('add_points', user_id, points, group_id, durable=durable)
+
+    async def get_rollup_top(self, scope: str, period: str, limit: int = 10) -> list:
+        return await self._read('get_rollup_top', scope, period, limit)
+
+    async def compact_rollups(self, keep_weeks: int, keep_months: int) -> int:
+        return await self._write('compact_rollups', keep_weeks, keep_months, durable=True)
+
+    async def get_shuffle_bags(self) -> list:
+        return await self._read('get_shuffle_bags')
+
+    def queue_save_shuffle_bag(self, user_id: int, bag: str, size: int, seed: int, cursor: int):
+        """Queue a shuffle bag update without waiting; safe to call from sync code."""
+        future = self._writes.submit('save_shuffle_bag', (user_id, bag, size, seed, cursor), {})
+        future.add_done_callback(self._log_write_error)
+
+    async def get_group_rate_limits(self) -> list:
+        return await self._read('get_group_rate_limits')
+
+    async def set_group_rate_limit(self, group_id: int, messages: int = None,
+                                   window_seconds: int = None, durable: bool = False):
+        await self._write('set_group_rate_limit', group_id, messages, window_seconds, durable=durable)
+
+    async def schedule_action(self, action: str, key: str, due_at: float, payload: dict = None,
+                              durable: bool = False):
+        await self._write('schedule_action', action, key, due_at, payload, durable=durable)
+
+    async def cancel_action(self, action: str, key: str, durable: bool = False):
+        await self._write('cancel_action', action, key, durable=durable)
+
+    async def next_action_due(self) -> float:
+        return await self._read('next_action_due')
+
+    async def get_due_actions(self, until: float, limit: int = 100) -> list:
+        return await self._read('get_due_actions', until, limit)
+
+    async def finish_action(self, action_id: int, due_at: float, attempts: int, durable: bool = False):
+        await self._write('finish_action', action_id, due_at, attempts, durable=durable)
+
+    async def retry_action(self, action_id: int, due_at: float, attempts: int, retry_at: float,
+                           durable: bool = False):
+        await self._write('retry_action', action_id, due_at, attempts, retry_at, durable=durable)
+
+    async def create_broadcast(self, kind: str, steps: list, group_ids: list) -> int:
+        return await self._write('create_broadcast', kind, steps, group_ids, durable=True)
+
+    async def get_unfinished_broadcasts(self) -> list:
+        return await self._read('get_unfinished_broadcasts')
+
+    async def get_pending_deliveries(self, broadcast_id: int) -> list:
+        return await self._read('get_pending_deliveries', broadcast_id)
+
+    async def update_delivery(self, broadcast_id: int, group_id: int, status: str,
+                              step: int, error: str = None, durable: bool = False):
+        await self._write('update_delivery', broadcast_id, group_id, status, step, error,
+                          durable=durable)
+
+    async def expire_pending_deliveries(self, broadcast_id: int, durable: bool = False):
+        await self._write('expire_pending_deliveries', broadcast_id, durable=durable)
+
+    async def complete_broadcast(self, broadcast_id: int) -> dict:
+        return await self._write('complete_broadcast', broadcast_id, durable=True)
+
+    async def cleanup_broadcasts(self, max_age_days: int) -> int:
+        return await self._write('cleanup_broadcasts', max_age_days, durable=True)
+
+    async def get_ocr_result(self, image_hash: str):
+        return await self._read('get_ocr_result', image_hash)
+
+    async def get_ocr_result_by_file(self, file_unique_id: str):
+        return await self._read('get_ocr_result_by_file', file_unique_id)
+
+    async def save_ocr_result(self, file_unique_id: str, image_hash: str, text: str,
+                              error_type: str, durable: bool = False):
+        await self._write('save_ocr_result', file_unique_id, image_hash, text, error_type,
+                          durable=durable)
+
+    async def link_ocr_file(self, file_unique_id: str, image_hash: str, durable: bool = False):
+        await self._write('link_ocr_file', file_unique_id, image_hash, durable=durable)
+
+    async def cleanup_ocr_cache(self, max_age_days: int) -> int:
+        return await self._write('cleanup_ocr_cache', max_age_days, durable=True)
+
+    async def get_translations(self, texts: list, language: str, provider_version: str,
+                               stale_seconds: float = config.TRANSLATION_STALE_SECONDS) -> dict:
+        return await self._read('get_translations', texts, language, provider_version,
+                                stale_seconds, self.legacy_translations)
+
+    async def cache_translations(self, translations: dict, language: str, provider_version: str,
+                                 ttl_seconds: int = config.TRANSLATION_CACHE_DURATION,
+                                 durable: bool = False):
+        await self._write('cache_translations', translations, language, provider_version,
+                          ttl_seconds, durable=durable)
+
+    async def migrate_legacy_translations(self, provider_version: str,
+                                          chunk_size: int = config.TRANSLATION_MIGRATION_CHUNK,
+                                          pause: float = config.TRANSLATION_MIGRATION_PAUSE_SECONDS) -> int:
+        """Move the old translation_cache rows into translations, one chunk at a time.
+
+        Each chunk is a short write of its own with a pause after it, so
+        the bot's queued writes keep going in between. Until it finishes,
+        get_translations() also falls back to the old table.
+        """
+        moved = 0
+        while True:
+            count = await self._write('migrate_translation_chunk', chunk_size, provider_version,
+                                      config.TRANSLATION_CACHE_DURATION, durable=True)
+            moved += count
+            if count < chunk_size:
+                break
+            await asyncio.sleep(pause)
+        self.legacy_translations = False
+        if moved:
+            logger.info(f"Migrated {moved} legacy translation cache rows")
+        return moved
+
+    async def cleanup_translation_cache(self, stale_seconds: float = config.TRANSLATION_STALE_SECONDS) -> int:
+        return await self._write('cleanup_translation_cache', stale_seconds, durable=True)
+
+    async def add_warning(self, user_id: int, group_id: int, reason: str, durable: bool = False):
+        await self._write('add_warning', user_id, group_id, reason, durable=durable)
+
+    async def get_warnings(self, user_id: int, group_id: int) -> int:
+        return await self._read('get_warnings', user_id, group_id)
+
+    async def clear_warnings(self, user_id: int, group_id: int, durable: bool = False):
+        await self._write('clear_warnings', user_id, group_id, durable=durable)
+
+    async def record_quiz_attempt(self, user_id: int, quiz_id: str, category: str,
+                                  correct: bool, points: int, answer: str,
+                                  group_id: int = None, durable: bool = False):
+        await self._write('record_quiz_attempt', user_id, quiz_id, category,
+                          correct, points, answer, group_id, durable=durable)
+
+    async def get_quiz_stats(self, user_id: int) -> dict:
+        return await self._read('get_quiz_stats', user_id)
+
+    async def get_quiz_history(self, user_id: int, category: str = None, limit: int = 10) -> list:
+        return await self._read('get_quiz_history', user_id, category, limit)
+
+    async def get_diagnostics(self) -> dict:
+        return await self._read('get_diagnostics')
+
+    async def flush(self):
+        """Wait until every queued write has been committed."""
+        await asyncio.wrap_future(self._writes.flush())
+
+    async def close(self):
+        """Flush pending writes, close every connection and stop the worker threads."""
+        await asyncio.to_thread(self._writes.stop)
+        self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            for db in self._reader_dbs:
+                db.close()
+            self._reader_dbs.clear()
+        logger.info("Database connections closed")
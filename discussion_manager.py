@@ -4,6 +4,8 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
+from content_repository import get_content_repository
+
 logger = logging.getLogger(__name__)
 
 class DiscussionManager:
@@ -11,19 +13,15 @@ class DiscussionManager:
         self.discussions_file = "resources/discussions.json"
         self.active_poll = None
         self.active_discussion = None
-        self.discussions = self._load_discussions()
+        self._default_discussions = None
+        if get_content_repository().discussions is None:
+            logger.warning("Discussions not loaded. Creating default structure.")
+            self._default_discussions = self._create_default_discussions()
 
-    def _load_discussions(self) -> Dict:
-        """Load discussion topics from JSON file."""
-        try:
-            with open(self.discussions_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.warning("Discussions file not found. Creating default structure.")
-            return self._create_default_discussions()
-        except json.JSONDecodeError:
-            logger.error("Error parsing discussions file")
-            return self._create_default_discussions()
+    @property
+    def discussions(self) -> Dict:
+        """Current discussion topics, read from the repository so reloads are picked up."""
+        return get_content_repository().discussions or self._default_discussions
 
     def _create_default_discussions(self) -> Dict:
         """Create default discussion structure."""
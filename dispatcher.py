@@ -0,0 +1,352 @@
+"""Outbound message queue that keeps the bot inside Telegram's flood limits."""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import httpx
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Priority classes; lower numbers are sent first
+PRIORITY_MODERATION = 0
+PRIORITY_ALERT = 1
+PRIORITY_INTERACTIVE = 2
+PRIORITY_BROADCAST = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_MODERATION: 'moderation',
+    PRIORITY_ALERT: 'alert',
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BROADCAST: 'broadcast',
+}
+
+
+class TokenBucket:
+    """Allow ``rate`` sends per second with bursts of up to ``capacity``."""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a send is allowed (0 if it is allowed now)."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        """True once the bucket is full again and not blocked, so it can be dropped."""
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    func: Callable[..., Awaitable[Any]] = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: dict = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+# Bot API calls that are harmless to repeat if the first attempt did go through
+IDEMPOTENT_CALLS = frozenset({
+    'delete_message', 'edit_message_text', 'edit_message_reply_markup',
+    'restrict_chat_member', 'get_chat', 'get_chat_member', 'get_chat_administrators',
+})
+
+# httpx errors raised before the request was sent
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def may_have_been_sent(error: NetworkError) -> bool:
+    """Whether Telegram may have received (and carried out) a call that failed with error.
+
+    TimedOut is a NetworkError too: a read timeout can come after Telegram
+    already accepted the call. Only connection failures and pool timeouts
+    are known to have happened before anything was sent.
+    """
+    return not isinstance(error.__cause__, _NOT_SENT_ERRORS)
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter.retry_after as seconds; newer releases may give a timedelta."""
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class SendDispatcher:
+    """Send Bot API calls through one priority queue with Telegram's rate limits.
+
+    A global token bucket keeps the bot under ``global_rate`` calls per
+    second and every chat has its own bucket: ``group_per_minute`` for
+    groups and channels, ``private_per_second`` for private chats. Calls for
+    one chat go out one at a time and in order within a priority class;
+    higher-priority calls (moderation before broadcasts) overtake queued
+    ones. A call that is not allowed yet is parked with ``call_later``
+    instead of being polled.
+
+    RetryAfter pauses the chat for the time Telegram asks for and requeues
+    the call. Network errors that happened before the request was sent are
+    retried with jittered exponential backoff. A timeout or other error
+    after sending may mean Telegram carried the call out, so it is retried
+    once only for calls in IDEMPOTENT_CALLS; other calls, such as
+    send_message, fail rather than risk a duplicate post. Anything else
+    fails the call for the caller.
+    """
+
+    def __init__(self, global_rate: float = config.DISPATCH_GLOBAL_PER_SECOND,
+                 group_per_minute: float = config.DISPATCH_GROUP_PER_MINUTE,
+                 private_per_second: float = config.DISPATCH_PRIVATE_PER_SECOND,
+                 chat_burst: int = config.DISPATCH_CHAT_BURST,
+                 concurrency: int = config.DISPATCH_CONCURRENCY,
+                 max_retries: int = config.DISPATCH_MAX_RETRIES,
+                 retry_base: float = config.DISPATCH_RETRY_BASE_SECONDS):
+        self.group_rate = group_per_minute / 60
+        self.private_rate = private_per_second
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.concurrency = concurrency
+        self._global = TokenBucket(global_rate, global_rate, time.monotonic())
+        self._chats: Dict[int, TokenBucket] = {}
+        self._heap: List[_Job] = []
+        self._parked: Dict[int, List[_Job]] = {}
+        self._in_flight: Set[int] = set()
+        self._deferred: Set[asyncio.TimerHandle] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._next_prune = 0.0
+
+        self._pending = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._counters = {'sent': 0, 'failed': 0, 'retried': 0, 'retry_after': 0}
+
+    def start(self):
+        """Start the send worker."""
+        if self._worker is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sending; calls still queued fail with CancelledError."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        for handle in self._deferred:
+            handle.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._worker, *self._tasks, return_exceptions=True)
+        jobs = self._heap + [job for parked in self._parked.values() for job in parked]
+        for job in jobs:
+            if not job.future.done():
+                job.future.cancel()
+        self._heap.clear()
+        self._parked.clear()
+        self._deferred.clear()
+        self._worker = None
+
+    def submit(self, chat_id: int, func: Callable[..., Awaitable[Any]], /, *args,
+               priority: int = PRIORITY_INTERACTIVE, **kwargs) -> asyncio.Future:
+        """Queue ``func(*args, **kwargs)`` as a call to chat_id; returns a future for its result."""
+        loop = asyncio.get_running_loop()
+        job = _Job(priority, next(self._seq), chat_id, func, args, kwargs,
+                   loop.create_future(), time.monotonic())
+        self._pending += 1
+        self._push(job)
+        return job.future
+
+    async def send(self, chat_id: int, func: Callable[..., Awaitable[Any]], /, *args,
+                   priority: int = PRIORITY_INTERACTIVE, **kwargs) -> Any:
+        """Queue ``func(*args, **kwargs)`` as a call to chat_id and wait for its result."""
+        return await self.submit(chat_id, func, *args, priority=priority, **kwargs)
+
+    def submit_message(self, bot, chat_id: int, text: str, /,
+                       priority: int = PRIORITY_INTERACTIVE, **kwargs) -> asyncio.Future:
+        """Queue bot.send_message without waiting; returns a future for the sent Message."""
+        return self.submit(chat_id, bot.send_message, priority=priority,
+                           chat_id=chat_id, text=text, **kwargs)
+
+    async def send_message(self, bot, chat_id: int, text: str, /,
+                           priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Queue bot.send_message and wait for the sent Message."""
+        return await self.submit_message(bot, chat_id, text, priority=priority, **kwargs)
+
+    def _push(self, job: _Job):
+        heapq.heappush(self._heap, job)
+        self._wake.set()
+
+    def _defer(self, job: _Job, delay: float):
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._deferred.discard(handle)
+            self._push(job)
+
+        handle = loop.call_later(delay, requeue)
+        self._deferred.add(handle)
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Negative ids are groups and channels
+            rate = self.group_rate if chat_id < 0 else self.private_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now: float):
+        """Forget chats whose buckets have refilled."""
+        if now < self._next_prune:
+            return
+        self._chats = {
+            chat_id: bucket for chat_id, bucket in self._chats.items()
+            if chat_id in self._in_flight or not bucket.idle(now)
+        }
+        self._next_prune = now + 60
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._heap:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                now = time.monotonic()
+                global_delay = self._global.delay(now)
+                if global_delay > 0:
+                    await asyncio.sleep(global_delay)
+                    continue
+
+                job = heapq.heappop(self._heap)
+                if job.future.done():
+                    # The caller gave up waiting (cancelled); don't send it
+                    self._pending -= 1
+                    continue
+                if job.chat_id in self._in_flight:
+                    # Keep calls to one chat in order
+                    self._parked.setdefault(job.chat_id, []).append(job)
+                    continue
+                bucket = self._bucket(job.chat_id, now)
+                chat_delay = bucket.delay(now)
+                if chat_delay > 0:
+                    self._defer(job, chat_delay)
+                    continue
+
+                await self._slots.acquire()
+                now = time.monotonic()
+                bucket.take(now)
+                self._global.take(now)
+                self._in_flight.add(job.chat_id)
+                task = asyncio.create_task(self._deliver(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                self._prune(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in send dispatcher: {e}", exc_info=True)
+
+    async def _deliver(self, job: _Job):
+        if job.attempts == 0:
+            self._waits.append(time.monotonic() - job.enqueued)
+        job.attempts += 1
+        retry_delay = None
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            self._counters['retry_after'] += 1
+            delay = retry_after_seconds(e)
+            self._bucket(job.chat_id, time.monotonic()).blocked_until = time.monotonic() + delay
+            logger.warning(f"Flood limit hit for chat {job.chat_id}, pausing it for {delay:.0f}s")
+            retry_delay = delay + random.uniform(0, self.retry_base)
+            self._retry_or_fail(job, e, retry_delay)
+        except BadRequest as e:
+            self._fail(job, e)
+        except NetworkError as e:
+            if may_have_been_sent(e) and (
+                    job.attempts > 1 or getattr(job.func, '__name__', '') not in IDEMPOTENT_CALLS):
+                logger.warning(f"Not retrying call to chat {job.chat_id}, it may have gone through: {e!r}")
+                self._fail(job, e)
+            else:
+                retry_delay = self.retry_base * 2 ** (job.attempts - 1) * random.uniform(1, 1.5)
+                self._retry_or_fail(job, e, retry_delay)
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.cancel()
+            raise
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self._counters['sent'] += 1
+            self._pending -= 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight.discard(job.chat_id)
+            for parked in self._parked.pop(job.chat_id, ()):
+                self._push(parked)
+            self._slots.release()
+
+    def _retry_or_fail(self, job: _Job, error: Exception, delay: float):
+        if job.attempts > self.max_retries:
+            self._fail(job, error)
+            return
+        self._counters['retried'] += 1
+        self._defer(job, delay)
+
+    def _fail(self, job: _Job, error: Exception):
+        self._counters['failed'] += 1
+        self._pending -= 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Queue depth, outcome counters and queueing delay of recent sends."""
+        queued: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+        for job in self._heap:
+            queued[PRIORITY_NAMES.get(job.priority, str(job.priority))] += 1
+        waits = sorted(self._waits)
+        return {
+            'pending': self._pending,
+            'queued': queued,
+            'deferred': len(self._deferred),
+            'parked': sum(len(jobs) for jobs in self._parked.values()),
+            'in_flight': len(self._in_flight),
+            'chats_tracked': len(self._chats),
+            **self._counters,
+            'wait_avg': sum(waits) / len(waits) if waits else 0.0,
+            'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+            'wait_max': waits[-1] if waits else 0.0,
+        }
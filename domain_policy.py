@@ -0,0 +1,125 @@
+"""Allow/block decisions for the domains that links point at."""
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+ALLOWED = 'allowed'
+BLOCKED = 'blocked'
+UNLISTED = 'unlisted'
+
+_VERDICT = '$'  # Trie key holding a node's verdict; never a valid label
+
+
+def normalize_host(candidate: str) -> Optional[str]:
+    """Get the lowercase ASCII (punycode) hostname of a link, or None if it has none.
+
+    Accepts full URLs as well as bare 'example.com/path' style mentions.
+    """
+    candidate = candidate.strip()
+    if '://' not in candidate:
+        candidate = f"http://{candidate}"
+    try:
+        host = urlparse(candidate).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip('.')
+    if host.isascii():
+        # urlparse already lowercased it and ASCII labels need no IDNA encoding
+        return host if host and '..' not in host else None
+    labels = []
+    for label in host.split('.'):
+        if not label:
+            return None
+        try:
+            labels.append(label.encode('idna').decode('ascii'))
+        except UnicodeError:
+            # Not a valid IDNA label; compare it as written
+            labels.append(label)
+    return '.'.join(labels).lower()
+
+
+class DomainPolicy:
+    """Allow and block lists stored in one trie keyed by reversed domain labels.
+
+    An entry covers the domain and all of its subdomains, so ``python.org``
+    matches ``docs.python.org`` but not ``python.org.evil.io``. When both
+    lists cover a host, the more specific entry wins, and a block wins a tie.
+    Lookups cost one dict step per label of the host, however long the
+    lists are.
+    """
+
+    def __init__(self, allowed: Iterable[str] = (), blocked: Iterable[str] = ()):
+        self._root: Dict = {}
+        self.allowed_count = self.blocked_count = 0
+        for domain in allowed:
+            if self.add(domain, ALLOWED):
+                self.allowed_count += 1
+        for domain in blocked:
+            if self.add(domain, BLOCKED):
+                self.blocked_count += 1
+
+    @classmethod
+    def from_config(cls, config) -> 'DomainPolicy':
+        """Build the policy from config lists plus the optional list files."""
+        allowed = list(getattr(config, 'ALLOWED_DOMAINS', []))
+        blocked = list(getattr(config, 'BLOCKED_DOMAINS', []))
+        allowed += read_domain_file(getattr(config, 'ALLOWED_DOMAINS_FILE', None))
+        blocked += read_domain_file(getattr(config, 'BLOCKED_DOMAINS_FILE', None))
+        policy = cls(allowed, blocked)
+        logger.info(
+            f"Domain policy loaded: {policy.allowed_count} allowed, {policy.blocked_count} blocked"
+        )
+        return policy
+
+    def add(self, domain: str, verdict: str) -> bool:
+        """Add a domain to the allow or block list; returns False if it isn't a domain."""
+        host = normalize_host(domain)
+        if not host:
+            logger.warning(f"Ignoring invalid domain in {verdict} list: {domain!r}")
+            return False
+        node = self._root
+        for label in reversed(host.split('.')):
+            node = node.setdefault(label, {})
+        if node.get(_VERDICT) != BLOCKED:
+            node[_VERDICT] = verdict
+        return True
+
+    def verdict_for_host(self, host: str) -> str:
+        """Get the verdict for a normalized hostname."""
+        verdict = UNLISTED
+        node = self._root
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            verdict = node.get(_VERDICT, verdict)
+        return verdict
+
+    def verdict(self, link: str) -> str:
+        """Get the verdict for a link or bare domain."""
+        host = normalize_host(link)
+        return self.verdict_for_host(host) if host else UNLISTED
+
+
+def read_domain_file(path: Optional[str]) -> List[str]:
+    """Read one domain per line, ignoring blank lines and '#' comments."""
+    if not path:
+        return []
+    if not os.path.exists(path):
+        logger.warning(f"Domain list file not found: {path}")
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [
+                line.split('#', 1)[0].strip()
+                for line in f
+                if line.split('#', 1)[0].strip()
+            ]
+    except Exception as e:
+        logger.error(f"Error reading domain list {path}: {e}")
+        return []
@@ -0,0 +1,101 @@
+"""In-memory ranking of users by points."""
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """Ranked copy of the user_points table kept in memory.
+
+    Users are stored as ``(-points, user_id)`` in a sorted list, so top-N
+    and rank lookups are O(log n) and never touch the database. The table
+    stays the source of truth: seed with load() and use reconcile() to
+    correct any drift.
+    """
+
+    def __init__(self):
+        self._points = {}
+        self._ranked = SortedList()
+        # Bumped on every change; _changed_at holds each user's last value
+        self._version = 0
+        self._changed_at = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def version(self) -> int:
+        """Counter that goes up every time a user's points change."""
+        return self._version
+
+    def load(self, rows: Iterable[Tuple[int, int]]):
+        """Replace the ranking with (user_id, points) rows."""
+        self._points = {user_id: points or 0 for user_id, points in rows}
+        self._ranked = SortedList((-points, user_id) for user_id, points in self._points.items())
+        logger.info(f"Loaded leaderboard with {len(self._points)} users")
+
+    def set_points(self, user_id: int, points: int):
+        """Set a user's total points."""
+        old = self._points.get(user_id)
+        if old == points:
+            return
+        if old is not None:
+            self._ranked.remove((-old, user_id))
+        self._points[user_id] = points
+        self._ranked.add((-points, user_id))
+        self._version += 1
+        self._changed_at[user_id] = self._version
+
+    def add_points(self, user_id: int, points: int):
+        """Add points to a user's total, registering the user if needed."""
+        self.set_points(user_id, self._points.get(user_id, 0) + points)
+
+    def points(self, user_id: int) -> int:
+        """Get a user's total points."""
+        return self._points.get(user_id, 0)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Get a user's 1-based rank; users with equal points share a rank."""
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        # (-points,) sorts before every (-points, user_id) entry
+        return self._ranked.bisect_left((-points,)) + 1
+
+    def top(self, limit: int = 10) -> List[Tuple[int, int]]:
+        """Get the top (user_id, points) pairs."""
+        return [(user_id, -neg_points) for neg_points, user_id in self._ranked.islice(0, limit)]
+
+    def reconcile(self, rows: Iterable[Tuple[int, int]], since: Optional[int] = None) -> int:
+        """Bring the ranking in line with (user_id, points) rows from the table.
+
+        With ``since`` (a previous ``version``), users whose points changed
+        after that are skipped, as the rows may predate the change.
+        Returns the number of users that had to be corrected.
+        """
+        expected = {user_id: points or 0 for user_id, points in rows}
+        if since is not None:
+            expected = {
+                user_id: points for user_id, points in expected.items()
+                if self._changed_at.get(user_id, 0) <= since
+            }
+        fixed = 0
+        for user_id, points in expected.items():
+            if self._points.get(user_id) != points:
+                logger.warning(
+                    f"Leaderboard drift for user {user_id}: "
+                    f"memory={self._points.get(user_id)} table={points}"
+                )
+                self.set_points(user_id, points)
+                fixed += 1
+        stale = set(self._points) - set(expected)
+        if since is not None:
+            stale = {user_id for user_id in stale if self._changed_at.get(user_id, 0) <= since}
+        for user_id in stale:
+            logger.warning(f"Leaderboard has user {user_id} missing from the table")
+            self._ranked.remove((-self._points.pop(user_id), user_id))
+            fixed += 1
+        return fixed
@@ -0,0 +1,207 @@
+"""Compiled link and keyword detection for group moderation."""
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import config
+from domain_policy import ALLOWED, BLOCKED, DomainPolicy
+
+logger = logging.getLogger(__name__)
+
+# Match kinds, in the order the combined pattern tries them at each position
+TELEGRAM_LINK = 'telegram_link'
+SHORTENER = 'shortener'
+URL = 'url'
+MENTION = 'mention'
+BLOCKED_WORD = 'blocked_word'
+SPAM_WORD = 'spam_word'
+
+LINK_KINDS = (TELEGRAM_LINK, SHORTENER, URL, MENTION)
+
+LINK_KIND_LABELS = {
+    TELEGRAM_LINK: 'Telegram links',
+    SHORTENER: 'URL shorteners',
+    URL: 'Standard URLs',
+    MENTION: 'Username mentions',
+}
+
+# Links and mentions are only matched where a word starts, so the domain
+# pattern isn't retried (and failed) at every character of ordinary words
+# and the '@b' in an address like a@b.com isn't taken for a mention.
+LINK_PATTERN = re.compile(
+    r'(?<![\w-])(?:'
+    r'(?P<telegram_link>(?:t\.me|telegram\.me|telegram\.dog)\/\S+)'
+    r'|(?P<shortener>(?:bit\.ly|tinyurl\.com|goo\.gl|is\.gd|t\.co)\/\S+)'
+    r'|(?P<url>'
+    r'(?:https?:\/\/)?'  # Optional protocol
+    r'(?:(?:[\w-]+\.)+[\w-]+|'  # domain name
+    r'localhost|'  # localhost
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP address
+    r'(?::\d+)?'  # Optional port
+    r'(?:\/\S*)?)'  # Optional path
+    r'|(?P<mention>@\w+))',
+    re.IGNORECASE
+)
+
+
+# Words and single punctuation marks; whitespace only separates tokens
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds any of a set of keywords in one pass.
+
+    Matching is case-insensitive. With ``whole_words`` text and keywords are
+    split into word and punctuation tokens and matched token by token, so
+    'sex' matches "sex" but not "Sussex", 'http://' still matches in
+    "http://example.com", and "buy   now" matches 'buy now'. Without it
+    keywords match anywhere, character by character.
+
+    The failure links are folded into a full transition table up front, so
+    scanning is a single dict lookup per token.
+    """
+
+    def __init__(self, keywords: Iterable[str], whole_words: bool = True):
+        self.whole_words = whole_words
+        self.keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+        goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for symbol in self._symbols(keyword):
+                next_state = goto[state].get(symbol)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][symbol] = next_state
+                    goto.append({})
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+        self._delta = self._build_transitions(goto)
+
+    def _build_transitions(self, goto: List[Dict[str, int]]) -> List[Dict[str, int]]:
+        """Resolve failure links breadth-first into a complete transition table."""
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Anything without its own edge behaves like the failure state
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            self._out[state] += self._out[fail[state]]
+            for symbol, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state]].get(symbol, 0) if state else 0
+                queue.append(next_state)
+        return delta
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def _symbols(self, text: str):
+        text = text.lower()
+        return TOKEN_PATTERN.findall(text) if self.whole_words else text
+
+    def findall(self, text: str) -> List[str]:
+        """Get every keyword occurrence in the text, in order of where it ends."""
+        delta, out, keywords = self._delta, self._out, self.keywords
+        found = []
+        state = 0
+        for symbol in self._symbols(text):
+            state = delta[state].get(symbol, 0)
+            if out[state]:
+                found.extend(keywords[index] for index in out[state])
+        return found
+
+    def search(self, text: str) -> bool:
+        """Check whether any keyword occurs in the text."""
+        delta, out = self._delta, self._out
+        state = 0
+        for symbol in self._symbols(text):
+            state = delta[state].get(symbol, 0)
+            if out[state]:
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class ModerationMatch:
+    kind: str
+    text: str
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    """Everything the moderation rules found in one message."""
+    matches: Tuple[ModerationMatch, ...]
+
+    def of_kind(self, *kinds: str) -> List[ModerationMatch]:
+        return [match for match in self.matches if match.kind in kinds]
+
+    @property
+    def links(self) -> List[ModerationMatch]:
+        return self.of_kind(*LINK_KINDS)
+
+    @property
+    def blocked_words(self) -> List[str]:
+        return [match.text for match in self.of_kind(BLOCKED_WORD)]
+
+    @property
+    def spam_words(self) -> List[str]:
+        return [match.text for match in self.of_kind(SPAM_WORD)]
+
+
+class ModerationEngine:
+    """All link and keyword rules, compiled once.
+
+    scan() runs the combined link pattern and the keyword automaton over a
+    message and returns every match, tagged with its kind.
+    """
+
+    def __init__(self, blocked_words: Iterable[str] = None, spam_words: Iterable[str] = None,
+                 domain_policy: DomainPolicy = None, allowed_mentions: Iterable[str] = None):
+        blocked_words = list(config.DELETE_MESSAGES_CONTAINING if blocked_words is None else blocked_words)
+        spam_words = list(config.SPAM_WORDS if spam_words is None else spam_words)
+        if allowed_mentions is None:
+            allowed_mentions = [f"@{config.BOT_USERNAME}"] if hasattr(config, 'BOT_USERNAME') else []
+
+        self._keyword_kinds = {}
+        for word in spam_words:
+            self._keyword_kinds[word.lower()] = SPAM_WORD
+        # A word on both lists is treated as blocked
+        for word in blocked_words:
+            self._keyword_kinds[word.lower()] = BLOCKED_WORD
+        self.keywords = KeywordAutomaton(self._keyword_kinds)
+        self.domain_policy = domain_policy or DomainPolicy.from_config(config)
+        self.allowed_mentions = frozenset(allowed_mentions)
+
+    def scan(self, text: str) -> ScanResult:
+        """Find every link, blocked word and spam phrase in a message."""
+        matches = []
+        for match in LINK_PATTERN.finditer(text):
+            kind = match.lastgroup
+            if kind == MENTION and match.group() in self.allowed_mentions:
+                continue
+            matches.append(ModerationMatch(kind, match.group()))
+        for keyword in self.keywords.findall(text):
+            matches.append(ModerationMatch(self._keyword_kinds[keyword], keyword))
+        return ScanResult(tuple(matches))
+
+    def _verdict(self, link: ModerationMatch) -> str:
+        # Mentions have no domain; the allowed ones were dropped in scan()
+        if link.kind == MENTION:
+            return BLOCKED
+        return self.domain_policy.verdict(link.text)
+
+    def disallowed_links(self, result: ScanResult) -> List[ModerationMatch]:
+        """Links in a scan result that don't point at an allowed domain."""
+        return [link for link in result.links if self._verdict(link) != ALLOWED]
+
+    def blocked_links(self, result: ScanResult) -> List[ModerationMatch]:
+        """Links in a scan result that point at a blocked domain."""
+        return [
+            link for link in result.links
+            if link.kind != MENTION and self._verdict(link) == BLOCKED
+        ]
@@ -0,0 +1,83 @@
+"""Interchangeable ways of running Tesseract on a preprocessed image."""
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:  # Optional: needs libtesseract headers to install
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+SUBPROCESS = 'subprocess'
+TESSEROCR = 'tesserocr'
+
+TESSERACT_LANG = 'eng'
+
+
+class OCRBackend(ABC):
+    """Turns one preprocessed image into text."""
+    name = ''
+
+    @abstractmethod
+    def image_to_text(self, image: Image.Image, timeout: float = 0) -> str:
+        """Recognise the text of an image; raise RuntimeError after timeout seconds (0: no limit)."""
+
+
+class SubprocessBackend(OCRBackend):
+    """pytesseract: starts the tesseract binary, which loads its models, for every image."""
+    name = SUBPROCESS
+
+    def __init__(self, tesseract_cmd: Optional[str] = None):
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def image_to_text(self, image: Image.Image, timeout: float = 0) -> str:
+        return pytesseract.image_to_string(image, lang=TESSERACT_LANG,
+                                           config='--psm 6 --oem 3', timeout=timeout)
+
+
+class TesserocrBackend(OCRBackend):
+    """tesserocr: one TessBaseAPI per process, models loaded once and reused.
+
+    ``timeout`` is passed to Tesseract's own recognition deadline, which
+    stops the run instead of leaving it to finish in the background.
+    """
+    name = TESSEROCR
+
+    def __init__(self):
+        # Same settings as the subprocess backend's --psm 6 --oem 3
+        self._api = tesserocr.PyTessBaseAPI(
+            lang=TESSERACT_LANG,
+            psm=tesserocr.PSM.SINGLE_BLOCK,
+            oem=tesserocr.OEM.DEFAULT
+        )
+
+    def image_to_text(self, image: Image.Image, timeout: float = 0) -> str:
+        self._api.SetImage(image)
+        try:
+            # Recognize() takes milliseconds (0: no limit) and returns False when cut off or failed
+            if not self._api.Recognize(int(timeout * 1000)):
+                raise RuntimeError(f"Tesseract recognition failed or timed out after {timeout}s")
+            return self._api.GetUTF8Text()
+        finally:
+            self._api.Clear()
+
+
+def make_backend(name: str, tesseract_cmd: Optional[str] = None) -> OCRBackend:
+    """Create the named backend, falling back to the subprocess one if it can't load."""
+    if name == TESSEROCR:
+        if tesserocr is None:
+            logger.warning("tesserocr is not installed, using the tesseract binary for OCR")
+        else:
+            try:
+                return TesserocrBackend()
+            except Exception as e:
+                logger.error(f"Could not start tesserocr ({e}), using the tesseract binary for OCR")
+    elif name != SUBPROCESS:
+        logger.warning(f"Unknown OCR backend {name!r}, using {SUBPROCESS}")
+    return SubprocessBackend(tesseract_cmd)
@@ -0,0 +1,107 @@
+"""Content-addressed cache of OCR results."""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+import config
+from database import AsyncDatabase
+from ocr_worker import OCRResult
+
+logger = logging.getLogger(__name__)
+
+
+def hash_image(image_bytes: Union[bytes, bytearray]) -> str:
+    """SHA-256 of the encoded image bytes."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class OCRCache:
+    """OCR results by image hash, with Telegram file_unique_ids pointing at them.
+
+    Forwarded copies of a photo keep its file_unique_id, so most repeats are
+    answered before anything is downloaded. A photo uploaded again gets a new
+    id but usually the same bytes, which the hash lookup catches; the new id
+    is then linked to the cached result too.
+
+    The newest ``max_entries`` results live in an in-memory LRU. Every result
+    is also written to the ocr_cache table, so entries evicted from memory
+    (or lost on restart) are found there and promoted back. Hits refresh the
+    stored result's last_used, which cleanup() goes by; for hits served from
+    memory that write happens at most once per ``touch_interval`` seconds.
+    """
+
+    def __init__(self, db: AsyncDatabase, max_entries: int = config.OCR_CACHE_SIZE,
+                 touch_interval: float = config.OCR_CACHE_TOUCH_SECONDS):
+        self.db = db
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._results: 'OrderedDict[str, OCRResult]' = OrderedDict()
+        self._file_hashes: 'OrderedDict[str, str]' = OrderedDict()
+        # image hash -> time.monotonic() of the last last_used write
+        self._touched: Dict[str, float] = {}
+        self.hits = self.misses = 0
+
+    def _remember(self, image_hash: str, result: OCRResult, file_unique_id: Optional[str] = None):
+        self._results[image_hash] = result
+        self._results.move_to_end(image_hash)
+        while len(self._results) > self.max_entries:
+            evicted, _ = self._results.popitem(last=False)
+            self._touched.pop(evicted, None)
+        if file_unique_id:
+            self._file_hashes[file_unique_id] = image_hash
+            self._file_hashes.move_to_end(file_unique_id)
+            while len(self._file_hashes) > self.max_entries:
+                self._file_hashes.popitem(last=False)
+
+    async def _touch(self, image_hash: str, file_unique_id: Optional[str] = None):
+        """Mark a stored result used; without a file to link, only once per touch_interval."""
+        now = time.monotonic()
+        if not file_unique_id and now - self._touched.get(image_hash, -self.touch_interval) < self.touch_interval:
+            return
+        self._touched[image_hash] = now
+        await self.db.link_ocr_file(file_unique_id, image_hash)
+
+    async def get_by_file(self, file_unique_id: str) -> Optional[OCRResult]:
+        """Look a photo up by its Telegram file_unique_id, without downloading it."""
+        image_hash = self._file_hashes.get(file_unique_id)
+        if image_hash is not None and image_hash in self._results:
+            self._results.move_to_end(image_hash)
+            await self._touch(image_hash)
+            self.hits += 1
+            return self._results[image_hash]
+        row = await self.db.get_ocr_result_by_file(file_unique_id)
+        if row is None:
+            return None
+        image_hash, text, error_type = row
+        result = OCRResult(text, error_type)
+        self._remember(image_hash, result, file_unique_id)
+        await self._touch(image_hash)
+        self.hits += 1
+        return result
+
+    async def get_by_hash(self, image_hash: str, file_unique_id: str = None) -> Optional[OCRResult]:
+        """Look a downloaded image up by hash; a hit also links file_unique_id to it."""
+        result = self._results.get(image_hash)
+        if result is None:
+            row = await self.db.get_ocr_result(image_hash)
+            if row is not None:
+                result = OCRResult(*row)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(image_hash, result, file_unique_id)
+        await self._touch(image_hash, file_unique_id)
+        return result
+
+    async def put(self, file_unique_id: str, image_hash: str, result: OCRResult):
+        """Cache a fresh OCR result."""
+        self._remember(image_hash, result, file_unique_id)
+        self._touched[image_hash] = time.monotonic()  # save_ocr_result sets last_used
+        await self.db.save_ocr_result(file_unique_id, image_hash, result.text, result.error_type)
+
+    async def cleanup(self, max_age_days: int = config.OCR_CACHE_KEEP_DAYS) -> int:
+        """Drop stored results that haven't been used for max_age_days."""
+        return await self.db.cleanup_ocr_cache(max_age_days)
@@ -0,0 +1,230 @@
+"""OCR of error screenshots in a pool of worker processes."""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+from PIL import Image, ImageEnhance
+
+import config
+from ocr_backends import OCRBackend, make_backend
+
+logger = logging.getLogger(__name__)
+
+WINDOWS_TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+# Common error types and their keywords
+ERROR_PATTERNS = {
+    'syntax_error': ['syntaxerror', 'syntax error', 'invalid syntax'],
+    'name_error': ['nameerror', 'name error', 'not defined'],
+    'type_error': ['typeerror', 'type error'],
+    'value_error': ['valueerror', 'value error'],
+    'index_error': ['indexerror', 'index error', 'list index out of range'],
+    'key_error': ['keyerror', 'key error'],
+    'attribute_error': ['attributeerror', 'attribute error', 'has no attribute'],
+    'import_error': ['importerror', 'import error', 'no module named'],
+    'indentation_error': ['indentationerror', 'indentation error', 'unexpected indent'],
+    'runtime_error': ['runtimeerror', 'runtime error'],
+    'zero_division_error': ['zerodivisionerror', 'zero division error', 'division by zero'],
+    'file_not_found_error': ['filenotfounderror', 'file not found', 'no such file'],
+    'permission_error': ['permissionerror', 'permission error', 'permission denied'],
+    'memory_error': ['memoryerror', 'memory error', 'out of memory'],
+    'overflow_error': ['overflowerror', 'overflow error'],
+    'recursion_error': ['recursionerror', 'recursion error', 'maximum recursion depth'],
+    'assertion_error': ['assertionerror', 'assertion error', 'assertion failed'],
+    'unicode_error': ['unicodeerror', 'unicode error'],
+    'module_not_found_error': ['modulenotfounderror', 'module not found'],
+    'connection_error': ['connectionerror', 'connection error', 'connection refused']
+}
+
+
+def detect_error_type(text: str) -> str:
+    """Detect the type of error message from the extracted text."""
+    text_lower = text.lower()
+
+    # Check for each error type
+    for error_type, patterns in ERROR_PATTERNS.items():
+        if any(pattern in text_lower for pattern in patterns):
+            return error_type
+
+    # If no specific error type is found
+    if 'error' in text_lower or 'exception' in text_lower:
+        return 'general_error'
+
+    return 'unknown'
+
+
+@dataclass(frozen=True)
+class OCRResult:
+    text: str
+    error_type: str
+
+
+class OCRBusyError(Exception):
+    """Raised when an OCR job is rejected; ``reason`` is 'queue_full' or 'user_limit'."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"OCR pool busy: {reason}")
+        self.reason = reason
+
+
+class OCRError(Exception):
+    """Raised when Tesseract fails on an image."""
+
+
+# The backend of the current worker process, created by _init_worker()
+_backend: Optional[OCRBackend] = None
+
+
+def _init_worker(backend_name: str, tesseract_cmd: Optional[str]):
+    """Runs once in each worker process; a warm backend stays loaded for every job."""
+    global _backend
+    _backend = make_backend(backend_name, tesseract_cmd)
+
+
+def _tesseract_cmd() -> Optional[str]:
+    return config.TESSERACT_PATH or (WINDOWS_TESSERACT_CMD if os.name == 'nt' else None)
+
+
+def target_scale(size: Tuple[int, int], min_side: int = config.OCR_MIN_SIDE,
+                 max_side: int = config.OCR_MAX_SIDE) -> float:
+    """Scale factor that brings an image as close to Tesseract's sweet spot as it can.
+
+    Small images are upscaled just until the shorter side reaches min_side,
+    large ones downscaled until the longer side fits max_side; the max_side
+    cap wins when both apply.
+    """
+    width, height = size
+    scale = max(1.0, min_side / min(width, height))
+    return min(scale, max_side / max(width, height))
+
+
+def preprocess(image: Image.Image) -> Image.Image:
+    """Grayscale, contrast, sharpen and rescale an image for Tesseract."""
+    scale = target_scale(image.size)
+    new_size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+    if scale < 1:
+        # Shrink first so the filters below touch fewer pixels; for JPEGs,
+        # draft() decodes straight at a reduced size
+        image.draft('L', new_size)
+        image = image.convert('L')
+        if image.size != new_size:
+            # Area averaging is enough when shrinking and far cheaper than LANCZOS
+            image = image.resize(new_size, Image.Resampling.BOX)
+    else:
+        # Convert to grayscale
+        image = image.convert('L')
+
+    # Increase contrast
+    image = ImageEnhance.Contrast(image).enhance(2.0)
+
+    # Increase sharpness
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+
+    # Upscale after sharpening, as far as needed
+    if scale > 1:
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    return image
+
+
+def run_ocr(image_bytes: Union[bytes, bytearray], timeout: float = 0) -> OCRResult:
+    """Extract and classify the text of an encoded image. Runs in a worker process."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        prepared = preprocess(image)
+    try:
+        if _backend is None:
+            _init_worker(config.OCR_BACKEND, _tesseract_cmd())
+        text = _backend.image_to_text(prepared, timeout)
+    except Exception as e:
+        # Some pytesseract errors can't be pickled back to the parent process
+        raise OCRError(f"{type(e).__name__}: {e}") from None
+
+    # Clean up the extracted text
+    text = text.strip()
+    # Remove multiple newlines
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return OCRResult(text, detect_error_type(text) if text else 'unknown')
+
+
+class OCRWorkerPool:
+    """Run OCR jobs in a ProcessPoolExecutor so the event loop never blocks on them.
+
+    At most ``workers + max_queue`` jobs are accepted at once and each user
+    may have ``per_user`` of them; anything beyond that is rejected with
+    OCRBusyError instead of piling up. The pool is started on first use and
+    replaced if a worker process dies.
+
+    ``backend`` picks how each worker runs Tesseract (see ocr_backends);
+    with 'tesserocr' the models are loaded once per worker, not per image.
+    """
+
+    def __init__(self, workers: int = config.OCR_WORKERS, max_queue: int = config.OCR_MAX_QUEUE,
+                 per_user: int = config.OCR_MAX_JOBS_PER_USER,
+                 timeout: float = config.OCR_TIMEOUT_SECONDS, backend: str = config.OCR_BACKEND):
+        self.workers = workers
+        self.backend = backend
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs = 0
+        self._user_jobs: Counter = Counter()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Forking a process that runs database and HTTP threads isn't safe
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.backend, _tesseract_cmd())
+            )
+            logger.info(f"Started OCR pool with {self.workers} {self.backend} workers")
+        return self._executor
+
+    def check(self, user_id: int):
+        """Raise OCRBusyError if a job from this user would be rejected right now."""
+        if self._jobs >= self.workers + self.max_queue:
+            raise OCRBusyError('queue_full')
+        if self._user_jobs[user_id] >= self.per_user:
+            raise OCRBusyError('user_limit')
+
+    async def submit(self, user_id: int, image_bytes: Union[bytes, bytearray]) -> OCRResult:
+        """OCR an encoded image (JPEG/PNG bytes) in a worker process.
+
+        The buffer is pickled straight to the worker, so a bytearray from
+        download_as_bytearray() needs no extra copy first.
+        """
+        self.check(user_id)
+        self._jobs += 1
+        self._user_jobs[user_id] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._pool()
+            try:
+                return await loop.run_in_executor(pool, run_ocr, image_bytes, self.timeout)
+            except BrokenProcessPool:
+                # Every job in the pool fails at once; only the first replaces it
+                if self._executor is pool:
+                    logger.error("OCR worker process died, restarting the pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                raise
+        finally:
+            self._jobs -= 1
+            self._user_jobs[user_id] -= 1
+            if not self._user_jobs[user_id]:
+                del self._user_jobs[user_id]
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
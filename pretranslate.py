@@ -0,0 +1,126 @@
+"""Translate all static content ahead of time into the translation bundle.
+
+Run from the repository root:
+
+    python pretranslate.py [--provider google|stub] [--output PATH] [--concurrency N] [--force]
+
+Only texts whose content hash isn't already in the bundle are sent to the
+provider, and entries for texts that are no longer in the content are
+dropped, so re-running after a content edit only translates what changed.
+The bot loads the bundle at startup.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+import config
+from content_repository import ContentRepository
+from translation import (
+    DISCLAIMER, PROVIDERS, TranslationBundle, content_hash, make_provider
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields shown to users, per content type
+CHALLENGE_FIELDS = ('title', 'description', 'hint')
+QUIZ_FIELDS = ('question', 'explanation', 'hint')
+TIP_FIELDS = ('title', 'content', 'category')  # category heads scheduled tips
+POLL_FIELDS = ('question',)
+
+# Fixed texts the bot translates alongside the content
+STATIC_TEXTS = (DISCLAIMER,)
+
+
+def translatable_texts(repository: ContentRepository) -> List[str]:
+    """Every distinct user-facing English text in the content, in file order."""
+    texts = list(STATIC_TEXTS)
+
+    def add(entries, fields):
+        for entry in entries:
+            for field in fields:
+                value = entry.get(field)
+                if isinstance(value, str) and value.strip():
+                    texts.append(value)
+
+    add(repository.all_challenges(), CHALLENGE_FIELDS)
+    for quizzes in repository.quizzes.values():
+        add(quizzes, QUIZ_FIELDS)
+    for questions in repository.quiz_questions.values():
+        add(questions, QUIZ_FIELDS)
+    add(repository.all_tips(), TIP_FIELDS)
+    add(repository.all_polls(), POLL_FIELDS)
+    return list(dict.fromkeys(texts))
+
+
+async def translate_all(provider, texts: List[str], concurrency: int, batch_size: int) -> Dict[str, str]:
+    """Translate texts in batches, at most ``concurrency`` provider calls at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    translations = {}
+
+    async def run(index: int, batch: List[str]):
+        async with semaphore:
+            try:
+                results = await asyncio.to_thread(provider.translate_batch, batch)
+            except Exception as e:
+                logger.error(f"Batch {index + 1}/{len(batches)} failed: {e}")
+                return
+        for text, translated in zip(batch, results):
+            if translated:
+                translations[text] = translated
+        logger.info(f"Batch {index + 1}/{len(batches)} done")
+
+    await asyncio.gather(*(run(index, batch) for index, batch in enumerate(batches)))
+    return translations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--provider', choices=sorted(PROVIDERS), default='google')
+    parser.add_argument('--language', default='so')
+    parser.add_argument('--output', default=config.TRANSLATION_BUNDLE_PATH)
+    parser.add_argument('--content-dir', default='.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--force', action='store_true', help="retranslate texts already in the bundle")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    texts = translatable_texts(ContentRepository(args.content_dir))
+    hashes = {text: content_hash(text) for text in texts}
+    old = TranslationBundle.load(args.output, args.language)
+    if old.provider and old.provider != args.provider and not args.force:
+        logger.warning(f"Bundle was made with {old.provider}; new entries will come from {args.provider}")
+
+    entries = {} if args.force else {
+        text_hash: old.entries[text_hash]
+        for text_hash in hashes.values() if text_hash in old.entries
+    }
+    missing = [text for text in texts if hashes[text] not in entries]
+    logger.info(
+        f"{len(texts)} texts: {len(entries)} already translated, {len(missing)} to translate, "
+        f"{len(old.entries) - len(entries)} old entries dropped"
+    )
+
+    provider = make_provider(args.provider, target=args.language)
+    translations = asyncio.run(translate_all(provider, missing, args.concurrency, args.batch_size))
+    entries.update((hashes[text], translated) for text, translated in translations.items())
+
+    bundle = TranslationBundle(
+        args.language, args.provider, old.version + 1, entries, datetime.now().isoformat()
+    )
+    bundle.save(args.output)
+    failed = len(missing) - len(translations)
+    logger.info(f"Wrote bundle v{bundle.version} with {len(bundle)} entries to {args.output}")
+    if failed:
+        logger.warning(f"{failed} texts could not be translated; run again to retry them")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
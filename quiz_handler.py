@@ -1,9 +1,10 @@
-import json
-import random
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Set
 import os
 
+from content_repository import get_content_repository
+from shuffle_bag import ShuffleBags
+
 @dataclass
 class QuizTracker:
     current_streak: int = 0
@@ -49,57 +50,42 @@ class QuizTracker:
         self.total_questions = 0
 
 class QuizHandler:
-    def __init__(self, questions_dir: str = 'quiz_questions'):
+    def __init__(self, questions_dir: str = 'quiz_questions', shuffle_bags: Optional[ShuffleBags] = None):
         self.questions_dir = questions_dir
         self.tracker = QuizTracker()
-        self.questions = {}
-        self.asked_questions = {}  # Track asked questions per category
+        self.shuffle_bags = shuffle_bags or ShuffleBags()  # Per-user no-repeat order per category
         self.load_questions()
 
     def load_questions(self):
-        """Load questions from separate JSON files in the questions directory."""
+        """Make sure the questions directory exists; the content repository parses its files."""
         try:
             # Create questions directory if it doesn't exist
             if not os.path.exists(self.questions_dir):
                 os.makedirs(self.questions_dir)
-
-            # Load questions from each category file
-            for filename in os.listdir(self.questions_dir):
-                if filename.endswith('_questions.json'):
-                    category = filename.replace('_questions.json', '')
-                    with open(os.path.join(self.questions_dir, filename), 'r') as f:
-                        data = json.load(f)
-                        self.questions[category] = data['questions']
-                        self.asked_questions[category] = set()  # Initialize set for tracking asked questions
         except Exception as e:
             print(f"Error loading questions: {str(e)}")
-            self.questions = {}
-            self.asked_questions = {}
 
-    def get_random_question(self, category: Optional[str] = None) -> Dict:
-        """Get a random question from the specified category that hasn't been asked yet."""
+    @property
+    def questions(self) -> Dict:
+        """Questions by category, read from the repository so reloads are picked up."""
+        return get_content_repository().quiz_questions
+
+    def get_random_question(self, category: Optional[str] = None, user_id: Optional[int] = None) -> Dict:
+        """Get a random question from the specified category that this user hasn't been asked yet.
+
+        Without a user_id the question is picked at random.
+        """
         if not category:
             raise ValueError("Category must be specified")
             
         if category not in self.questions:
             raise ValueError(f"Invalid category: {category}")
 
-        # Get list of questions that haven't been asked yet
-        available_questions = [
-            q for i, q in enumerate(self.questions[category])
-            if i not in self.asked_questions[category]
-        ]
-
-        # If all questions have been asked, reset tracking for this category
-        if not available_questions:
-            self.asked_questions[category] = set()
-            available_questions = self.questions[category]
-
-        question = random.choice(available_questions)
+        # Next question from this user's bag; it refills once every question was asked
+        question = self.shuffle_bags.draw(user_id, f"question:{category}", self.questions[category])
         
-        # Track this question as asked using its index
-        question_index = self.questions[category].index(question)
-        self.asked_questions[category].add(question_index)
+        # Copy so the shared read-only entry isn't modified
+        question = dict(question)
         
         # Ensure consistent branding and formatting
         question['formatted_text'] = (
@@ -0,0 +1,115 @@
+"""Sliding-window message rate limiting per (chat, user)."""
+import logging
+import time
+from array import array
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class _Window:
+    """The last ``limit`` event times of one key, in a fixed-size ring."""
+    __slots__ = ('stamps', 'head', 'count', 'limit', 'window', 'last', 'slot')
+
+    def __init__(self, limit: int, window: float):
+        self.stamps = array('d', bytes(8 * limit))
+        self.head = 0  # Oldest stamp once the ring is full
+        self.count = 0
+        self.limit = limit
+        self.window = window
+        self.last = 0.0
+        self.slot = -1
+
+
+class RateLimiter:
+    """Allow at most ``limit`` messages per ``window`` seconds for each key.
+
+    Every key keeps a ring of its last ``limit`` monotonic timestamps packed
+    in an array, so a check is O(1) and memory per key is bounded. A message
+    is over the limit when the oldest timestamp in a full ring is still
+    inside the window. Every message is recorded, including rejected ones,
+    so someone who keeps flooding stays limited.
+
+    Keys that go quiet for a whole window are dropped by a timing wheel
+    that is advanced lazily on each call. Limits can be overridden per chat
+    with set_chat_limit(); keys are ``(chat_id, user_id)``.
+    """
+
+    def __init__(self, limit: int = config.MAX_MESSAGES_PER_MINUTE,
+                 window: float = config.RATE_LIMIT_WINDOW_SECONDS,
+                 wheel_slots: int = config.RATE_LIMIT_WHEEL_SLOTS,
+                 tick: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.default_limit = limit
+        self.default_window = window
+        self.tick = tick
+        self.clock = clock
+        self._chat_limits: Dict[int, Tuple[int, float]] = {}
+        self._windows: Dict[Hashable, _Window] = {}
+        self._wheel: List[Set[Hashable]] = [set() for _ in range(wheel_slots)]
+        self._wheel_tick = int(clock() / tick)
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def set_chat_limit(self, chat_id: int, limit: Optional[int], window: Optional[float]):
+        """Override the limit for one chat; None falls back to the default."""
+        limit = limit or self.default_limit
+        window = window or self.default_window
+        if (limit, window) == (self.default_limit, self.default_window):
+            self._chat_limits.pop(chat_id, None)
+        else:
+            self._chat_limits[chat_id] = (limit, window)
+
+    def limits_for(self, chat_id: int) -> Tuple[int, float]:
+        """Get the (limit, window) that applies in a chat."""
+        return self._chat_limits.get(chat_id, (self.default_limit, self.default_window))
+
+    def _schedule(self, key: Hashable, entry: _Window):
+        """Put a key in the wheel slot of the tick when it goes idle."""
+        slot = int((entry.last + entry.window) / self.tick) % len(self._wheel)
+        if slot != entry.slot:
+            if entry.slot >= 0:
+                self._wheel[entry.slot].discard(key)
+            self._wheel[slot].add(key)
+            entry.slot = slot
+
+    def _advance(self, now: float):
+        """Evict idle keys from the slots the wheel has passed since the last call."""
+        current = int(now / self.tick)
+        # A full turn visits every slot; there is no need to go round twice
+        start = max(self._wheel_tick + 1, current - len(self._wheel) + 1)
+        for tick in range(start, current + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            for key in list(slot):
+                entry = self._windows[key]
+                if entry.last + entry.window <= now:
+                    slot.discard(key)
+                    del self._windows[key]
+                else:
+                    # Idle time is further out than one turn of the wheel
+                    entry.slot = -1
+                    slot.discard(key)
+                    self._schedule(key, entry)
+        self._wheel_tick = current
+
+    def hit(self, chat_id: int, user_id: int) -> bool:
+        """Record a message and return True if it is over the limit."""
+        now = self.clock()
+        self._advance(now)
+        key = (chat_id, user_id)
+        limit, window = self.limits_for(chat_id)
+        entry = self._windows.get(key)
+        if entry is None or entry.limit != limit or entry.window != window:
+            if entry is not None and entry.slot >= 0:
+                self._wheel[entry.slot].discard(key)
+            entry = self._windows[key] = _Window(limit, window)
+
+        limited = entry.count == limit and entry.stamps[entry.head] > now - window
+        entry.stamps[entry.head] = now
+        entry.head = (entry.head + 1) % limit
+        entry.count = min(entry.count + 1, limit)
+        entry.last = now
+        self._schedule(key, entry)
+        return limited
@@ -2,7 +2,6 @@
 import asyncio
 import logging
 import random
-import json
 import pickle
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -12,6 +11,8 @@ from telegram.constants import ParseMode
 from discussion_manager import DiscussionManager
 from tip_manager import TipManager
 from challenge_fetcher import ChallengeFetcher
+from content_repository import get_content_repository
+from broadcast import step
 import config
 from deep_translator import GoogleTranslator
 import html
@@ -75,7 +76,8 @@ class ScheduleManager:
                 ('tips', config.TIP_INTERVAL_HOURS),
                 ('challenges', config.CHALLENGE_INTERVAL_HOURS),
                 ('polls', config.POLL_INTERVAL_HOURS),
-                ('cleanup', 24)  # Run cleanup daily
+                ('cleanup', 24),  # Run cleanup daily
+                ('leaderboard_check', config.LEADERBOARD_CHECK_INTERVAL_HOURS)
             ]:
                 last_run = self.last_run_times.get(task_name)
                 if last_run:
@@ -134,18 +136,8 @@ class ScheduleManager:
     async def schedule_tips(self):
         """Schedule tech tips."""
         try:
-            with open('resources/tips.json', 'r', encoding='utf-8') as f:
-                tips_data = json.load(f)
-            
-            # Get all tips into a flat list
-            all_tips = []
-            if isinstance(tips_data, dict):
-                # If it's a dictionary, collect all tips from each category
-                for category_tips in tips_data.values():
-                    all_tips.extend(category_tips)
-            else:
-                # If it's already a list, use it directly
-                all_tips = tips_data
+            # Flat list of tips across all categories
+            all_tips = get_content_repository().all_tips()
             
             if all_tips:
                 tip = random.choice(all_tips)
@@ -167,17 +159,14 @@ class ScheduleManager:
                     ]
                 ]
                 
-                for group_id in config.TARGET_GROUPS:
-                    try:
-                        await self.app.bot.send_message(
-                            chat_id=group_id,
-                            text=message,
-                            parse_mode=ParseMode.MARKDOWN,
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                        logger.info(f"Sent tip to group {group_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send tip to group {group_id}: {e}")
+                await self.bot.broadcaster.broadcast('tip', [
+                    step(
+                        'send_message',
+                        text=message,
+                        parse_mode=ParseMode.MARKDOWN,
+                        reply_markup=InlineKeyboardMarkup(keyboard)
+                    )
+                ])
                 
         except Exception as e:
             logger.error(f"Error scheduling tip: {e}", exc_info=True)
@@ -226,17 +215,14 @@ class ScheduleManager:
                 ]
             ]
 
-            for group_id in config.TARGET_GROUPS:
-                try:
-                    await self.app.bot.send_message(
-                        chat_id=group_id,
-                        text=message,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    logger.info(f"Sent challenge to group {group_id}")
-                except Exception as e:
-                    logger.error(f"Error sending challenge to group {group_id}: {e}")
+            await self.bot.broadcaster.broadcast('challenge', [
+                step(
+                    'send_message',
+                    text=message,
+                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            ])
 
             # Save last run time
             self.last_run_times['challenges'] = datetime.now().isoformat()
@@ -253,19 +239,8 @@ class ScheduleManager:
     async def schedule_polls(self):
         """Schedule interactive polls."""
         try:
-            with open('resources/polls.json', 'r', encoding='utf-8') as f:
-                polls_data = json.load(f)
-            
-            # Get all polls into a flat list
-            all_polls = []
-            if isinstance(polls_data, dict):
-                # If it's a dictionary, collect all polls from each category
-                for category_polls in polls_data.values():
-                    if isinstance(category_polls, list):
-                        all_polls.extend(category_polls)
-            else:
-                # If it's already a list, use it directly
-                all_polls = polls_data
+            # Flat list of polls across all categories
+            all_polls = get_content_repository().all_polls()
             
             if all_polls:
                 poll = random.choice(all_polls)
@@ -279,28 +254,18 @@ class ScheduleManager:
                     "#TechPoll #KTechSomali"
                 )
 
-                # Send poll to all target groups
-                for group_id in config.TARGET_GROUPS:
-                    try:
-                        # First send the message
-                        await self.app.bot.send_message(
-                            chat_id=group_id,
-                            text=message,
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                        
-                        # Then send the actual poll
-                        await self.app.bot.send_poll(
-                            chat_id=group_id,
-                            question=poll['question'],
-                            options=poll['options'],
-                            is_anonymous=False,
-                            allows_multiple_answers=poll.get('multiple_answers', False),
-                            type=poll.get('type', Poll.REGULAR)
-                        )
-                        logger.info(f"Sent poll to group {group_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send poll to group {group_id}: {e}")
+                # Send poll to all target groups: first the message, then the actual poll
+                await self.bot.broadcaster.broadcast('poll', [
+                    step('send_message', text=message, parse_mode=ParseMode.MARKDOWN),
+                    step(
+                        'send_poll',
+                        question=poll['question'],
+                        options=list(poll['options']),
+                        is_anonymous=False,
+                        allows_multiple_answers=poll.get('multiple_answers', False),
+                        type=poll.get('type', Poll.REGULAR)
+                    )
+                ])
 
         except Exception as e:
             logger.error(f"Error scheduling poll: {e}", exc_info=True)
@@ -314,6 +279,9 @@ class ScheduleManager:
             # Clean up translation cache
             if self.bot:
                 await self.bot.cleanup_translation_cache()
+                await self.bot.compact_leaderboards()
+                await self.bot.cleanup_broadcasts()
+                await self.bot.cleanup_ocr_cache()
             
             # Clean up old scheduler states
             current_time = datetime.now()
@@ -329,6 +297,11 @@ class ScheduleManager:
             logger.error(f"Error in cleanup task: {e}")
             raise
 
+    async def schedule_leaderboard_check(self):
+        """Check the in-memory leaderboard against the database."""
+        if self.bot:
+            await self.bot.verify_leaderboard()
+
     async def handle_scheduled_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button clicks from scheduled messages."""
         query = update.callback_query
@@ -339,7 +312,12 @@ class ScheduleManager:
                 if self.bot:  # Use bot's translation method if available
                     try:
                         text = query.message.text
-                        translated = await self.bot.translate_to_somali(text)
+                        # Tip messages are header, category, tip text, hashtags. The
+                        # branding stays as it is; the category and tip text are
+                        # translated paragraph by paragraph so they come from the bundle.
+                        paragraphs = text.split("\n\n")
+                        body = paragraphs[1:-1] if len(paragraphs) > 2 else paragraphs
+                        translated = "\n\n".join(await self.bot.translator.translate_many(body))
                         await query.edit_message_text(
                             text + "\n\n" + translated,
                             reply_markup=query.message.reply_markup,
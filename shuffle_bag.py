@@ -0,0 +1,101 @@
+"""Per-user no-repeat ordering of challenges, quizzes and tips."""
+import logging
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, bag, size, seed, cursor)
+BagRow = Tuple[int, str, int, int, int]
+
+FEISTEL_ROUNDS = 6
+_MASK64 = (1 << 64) - 1
+
+
+def _round_function(seed: int, round_number: int, value: int) -> int:
+    """Mix a half-block with the seed and round number (splitmix64 finaliser)."""
+    x = (value * 0x9E3779B97F4A7C15 + seed + round_number * 0xD1B54A32D192ED03) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def permute(seed: int, size: int, index: int) -> int:
+    """Position ``index`` of the seed's pseudo-random permutation of range(size).
+
+    A balanced Feistel network is a bijection on the smallest even-width
+    power of two covering size (less than 4 * size); outputs that land past
+    the end are fed through again (cycle-walking) until one is in range.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    half_mask = (1 << half_bits) - 1
+    value = index
+    while True:
+        left, right = value >> half_bits, value & half_mask
+        for round_number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ (_round_function(seed, round_number, right) & half_mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class ShuffleBags:
+    """Hand out every item of a list once, in random order, before repeating.
+
+    A bag is stored as a random seed for permute() plus a cursor into the
+    permutation. That is three integers per (user, bag) however long the
+    list is, and drawing the next item is O(1) on average. If the list
+    changes length (e.g. content was reloaded) the bag starts a new cycle.
+
+    ``persist`` is called with the row after every draw; pass None to keep
+    the bags in memory only.
+    """
+
+    def __init__(self, persist: Optional[Callable[..., None]] = None):
+        self.persist = persist
+        self._bags: Dict[Tuple[int, str], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._bags)
+
+    def load(self, rows: Iterable[BagRow]):
+        """Replace the bags with stored rows."""
+        self._bags = {
+            (user_id, bag): [size, seed, cursor]
+            for user_id, bag, size, seed, cursor in rows
+        }
+        logger.info(f"Loaded {len(self._bags)} shuffle bags")
+
+    @staticmethod
+    def _new_cycle(size: int, avoid_first: Optional[int] = None) -> List[int]:
+        # 63 bits so the seed fits an SQLite integer
+        seed = random.getrandbits(63)
+        # Don't repeat the previous cycle's last item
+        while size > 1 and permute(seed, size, 0) == avoid_first:
+            seed = random.getrandbits(63)
+        return [size, seed, 0]
+
+    def next_index(self, user_id: int, bag: str, size: int) -> int:
+        """Get the index of the next unseen item in a user's bag."""
+        if size <= 0:
+            raise ValueError("cannot draw from an empty bag")
+        key = (user_id, bag)
+        state = self._bags.get(key)
+        if state is None or state[0] != size:
+            state = self._bags[key] = self._new_cycle(size)
+        elif state[2] >= size:
+            last = permute(state[1], size, size - 1)
+            state = self._bags[key] = self._new_cycle(size, avoid_first=last)
+        _, seed, cursor = state
+        state[2] = cursor + 1
+        if self.persist is not None:
+            self.persist(user_id, bag, *state)
+        return permute(seed, size, cursor)
+
+    def draw(self, user_id: Optional[int], bag: str, items: Sequence):
+        """Get the next unseen item for a user, or a random one if user_id is None."""
+        if not items:
+            return None
+        if user_id is None:
+            return random.choice(items)
+        return items[self.next_index(user_id, bag, len(items))]
@@ -0,0 +1,85 @@
+"""Clean-up applied to machine-translated Somali text."""
+import json
+import logging
+import re
+from typing import Dict, Mapping
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Applied in this order after the word corrections
+RULES = (
+    # Remove space before punctuation
+    (re.compile(r'(\w)\s+([,.!?])'), r'\1\2'),
+    # Improve readability with better sentence spacing
+    (re.compile(r'([.!?])\s*(\w)'), r'\1\n\n\2'),
+    # Make sure important technical terms are clear
+    (re.compile(r'\b([Ff]unction)\b'), 'shaqada (function)'),
+    (re.compile(r'\b([Cc]lass)\b'), 'fasalka (class)'),
+    (re.compile(r'\b([Mm]ethod)\b'), 'hab (method)'),
+    # Fix common grammatical patterns in Somali
+    (re.compile(r'\b(waa in|waxa)\s+(\w+)\s+in\b'), r'\1 \2 inuu'),
+)
+
+
+def _correction_pattern(phrase: str) -> 're.Pattern':
+    return re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE)
+
+
+def resolve_corrections(corrections: Mapping[str, str]) -> Dict[str, str]:
+    """Fold the corrections table into one lookup with the same result as applying it in order.
+
+    Applied one after another, a correction's output can be rewritten by a
+    later entry ("ku dar" -> "ku soo dar" -> "ku dar"), so each replacement
+    is run through the entries after it once here instead of on every text.
+    Keys are case-folded, as matching ignores case.
+    """
+    items = list(corrections.items())
+    resolved = {}
+    for index, (phrase, replacement) in enumerate(items):
+        for later_phrase, later_replacement in items[index + 1:]:
+            replacement = _correction_pattern(later_phrase).sub(later_replacement, replacement)
+        resolved.setdefault(phrase.casefold(), replacement)
+    return resolved
+
+
+class SomaliPostProcessor:
+    """Word corrections in one regex pass, then the fixed RULES.
+
+    All corrections are matched by a single alternation (longest phrase
+    first) and replaced through a dict lookup, instead of one re.sub per
+    table entry. benchmarks/somali_postprocess_bench.py checks the output
+    against the old per-entry loop.
+    """
+
+    def __init__(self, corrections: Mapping[str, str]):
+        self.corrections = resolve_corrections(corrections)
+        self._pattern = None
+        if self.corrections:
+            phrases = sorted(self.corrections, key=len, reverse=True)
+            self._pattern = re.compile(
+                r'\b(?:' + '|'.join(map(re.escape, phrases)) + r')\b', re.IGNORECASE
+            )
+
+    @classmethod
+    def from_file(cls, path: str = config.SOMALI_CORRECTIONS_PATH) -> 'SomaliPostProcessor':
+        """Load the corrections table from a JSON object of phrase -> replacement, in order."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                corrections = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading Somali corrections from {path}: {e}")
+            corrections = {}
+        return cls(corrections)
+
+    def _replace(self, match: 're.Match') -> str:
+        word = match.group(0)
+        return self.corrections.get(word.casefold(), word)
+
+    def __call__(self, text: str) -> str:
+        if self._pattern is not None:
+            text = self._pattern.sub(self._replace, text)
+        for pattern, replacement in RULES:
+            text = pattern.sub(replacement, text)
+        return text
@@ -0,0 +1,117 @@
+"""Durable one-shot timers stored in the database."""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import config
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+ActionHandler = Callable[[dict], Awaitable[None]]
+
+
+class DurableTimers:
+    """Run registered actions at a wall-clock time, across restarts.
+
+    Each pending action is one row in the scheduled_actions table, keyed by
+    (action, key); scheduling the same key again moves it. A single task
+    sleeps until the earliest due_at, runs whatever is due and goes back to
+    sleep, so thousands of pending timers cost no coroutines. Actions that
+    came due while the bot was down run in a catch-up pass at startup.
+
+    A handler that raises is retried with exponential backoff, up to
+    ``max_attempts`` runs in total.
+    """
+
+    def __init__(self, db: AsyncDatabase,
+                 retry_delay: float = config.TIMER_RETRY_SECONDS,
+                 max_attempts: int = config.TIMER_MAX_ATTEMPTS,
+                 max_sleep: float = config.TIMER_MAX_SLEEP_SECONDS,
+                 batch_size: int = config.TIMER_BATCH_SIZE):
+        self.db = db
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.max_sleep = max_sleep
+        self.batch_size = batch_size
+        self._handlers: Dict[str, ActionHandler] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, action: str, handler: ActionHandler):
+        """Set the coroutine function that runs an action; it gets the payload dict."""
+        self._handlers[action] = handler
+
+    async def schedule(self, action: str, key: str, delay: float, payload: dict = None):
+        """Run an action ``delay`` seconds from now, replacing any pending one with the same key."""
+        await self.db.schedule_action(action, str(key), time.time() + delay, payload, durable=True)
+        self._wake.set()
+
+    async def cancel(self, action: str, key: str):
+        """Drop a pending action, if there is one."""
+        await self.db.cancel_action(action, str(key), durable=True)
+
+    def start(self):
+        """Start the timer task; overdue actions run right away."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the timer task. Pending actions stay in the database."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        catching_up = True
+        while True:
+            try:
+                # Cleared before reading, so a schedule() that lands while we
+                # run due actions still wakes the sleep below
+                self._wake.clear()
+                now = time.time()
+                due = await self.db.get_due_actions(now, self.batch_size)
+                if catching_up and due:
+                    logger.info(f"Running {len(due)} timer action(s) that came due while stopped")
+                for row in due:
+                    await self._dispatch(*row)
+                if len(due) == self.batch_size:
+                    continue
+                catching_up = False
+
+                next_due = await self.db.next_action_due()
+                timeout = self.max_sleep if next_due is None else max(0.0, next_due - time.time())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), min(timeout, self.max_sleep))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in timer loop: {e}", exc_info=True)
+                await asyncio.sleep(self.retry_delay)
+
+    async def _dispatch(self, action_id: int, action: str, key: str, due_at: float,
+                        payload: dict, attempts: int):
+        handler = self._handlers.get(action)
+        if handler is None:
+            logger.warning(f"Dropping timer {action}:{key} with no registered handler")
+            await self.db.finish_action(action_id, due_at, attempts, durable=True)
+            return
+        try:
+            await handler(payload)
+        except Exception as e:
+            if attempts + 1 < self.max_attempts:
+                retry_at = time.time() + self.retry_delay * 2 ** attempts
+                logger.warning(f"Timer {action}:{key} failed ({e}), retrying")
+                await self.db.retry_action(action_id, due_at, attempts, retry_at, durable=True)
+            else:
+                logger.error(f"Timer {action}:{key} failed {attempts + 1} times, giving up: {e}")
+                await self.db.finish_action(action_id, due_at, attempts, durable=True)
+            return
+        await self.db.finish_action(action_id, due_at, attempts, durable=True)
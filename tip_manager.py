@@ -1,32 +1,51 @@
-import json
 import random
 import logging
+from typing import Mapping
+
+from content_repository import get_content_repository
 
 class TipManager:
     def __init__(self):
-        try:
-            with open('resources/tips.json', 'r', encoding='utf-8') as f:
-                self.tips_data = json.load(f)
-            
-            # Handle both old and new format
-            if isinstance(self.tips_data, dict) and 'categories' in self.tips_data:
-                self.categories = self.tips_data['categories']
-            else:
-                # Create categories from the data
-                self.categories = {}
-                for tip in self.tips_data:
-                    cat = tip.get('category', 'general')
-                    if cat not in self.categories:
-                        self.categories[cat] = []
-                    self.categories[cat].append(tip)
-            
-            logging.info("Successfully loaded tips data")
-        except Exception as e:
-            logging.error(f"Error loading tips data: {e}")
-            # Default empty data
-            self.tips_data = {}
-            self.categories = {}
-        
+        # Rebuilt from the content repository whenever one of the tip files is reloaded
+        self._categories = {}
+        self._versions = None
+
+    @property
+    def categories(self):
+        """Tips by category, then subcategory, from tips.json and resources/tips.json."""
+        repository = get_content_repository()
+        versions = (repository.version('tip_library'), repository.version('tips'))
+        if versions != self._versions:
+            try:
+                self._categories = self._build_categories(repository)
+                logging.info("Successfully loaded tips data")
+            except Exception as e:
+                logging.error(f"Error loading tips data: {e}")
+                self._categories = {}
+            self._versions = versions
+        return self._categories
+
+    @staticmethod
+    def _build_categories(repository):
+        categories = {}
+        library = repository.source('tip_library')
+        if library:
+            for cat, subcategories in library['categories'].items():
+                categories[cat] = dict(subcategories)
+
+        tips_data = repository.source('tips')
+        if isinstance(tips_data, Mapping):
+            grouped = {cat: tips for cat, tips in tips_data.items() if isinstance(tips, tuple)}
+        else:
+            # Create categories from the data
+            grouped = {}
+            for tip in tips_data or ():
+                grouped.setdefault(tip.get('category', 'general'), []).append(tip)
+        # Flat category lists are filed under a 'general' subcategory
+        for cat, tips in grouped.items():
+            categories.setdefault(cat, {})['general'] = tuple(tips)
+        return categories
+
     def get_random_tip(self, category=None, subcategory=None):
         """Get a random tip, optionally filtered by category and subcategory."""
         if not self.categories:
@@ -39,16 +58,16 @@ class TipManager:
             
         try:
             if category and category in self.categories:
-                if isinstance(self.categories[category], dict) and subcategory and subcategory in self.categories[category]:
+                if isinstance(self.categories[category], Mapping) and subcategory and subcategory in self.categories[category]:
                     tips = self.categories[category][subcategory]
-                elif isinstance(self.categories[category], dict):
+                elif isinstance(self.categories[category], Mapping):
                     tips = [tip for subcat in self.categories[category].values() for tip in subcat]
                 else:
                     tips = self.categories[category]
             else:
                 all_tips = []
                 for cat, content in self.categories.items():
-                    if isinstance(content, dict):
+                    if isinstance(content, Mapping):
                         # Handle nested structure
                         for subcat, subcat_tips in content.items():
                             all_tips.extend(subcat_tips)
@@ -112,6 +131,6 @@ class TipManager:
 
     def get_subcategories(self, category):
         """Get list of subcategories for a given category."""
-        if category in self.categories and isinstance(self.categories[category], dict):
+        if category in self.categories and isinstance(self.categories[category], Mapping):
             return list(self.categories[category].keys())
         return [] 
\ No newline at end of file
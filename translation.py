@@ -0,0 +1,441 @@
+"""English -> Somali translation with batching, coalescing and layered caches."""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from deep_translator import GoogleTranslator
+
+import config
+from circuit_breaker import OPEN, CircuitBreaker
+from database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+# Joins the segments of a batch into one provider request. Google keeps it
+# intact in practice; if it doesn't, the batch is retried segment by segment.
+SEGMENT_SEPARATOR = '\n\n§§\n\n'
+SEGMENT_SPLIT = re.compile(r'\s*§\s*§\s*')
+
+DISCLAIMER = "Note: This is an automated translation. Some phrases may not be accurate."
+
+BUNDLE_FORMAT = 1
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the English text, the key of a bundle entry."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class GoogleProvider:
+    """Blocking Google Translate calls through deep_translator."""
+    name = 'google'
+    version = 1  # Bump to stop serving translations cached from older output
+
+    def __init__(self, source: str = 'en', target: str = 'so',
+                 max_chars: int = config.TRANSLATION_BATCH_CHARS):
+        self.source = source
+        self.target = target
+        self.max_chars = max_chars
+
+    def _translate(self, text: str) -> str:
+        return GoogleTranslator(source=self.source, target=self.target).translate(text)
+
+    def translate_batch(self, texts: List[str]) -> List[Optional[str]]:
+        """Translate texts with as few requests as the size limit allows."""
+        results: List[Optional[str]] = []
+        for chunk in self._chunks(texts):
+            if len(chunk) == 1:
+                results.append(self._translate(chunk[0]))
+                continue
+            translated = self._translate(SEGMENT_SEPARATOR.join(chunk)) or ''
+            parts = SEGMENT_SPLIT.split(translated.strip())
+            if len(parts) != len(chunk):
+                logger.warning(f"Batch of {len(chunk)} segments came back as {len(parts)}, translating one by one")
+                parts = [self._translate(text) for text in chunk]
+            results.extend(parts)
+        return results
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        chunks: List[List[str]] = []
+        size = 0
+        for text in texts:
+            added = len(text) + len(SEGMENT_SEPARATOR)
+            if not chunks or size + added > self.max_chars:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(text)
+            size += added
+        return chunks
+
+
+class StubProvider:
+    """Offline provider for tests and dry runs: tags texts instead of translating them."""
+    name = 'stub'
+    version = 1
+
+    def __init__(self, source: str = 'en', target: str = 'so'):
+        self.target = target
+
+    def translate_batch(self, texts: List[str]) -> List[Optional[str]]:
+        return [f"[{self.target}] {text}" for text in texts]
+
+
+PROVIDERS = {
+    GoogleProvider.name: GoogleProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+def provider_version(provider) -> str:
+    """Cache key part naming the provider and its output version, e.g. 'google/1'."""
+    return f"{provider.name}/{provider.version}"
+
+
+def make_provider(name: str, source: str = 'en', target: str = 'so'):
+    """Create a translation provider by name."""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown translation provider: {name}")
+    return PROVIDERS[name](source=source, target=target)
+
+
+class TranslationBundle:
+    """Translations of the static content made ahead of time by pretranslate.py.
+
+    Entries map the content hash of an English text to the raw provider
+    output, so an edited text simply stops matching and post-processing
+    changes apply without rebuilding. ``version`` goes up with every build.
+    """
+
+    def __init__(self, language: str = 'so', provider: str = '', version: int = 0,
+                 entries: Dict[str, str] = None, created_at: str = None):
+        self.language = language
+        self.provider = provider
+        self.version = version
+        self.entries = entries or {}
+        self.created_at = created_at
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, text: str) -> Optional[str]:
+        """Get the bundled translation of a text, if there is one."""
+        return self.entries.get(content_hash(text))
+
+    @classmethod
+    def load(cls, path: str, language: str = 'so') -> 'TranslationBundle':
+        """Load a bundle; a missing or unusable file gives an empty one."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No translation bundle at {path}")
+            return cls(language)
+        except Exception as e:
+            logger.error(f"Error loading translation bundle {path}: {e}")
+            return cls(language)
+
+        if data.get('format') != BUNDLE_FORMAT or data.get('language') != language:
+            logger.warning(
+                f"Ignoring translation bundle {path}: format {data.get('format')}, "
+                f"language {data.get('language')}"
+            )
+            return cls(language)
+        bundle = cls(language, data.get('provider', ''), data.get('version', 0),
+                     data.get('entries', {}), data.get('created_at'))
+        if bundle.provider == StubProvider.name:
+            logger.warning(f"Translation bundle {path} was made with the stub provider")
+        logger.info(f"Loaded translation bundle v{bundle.version} with {len(bundle)} entries")
+        return bundle
+
+    def save(self, path: str):
+        """Write the bundle atomically."""
+        data = {
+            'format': BUNDLE_FORMAT,
+            'language': self.language,
+            'provider': self.provider,
+            'version': self.version,
+            'created_at': self.created_at or datetime.now().isoformat(),
+            'entries': dict(sorted(self.entries.items())),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit breaker is open."""
+
+
+class GuardedProvider:
+    """Async front end for a blocking provider, with a timeout and a circuit breaker.
+
+    Calls run on a small dedicated thread pool. deep_translator has no
+    request timeout, so a call that times out is abandoned rather than
+    stopped; its thread finishes in the background. Once too many recent
+    calls have failed or timed out, calls are refused straight away with
+    ProviderUnavailable until the breaker's cooldown has passed.
+    """
+
+    def __init__(self, provider, timeout: float = config.TRANSLATION_TIMEOUT_SECONDS,
+                 threads: int = config.TRANSLATION_PROVIDER_THREADS):
+        self.provider = provider
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(
+            f"Translation provider {provider.name}",
+            window=config.TRANSLATION_BREAKER_WINDOW,
+            min_calls=config.TRANSLATION_BREAKER_MIN_CALLS,
+            error_budget=config.TRANSLATION_BREAKER_ERROR_BUDGET,
+            cooldown=config.TRANSLATION_BREAKER_COOLDOWN_SECONDS
+        )
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='translate')
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._counters = {'calls': 0, 'failures': 0, 'timeouts': 0}
+
+    async def translate_batch(self, texts: List[str]) -> List[Optional[str]]:
+        token = self.breaker.allow()
+        if token is None:
+            raise ProviderUnavailable(f"retrying in {self.breaker.retry_in():.0f}s")
+        self._counters['calls'] += 1
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        try:
+            results = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, self.provider.translate_batch, texts),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            self._counters['timeouts'] += 1
+            self.breaker.record_failure(token)
+            raise
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled(token)
+            raise
+        except Exception:
+            self._counters['failures'] += 1
+            self.breaker.record_failure(token)
+            raise
+        self._latencies.append(time.monotonic() - start)
+        self.breaker.record_success(token)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            **self._counters,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            'latency_max': latencies[-1] if latencies else 0.0,
+            'breaker': self.breaker.stats(),
+        }
+
+
+class TranslationService:
+    """Translate texts through an in-memory LRU, the translations table and a provider.
+
+    translate_many() resolves every segment of one request together: LRU
+    and pre-made bundle hits first, then a single database read for the
+    rest, then one provider call (in a worker thread) for whatever is
+    still missing.
+    Concurrent requests for a text that is already being translated wait
+    for that translation instead of starting another. Failed translations
+    fall back to the original text and are not cached.
+
+    Expired translations are served as they are while a background call
+    refreshes them (stale-while-revalidate), so only texts that were never
+    translated wait on the provider. When the provider's circuit breaker is
+    open those come back in English immediately.
+    """
+
+    def __init__(self, db: AsyncDatabase, provider: GoogleProvider = None, language: str = 'so',
+                 postprocess: Callable[[str], str] = None,
+                 cache_size: int = config.TRANSLATION_LRU_SIZE,
+                 bundle: TranslationBundle = None,
+                 ttl: float = config.TRANSLATION_CACHE_DURATION):
+        self.db = db
+        self.provider = provider or GoogleProvider(target=language)
+        self.provider_version = provider_version(self.provider)
+        self.guard = GuardedProvider(self.provider)
+        self.language = language
+        self.bundle = bundle or TranslationBundle(language)
+        self.postprocess = postprocess
+        self.cache_size = cache_size
+        self.ttl = ttl
+        # text -> (translation, expires_at as a unix time)
+        self._lru: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._migration: Optional[asyncio.Task] = None
+        self._counters = {
+            'lru_hits': 0, 'bundle_hits': 0, 'db_hits': 0, 'translated': 0,
+            'stale_served': 0, 'refreshed': 0, 'untranslated': 0,
+        }
+
+    def start(self):
+        """Move rows from the old translation cache table in the background."""
+        if self._migration is None or self._migration.done():
+            # The old table only ever held Google translations
+            self._migration = asyncio.create_task(
+                self.db.migrate_legacy_translations(provider_version(GoogleProvider))
+            )
+
+    async def stop(self):
+        """Stop background work; the migration picks up where it left off on the next start."""
+        tasks = list(self._tasks)
+        if self._migration and not self._migration.done():
+            tasks.append(self._migration)
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                logger.error(f"Translation background task failed: {result}")
+        self._migration = None
+        self.guard.shutdown()
+
+    def _remember(self, text: str, translated: str, expires_at: float = None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        self._lru[text] = (translated, expires_at)
+        self._lru.move_to_end(text)
+        while len(self._lru) > self.cache_size:
+            self._lru.popitem(last=False)
+
+    async def translate(self, text: str) -> str:
+        """Translate one text."""
+        return (await self.translate_many([text]))[0]
+
+    async def translate_many(self, texts: List[str]) -> List[str]:
+        """Translate several texts at once; empty texts are returned unchanged."""
+        found: Dict[str, str] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+        now = time.time()
+        for text in dict.fromkeys(t for t in texts if t):
+            if text in self._lru:
+                self._lru.move_to_end(text)
+                found[text], expires_at = self._lru[text]
+                self._counters['lru_hits'] += 1
+                if expires_at <= now:
+                    stale.append(text)
+                continue
+            bundled = self.bundle.get(text)
+            if bundled is not None:
+                found[text] = self.postprocess(bundled) if self.postprocess else bundled
+                self._remember(text, found[text], float('inf'))
+                self._counters['bundle_hits'] += 1
+            elif text in self._inflight:
+                waiting[text] = self._inflight[text]
+            else:
+                missing.append(text)
+        if stale:
+            self._revalidate(stale)
+
+        if missing:
+            # Claim the misses before awaiting anything, so concurrent callers coalesce
+            loop = asyncio.get_running_loop()
+            claimed = {text: loop.create_future() for text in missing}
+            self._inflight.update(claimed)
+            try:
+                resolved = await self._resolve(missing)
+                for text, future in claimed.items():
+                    future.set_result(resolved.get(text, text))
+            except BaseException as e:
+                for future in claimed.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                for text in claimed:
+                    self._inflight.pop(text, None)
+            found.update((text, future.result()) for text, future in claimed.items())
+
+        for text, future in waiting.items():
+            found[text] = await asyncio.shield(future)
+        return [found.get(text, text) for text in texts]
+
+    async def _resolve(self, texts: List[str]) -> Dict[str, str]:
+        """Look texts up in the database, translating and storing what isn't there."""
+        resolved: Dict[str, str] = {}
+        stale: List[str] = []
+        try:
+            rows = await self.db.get_translations(texts, self.language, self.provider_version)
+        except Exception as e:
+            logger.error(f"Error reading translation cache: {e}")
+            rows = {}
+        now = time.time()
+        for text, (translated, expires_at) in rows.items():
+            resolved[text] = translated
+            self._remember(text, translated, expires_at)
+            if expires_at is not None and expires_at <= now:
+                stale.append(text)
+        self._counters['db_hits'] += len(rows)
+        if stale:
+            self._revalidate(stale)
+
+        untranslated = [text for text in texts if text not in resolved]
+        if not untranslated:
+            return resolved
+        try:
+            resolved.update(await self._fetch(untranslated))
+        except ProviderUnavailable:
+            pass
+        except asyncio.TimeoutError:
+            logger.error(f"Translation timed out after {self.guard.timeout}s")
+        except Exception as e:
+            logger.error(f"Translation failed: {e}")
+        self._counters['untranslated'] += sum(1 for text in untranslated if text not in resolved)
+        return resolved
+
+    async def _fetch(self, texts: List[str]) -> Dict[str, str]:
+        """Translate texts with the provider and cache the results."""
+        results = await self.guard.translate_batch(texts)
+        fresh = {}
+        for text, translated in zip(texts, results):
+            if not translated:
+                continue
+            if self.postprocess:
+                translated = self.postprocess(translated)
+            fresh[text] = translated
+            self._remember(text, translated)
+        if fresh:
+            self._counters['translated'] += len(fresh)
+            await self.db.cache_translations(fresh, self.language, self.provider_version, self.ttl)
+        return fresh
+
+    def _revalidate(self, texts: List[str]):
+        """Refresh expired translations in the background; they are served meanwhile."""
+        self._counters['stale_served'] += len(texts)
+        texts = [text for text in texts if text not in self._refreshing]
+        if not texts or self.guard.breaker.state == OPEN:
+            return
+        self._refreshing.update(texts)
+        task = asyncio.create_task(self._refresh(texts))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, texts: List[str]):
+        try:
+            self._counters['refreshed'] += len(await self._fetch(texts))
+        except (ProviderUnavailable, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logger.warning(f"Refreshing {len(texts)} expired translations failed: {e}")
+        finally:
+            self._refreshing.difference_update(texts)
+
+    def stats(self) -> dict:
+        """Cache hit counters plus the provider's call, latency and breaker figures."""
+        return {**self._counters, 'lru_size': len(self._lru), 'provider': self.guard.stats()}